@@ -0,0 +1,82 @@
+"""
+Allocation profile of parsing and serializing a CPIX document
+
+Reports the peak and retained bytes and the net number of memory blocks
+allocated by CPIX.parse, element and pretty_print, as measured by tracemalloc,
+followed by the memory used by the parsed document.
+
+general usage
+
+    python benchmarks/allocations.py [--count N] [cpix_file]
+
+Without a file a document with count keys, each with a Widevine DRM system
+and usage rule, is generated.
+"""
+import argparse
+import os
+import uuid
+import cpix
+from cpix.memory import allocation_profile
+
+
+PSSH = (
+    "AAAAxnBzc2gBAAAA7e+LqXnWSs6jyCfc1R0h7QAAAAINw+xPdoNUi4HnPGTlguE2FEe37S9mV"
+    "yu9EwbOfPNhDQAAAIISEBRHt+0vZlcrvRMGznzzYQ0SEFrGoR6qL17Vv2aMQByBNMoSEG7hNR"
+    "bI51h7rp9+zT6Zom4SEPnsEqYaJl1Hj4MzTjp40scSEA3D7E92g1SLgec8ZOWC4TYaDXdpZGV"
+    "2aW5lX3Rlc3QiEXVuaWZpZWQtc3RyZWFtaW5nSOPclZsG"
+)
+
+
+def generate(count):
+    """
+    Return the XML of a document with count keys
+    """
+    kids = [uuid.uuid4() for _ in range(count)]
+    document = cpix.CPIX(
+        content_keys=cpix.ContentKeyList.from_records(
+            kids, [os.urandom(16) for _ in kids]),
+        drm_systems=cpix.DRMSystemList.from_records(
+            kids, cpix.WIDEVINE_SYSTEM_ID, pssh=PSSH),
+        usage_rules=cpix.UsageRuleList.from_records(
+            kids, [cpix.VideoFilter(max_pixels=442368)]),
+    )
+    return str(document)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="profile memory allocated by parsing and serializing CPIX")
+    parser.add_argument(
+        "cpix_file",
+        action="store",
+        help="CPIX document to profile (default: generated document)",
+        nargs="?"
+    )
+    parser.add_argument(
+        "--count",
+        action="store",
+        dest="count",
+        help="number of keys in the generated document (default: 10000)",
+        default=10000,
+        type=int
+    )
+    args = parser.parse_args()
+
+    if args.cpix_file:
+        with open(args.cpix_file, "rb") as f:
+            xml = f.read()
+    else:
+        xml = generate(args.count)
+
+    for operation, stats in allocation_profile(xml).items():
+        print("{operation:<14} peak {peak:>12} retained {retained:>12} "
+              "blocks {blocks:>10}".format(operation=operation, **stats))
+
+    usage = cpix.CPIX.parse(xml).memory_usage(deep=True)
+    payloads = usage.pop("payloads")
+    for name, size in list(usage.items()) + list(payloads.items()):
+        print("{name:<26} {size:>12} bytes".format(name=name, size=size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Key derivation benchmark
+
+Times deriving the content keys of a grid of content IDs, tracks and periods
+one key at a time with KeyDerivation.content_key, and in a batch with
+KeyDerivation.content_keys into a ContentKeyList and a
+ColumnarContentKeyList.
+
+general usage
+
+    python benchmarks/derive_keys.py [--counts N [N ...]]
+"""
+import argparse
+import time
+import cpix
+
+
+MASTER_SECRET = bytes(range(32))
+TRACKS = ["video-sd", "video-hd", "video-uhd", "audio"]
+PERIODS = ["p{}".format(period) for period in range(25)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="time key derivation")
+    parser.add_argument(
+        "--counts",
+        action="store",
+        dest="counts",
+        help="numbers of content IDs (default: 100 10000)",
+        default=[100, 10000],
+        nargs="+",
+        type=int
+    )
+    args = parser.parse_args()
+
+    for count in args.counts:
+        content_ids = ["content-{}".format(number) for number in range(count)]
+        runs = (
+            ("content_key", lambda derivation: [
+                derivation.content_key(content_id, track, period)
+                for content_id in content_ids for period in PERIODS
+                for track in TRACKS]),
+            ("ContentKeyList", lambda derivation: derivation.content_keys(
+                content_ids, TRACKS, PERIODS)),
+            ("ColumnarContentKeyList",
+             lambda derivation: derivation.content_keys(
+                 content_ids, TRACKS, PERIODS,
+                 cls=cpix.ColumnarContentKeyList)),
+        )
+        expected = None
+        for name, run in runs:
+            derivation = cpix.KeyDerivation(MASTER_SECRET)
+            start = time.perf_counter()
+            content_keys = run(derivation)
+            elapsed = time.perf_counter() - start
+            keys = [(key.kid, key.cek_bytes) for key in content_keys]
+            if expected is None:
+                expected = keys
+            assert keys == expected
+            print("{keys:>8} keys {name:<22} {ms:>8.1f}ms".format(
+                keys=len(keys), name=name, ms=elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Bulk list construction benchmark
+
+Compares building content key, DRM system and usage rule lists one object at
+a time against the from_records bulk constructors.
+
+general usage
+
+    python benchmarks/from_records.py [--counts N [N ...]]
+"""
+import argparse
+import os
+import time
+import uuid
+import cpix
+from base64 import b64encode
+
+
+PSSH = (
+    "AAAAxnBzc2gBAAAA7e+LqXnWSs6jyCfc1R0h7QAAAAINw+xPdoNUi4HnPGTlguE2FEe37S9mV"
+    "yu9EwbOfPNhDQAAAIISEBRHt+0vZlcrvRMGznzzYQ0SEFrGoR6qL17Vv2aMQByBNMoSEG7hNR"
+    "bI51h7rp9+zT6Zom4SEPnsEqYaJl1Hj4MzTjp40scSEA3D7E92g1SLgec8ZOWC4TYaDXdpZGV"
+    "2aW5lX3Rlc3QiEXVuaWZpZWQtc3RyZWFtaW5nSOPclZsG"
+)
+
+
+def content_keys_per_object(kids, ceks):
+    content_keys = cpix.ContentKeyList()
+    for kid, cek in zip(kids, ceks):
+        content_keys.append(cpix.ContentKey(kid=kid, cek=cek))
+    return content_keys
+
+
+def drm_systems_per_object(kids):
+    drm_systems = cpix.DRMSystemList()
+    for kid in kids:
+        drm_systems.append(cpix.DRMSystem(
+            kid=kid, system_id=cpix.WIDEVINE_SYSTEM_ID, pssh=PSSH))
+    return drm_systems
+
+
+def usage_rules_per_object(kids):
+    usage_rules = cpix.UsageRuleList()
+    for kid in kids:
+        usage_rules.append(cpix.SDVideoUsageRule(kid))
+    return usage_rules
+
+
+BENCHMARKS = {
+    "ContentKeyList": (
+        content_keys_per_object,
+        lambda kids, ceks: cpix.ContentKeyList.from_records(kids, ceks),
+    ),
+    "ColumnarContentKeyList": (
+        content_keys_per_object,
+        lambda kids, ceks: cpix.ColumnarContentKeyList.from_records(
+            kids, ceks),
+    ),
+    "DRMSystemList": (
+        lambda kids, ceks: drm_systems_per_object(kids),
+        lambda kids, ceks: cpix.DRMSystemList.from_records(
+            kids, cpix.WIDEVINE_SYSTEM_ID, pssh=PSSH),
+    ),
+    "UsageRuleList": (
+        lambda kids, ceks: usage_rules_per_object(kids),
+        lambda kids, ceks: cpix.UsageRuleList.from_records(
+            kids, [cpix.VideoFilter(max_pixels=442368)]),
+    ),
+}
+
+
+def timed(function, *args):
+    """
+    Return the seconds taken to call function
+    """
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="compare per object and bulk list construction")
+    parser.add_argument(
+        "--counts",
+        action="store",
+        dest="counts",
+        help="numbers of entries to build (default: 1000 100000 1000000)",
+        default=[1000, 100000, 1000000],
+        nargs="+",
+        type=int
+    )
+    args = parser.parse_args()
+
+    for count in args.counts:
+        kids = [uuid.uuid4() for _ in range(count)]
+        ceks = [str(b64encode(os.urandom(16)), "ascii") for _ in kids]
+        for name, (per_object, from_records) in BENCHMARKS.items():
+            per_object_time = timed(per_object, kids, ceks)
+            from_records_time = timed(from_records, kids, ceks)
+            print("{name:<24} {count:>8} per object {per:>8.3f}s "
+                  "from_records {bulk:>8.3f}s {speedup:>6.1f}x".format(
+                      name=name, count=count, per=per_object_time,
+                      bulk=from_records_time,
+                      speedup=per_object_time / from_records_time))
+
+
+if __name__ == "__main__":
+    main()
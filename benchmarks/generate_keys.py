@@ -0,0 +1,58 @@
+"""
+Content key generation benchmark
+
+Times creating content keys with random kids and content keys one at a time,
+with ContentKeyList.generate and with ColumnarContentKeyList.generate.
+
+general usage
+
+    python benchmarks/generate_keys.py [--counts N [N ...]]
+"""
+import argparse
+import base64
+import os
+import time
+import uuid
+import cpix
+
+
+def one_at_a_time(count):
+    content_keys = cpix.ContentKeyList()
+    for _ in range(count):
+        content_keys.append(cpix.ContentKey(
+            kid=uuid.uuid4(), cek=base64.b64encode(os.urandom(16))))
+    return content_keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="time key generation")
+    parser.add_argument(
+        "--counts",
+        action="store",
+        dest="counts",
+        help="numbers of content keys (default: 10000 1000000)",
+        default=[10000, 1000000],
+        nargs="+",
+        type=int
+    )
+    args = parser.parse_args()
+
+    for count in args.counts:
+        runs = (
+            ("ContentKey", lambda: one_at_a_time(count)),
+            ("ContentKeyList", lambda: cpix.ContentKeyList.generate(count)),
+            ("ColumnarContentKeyList",
+             lambda: cpix.ColumnarContentKeyList.generate(count)),
+        )
+        for name, run in runs:
+            start = time.perf_counter()
+            content_keys = run()
+            elapsed = time.perf_counter() - start
+            assert len(content_keys) == count
+            del content_keys
+            print("{count:>8} keys {name:<22} {ms:>8.1f}ms".format(
+                count=count, name=name, ms=elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
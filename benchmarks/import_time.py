@@ -0,0 +1,71 @@
+"""
+Import time benchmark
+
+Imports cpix in fresh interpreters and reports the median cumulative import
+time as measured by python -X importtime. Exits with status 1 if the median
+is over the budget, so it can be used to catch cold start regressions.
+
+general usage
+
+    python benchmarks/import_time.py [--runs N] [--budget MS]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+# milliseconds allowed for import cpix, including its dependencies
+DEFAULT_BUDGET = 100
+
+
+def import_time(module):
+    """
+    Return the cumulative import time of module in a fresh interpreter in
+    milliseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stderr=subprocess.PIPE, check=True, universal_newlines=True)
+    for line in result.stderr.splitlines():
+        _, _, cumulative, name = [part.strip() for part in
+                                  line.replace(":", "|", 1).split("|")]
+        if name == module:
+            return int(cumulative) / 1000
+    raise RuntimeError("{} was not imported".format(module))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="measure the time taken to import cpix")
+    parser.add_argument(
+        "--runs",
+        action="store",
+        dest="runs",
+        help="number of interpreters to start (default: 10)",
+        default=10,
+        type=int
+    )
+    parser.add_argument(
+        "--budget",
+        action="store",
+        dest="budget",
+        help="maximum median import time in ms (default: {})".format(
+            DEFAULT_BUDGET),
+        default=DEFAULT_BUDGET,
+        type=float
+    )
+    args = parser.parse_args()
+
+    times = [import_time("cpix") for _ in range(args.runs)]
+    median = statistics.median(times)
+    print("import cpix: median {median:.1f} ms, min {min:.1f} ms, "
+          "max {max:.1f} ms, budget {budget:.1f} ms".format(
+              median=median, min=min(times), max=max(times),
+              budget=args.budget))
+    if median > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
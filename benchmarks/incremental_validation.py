@@ -0,0 +1,81 @@
+"""
+Incremental schema validation benchmark
+
+Builds a document with a content key and DRM system per key ID, then
+repeatedly rotates one key and times validating the whole serialized
+document against IncrementalValidator.
+
+general usage
+
+    python benchmarks/incremental_validation.py [--keys N] [--ticks N]
+"""
+import argparse
+import os
+import time
+import uuid
+import cpix
+from lxml import etree
+
+
+PSSH = (
+    "AAAAxnBzc2gBAAAA7e+LqXnWSs6jyCfc1R0h7QAAAAINw+xPdoNUi4HnPGTlguE2FEe37S9mV"
+    "yu9EwbOfPNhDQAAAIISEBRHt+0vZlcrvRMGznzzYQ0SEFrGoR6qL17Vv2aMQByBNMoSEG7hNR"
+    "bI51h7rp9+zT6Zom4SEPnsEqYaJl1Hj4MzTjp40scSEA3D7E92g1SLgec8ZOWC4TYaDXdpZGV"
+    "2aW5lX3Rlc3QiEXVuaWZpZWQtc3RyZWFtaW5nSOPclZsG"
+)
+
+
+def rotate(cpix_doc):
+    """Replace the oldest key with a new one"""
+    kid = uuid.uuid4()
+    del cpix_doc.content_keys[0]
+    del cpix_doc.drm_systems[0]
+    content_key = cpix.ContentKey(kid=kid)
+    content_key.cek_bytes = os.urandom(16)
+    cpix_doc.content_keys.append(content_key)
+    cpix_doc.drm_systems.append(cpix.DRMSystem(
+        kid=kid, system_id=cpix.WIDEVINE_SYSTEM_ID, pssh=PSSH))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="compare full and incremental schema validation")
+    parser.add_argument("--keys", type=int, default=10000,
+                        help="number of keys in the document (default: 10000)")
+    parser.add_argument("--ticks", type=int, default=10,
+                        help="number of key rotations (default: 10)")
+    args = parser.parse_args()
+
+    kids = [uuid.uuid4() for _ in range(args.keys)]
+    cpix_doc = cpix.CPIX(
+        content_keys=cpix.ContentKeyList.from_records(
+            kids, [os.urandom(16) for _ in kids]),
+        drm_systems=cpix.DRMSystemList.from_records(
+            kids, cpix.WIDEVINE_SYSTEM_ID, pssh=PSSH),
+    )
+    validator = cpix.IncrementalValidator()
+    start = time.perf_counter()
+    validator.validate(cpix_doc)
+    print("initial incremental validation {:>8.1f}ms".format(
+        (time.perf_counter() - start) * 1000))
+
+    full = incremental = 0
+    for _ in range(args.ticks):
+        rotate(cpix_doc)
+        start = time.perf_counter()
+        full_valid = cpix.validate(etree.tostring(cpix_doc.element()))[0]
+        full += time.perf_counter() - start
+        start = time.perf_counter()
+        incremental_valid = validator.validate(cpix_doc)[0]
+        incremental += time.perf_counter() - start
+        assert full_valid and incremental_valid
+
+    print("{keys} keys, per tick: full {full:>8.1f}ms "
+          "incremental {incremental:>8.1f}ms {speedup:>6.1f}x".format(
+              keys=args.keys, full=full / args.ticks * 1000,
+              incremental=incremental / args.ticks * 1000,
+              speedup=full / incremental))
+
+
+if __name__ == "__main__":
+    main()
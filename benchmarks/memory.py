@@ -0,0 +1,73 @@
+"""
+Memory per object benchmark for the CPIX model classes
+
+Allocates a batch of each model class and reports the average number of bytes
+retained per instance, as measured by tracemalloc.
+
+general usage
+
+    python benchmarks/memory.py [--count N]
+"""
+import argparse
+import tracemalloc
+import uuid
+import cpix
+
+
+CEK = "WADwG2qCqkq5TVml+U5PXw=="
+PSSH = (
+    "AAAAxnBzc2gBAAAA7e+LqXnWSs6jyCfc1R0h7QAAAAINw+xPdoNUi4HnPGTlguE2FEe37S9mV"
+    "yu9EwbOfPNhDQAAAIISEBRHt+0vZlcrvRMGznzzYQ0SEFrGoR6qL17Vv2aMQByBNMoSEG7hNR"
+    "bI51h7rp9+zT6Zom4SEPnsEqYaJl1Hj4MzTjp40scSEA3D7E92g1SLgec8ZOWC4TYaDXdpZGV"
+    "2aW5lX3Rlc3QiEXVuaWZpZWQtc3RyZWFtaW5nSOPclZsG"
+)
+
+FACTORIES = {
+    "ContentKey": lambda kid: cpix.ContentKey(kid=kid, cek=CEK),
+    "DRMSystem": lambda kid: cpix.DRMSystem(
+        kid=kid, system_id=cpix.WIDEVINE_SYSTEM_ID, pssh=PSSH),
+    "Period": lambda kid: cpix.Period(id="p" + kid.hex, index=kid.int % 1000),
+    "VideoFilter": lambda kid: cpix.VideoFilter(max_pixels=442368),
+    "AudioFilter": lambda kid: cpix.AudioFilter(),
+    "BitrateFilter": lambda kid: cpix.BitrateFilter(max_bitrate=500000),
+    "KeyPeriodFilter": lambda kid: cpix.KeyPeriodFilter(period_id="p"),
+    "UsageRule": lambda kid: cpix.SDVideoUsageRule(kid),
+}
+
+
+def measure(factory, kids):
+    """
+    Return average bytes retained per object created by factory
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(kid) for kid in kids]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # exclude the list holding the objects
+    retained = after - before - objects.__sizeof__()
+    return retained / len(objects)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="measure memory retained per CPIX model object")
+    parser.add_argument(
+        "--count",
+        action="store",
+        dest="count",
+        help="number of objects to create per class (default: 100000)",
+        default=100000,
+        type=int
+    )
+    args = parser.parse_args()
+
+    kids = [uuid.uuid4() for _ in range(args.count)]
+
+    for name, factory in FACTORIES.items():
+        print("{name:<16} {size:>8.1f} bytes/object".format(
+            name=name, size=measure(factory, kids)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Period timeline benchmark
+
+Builds a list of back to back one minute key periods and times finding the
+period of random times with a PeriodTimeline, compared with scanning the
+list, and appending periods during rotation.
+
+general usage
+
+    python benchmarks/period_lookup.py [--counts N [N ...]]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+import cpix
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+MINUTE = timedelta(minutes=1)
+LOOKUPS = 1000
+
+
+def scan(periods, when):
+    for period in periods:
+        if period.start is not None and period.start <= when < period.end:
+            return period
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="time period lookups")
+    parser.add_argument(
+        "--counts",
+        action="store",
+        dest="counts",
+        help="numbers of periods (default: 1000 100000)",
+        default=[1000, 100000],
+        nargs="+",
+        type=int
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for count in args.counts:
+        periods = cpix.PeriodList()
+        periods.extend(cpix.Period(id="period_{}".format(i),
+                                   start=START + i * MINUTE,
+                                   end=START + (i + 1) * MINUTE)
+                       for i in range(count))
+        times = [START + rng.random() * count * MINUTE
+                 for _ in range(LOOKUPS)]
+
+        start = time.perf_counter()
+        timeline = periods.timeline()
+        built = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = [timeline.period_at(when) for when in times]
+        indexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanned = [scan(periods, when) for when in times[:10]]
+        scanned_time = (time.perf_counter() - start) / 10
+        assert found[:10] == scanned
+
+        start = time.perf_counter()
+        for i in range(count, count + LOOKUPS):
+            timeline.append(cpix.Period(id="period_{}".format(i),
+                                        start=START + i * MINUTE,
+                                        end=START + (i + 1) * MINUTE))
+            timeline.period_at(START + i * MINUTE)
+        rotated = time.perf_counter() - start
+
+        print("{count:>8} periods build {built:>8.1f}ms lookup "
+              "{lookup:>8.4f}ms scan {scan:>8.4f}ms rotate "
+              "{rotate:>8.4f}ms".format(
+                  count=count, built=built * 1000,
+                  lookup=indexed * 1000 / LOOKUPS, scan=scanned_time * 1000,
+                  rotate=rotated * 1000 / LOOKUPS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+PlayReady key derivation benchmark
+
+Times deriving content keys from a key seed one key at a time with
+generate_content_key and in a batch with generate_content_keys, serially
+and on a process pool.
+
+general usage
+
+    python benchmarks/playready_keys.py [--counts N [N ...]] [--workers N]
+"""
+import argparse
+import os
+import time
+import uuid
+from cpix.drm import playready
+
+
+KEY_SEED = b"XVBovsmzhP9gRIZxWfFta3VVRPzVEWmJsazEJ46I"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="time key derivation")
+    parser.add_argument(
+        "--counts",
+        action="store",
+        dest="counts",
+        help="numbers of key IDs (default: 10000 100000)",
+        default=[10000, 100000],
+        nargs="+",
+        type=int
+    )
+    parser.add_argument(
+        "--workers",
+        action="store",
+        dest="workers",
+        help="processes of the pool (default: number of CPUs)",
+        default=os.cpu_count() or 1,
+        type=int
+    )
+    args = parser.parse_args()
+
+    for count in args.counts:
+        kids = [uuid.uuid4() for _ in range(count)]
+        runs = (
+            ("generate_content_key", lambda: [
+                playready.generate_content_key(kid, KEY_SEED)
+                for kid in kids]),
+            ("generate_content_keys", lambda: playready.generate_content_keys(
+                kids, KEY_SEED)),
+            ("{} workers".format(args.workers),
+             lambda: playready.generate_content_keys(
+                 kids, KEY_SEED, workers=args.workers)),
+        )
+        expected = None
+        for name, run in runs:
+            start = time.perf_counter()
+            keys = run()
+            elapsed = time.perf_counter() - start
+            if expected is None:
+                expected = keys
+            assert keys == expected
+            print("{count:>8} keys {name:<22} {ms:>8.1f}ms".format(
+                count=count, name=name, ms=elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
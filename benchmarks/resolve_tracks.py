@@ -0,0 +1,76 @@
+"""
+Usage rule matcher benchmark
+
+Builds usage rules each covering a pixel range, with a key period filter for
+one of a number of periods, and times compiling a UsageRuleMatcher and
+resolving one video segment per period against it, compared with checking
+every rule in turn.
+
+general usage
+
+    python benchmarks/resolve_tracks.py [--counts N [N ...]]
+"""
+import argparse
+import random
+import time
+import uuid
+import cpix
+
+
+PERIODS = 100
+
+
+def usage_rules(count):
+    rules = cpix.UsageRuleList()
+    for position in range(count):
+        rules.append(cpix.UsageRule(kid=uuid.UUID(int=position), filters=[
+            cpix.KeyPeriodFilter("p{}".format(position % PERIODS)),
+            cpix.VideoFilter(min_pixels=position * 10,
+                             max_pixels=position * 10 + 99)]))
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="time track resolution")
+    parser.add_argument(
+        "--counts",
+        action="store",
+        dest="counts",
+        help="numbers of usage rules (default: 1000 100000)",
+        default=[1000, 100000],
+        nargs="+",
+        type=int
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for count in args.counts:
+        rules = usage_rules(count)
+        tracks = [cpix.Track("video", pixels=rng.randrange(count * 10),
+                             period="p{}".format(period))
+                  for period in range(PERIODS)]
+
+        start = time.perf_counter()
+        matcher = rules.matcher()
+        compiled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        kids = matcher.resolve_many(tracks)
+        resolved = time.perf_counter() - start
+
+        linear = matcher._rules
+        start = time.perf_counter()
+        expected = [next((rule.kid for rule in linear
+                          if rule.matches(track)), None) for track in tracks]
+        scanned = time.perf_counter() - start
+        assert kids == expected
+
+        print("{count:>8} rules compile {compiled:>8.1f}ms resolve "
+              "{resolved:>8.3f}ms/track scan {scanned:>8.3f}ms/track".format(
+                  count=count, compiled=compiled * 1000,
+                  resolved=resolved * 1000 / len(tracks),
+                  scanned=scanned * 1000 / len(tracks)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Usage rule conflict benchmark
+
+Builds a ladder of SD, HD, UHD and audio usage rules per key period, with
+one deliberate overlap per period, and times UsageRuleList.conflicts
+compared with checking every pair of rules.
+
+general usage
+
+    python benchmarks/usage_rule_conflicts.py [--counts N [N ...]]
+"""
+import argparse
+import time
+import uuid
+import cpix
+from cpix.conflicts import tracks_matched_by_both
+from cpix.matcher import _CompiledRule
+
+
+def usage_rules(periods):
+    rules = cpix.UsageRuleList()
+    kid = 0
+    for period in range(periods):
+        period_filter = cpix.KeyPeriodFilter("p{}".format(period))
+        for filters in ([cpix.VideoFilter(max_pixels=442368)],
+                        [cpix.VideoFilter(min_pixels=442369,
+                                          max_pixels=2073600)],
+                        [cpix.VideoFilter(min_pixels=2000000)],
+                        [cpix.AudioFilter()]):
+            kid += 1
+            rules.append(cpix.UsageRule(kid=uuid.UUID(int=kid),
+                                        filters=[period_filter] + filters))
+    return rules
+
+
+def pairwise(rules):
+    compiled = [_CompiledRule(rule, position)
+                for position, rule in enumerate(rules)]
+    return [(a.position, b.position)
+            for i, a in enumerate(compiled) for b in compiled[i + 1:]
+            if a.kid != b.kid and tracks_matched_by_both(a, b)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="time conflict detection")
+    parser.add_argument(
+        "--counts",
+        action="store",
+        dest="counts",
+        help="numbers of key periods, with 4 rules each (default: 250 2500)",
+        default=[250, 2500],
+        nargs="+",
+        type=int
+    )
+    args = parser.parse_args()
+
+    for count in args.counts:
+        rules = usage_rules(count)
+
+        start = time.perf_counter()
+        conflicts = rules.conflicts()
+        swept = time.perf_counter() - start
+        assert len(conflicts) == count
+
+        line = "{rules:>8} rules conflicts {conflicts:>6} sweep {ms:>8.1f}ms"
+        if len(rules) <= 1000:
+            start = time.perf_counter()
+            assert pairwise(rules) == [(c.first, c.second)
+                                       for c in conflicts]
+            line += " pairwise {pairwise:>8.1f}ms".format(
+                pairwise=(time.perf_counter() - start) * 1000)
+        print(line.format(rules=len(rules), conflicts=len(conflicts),
+                          ms=swept * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Content and schema validation benchmark
+
+Builds a document with a content key, DRM system, period and usage rule per
+key ID and times CPIX.validate_content with every content rule, the object
+level schema checks of CPIX.validate and serializing the document and
+validating it against the XSD.
+
+general usage
+
+    python benchmarks/validate_content.py [--counts N [N ...]]
+"""
+import argparse
+import os
+import time
+import uuid
+import cpix
+from lxml import etree
+
+
+def document(count):
+    kids = [uuid.uuid4() for _ in range(count)]
+    return cpix.CPIX(
+        content_keys=cpix.ColumnarContentKeyList.from_records(
+            kids, [os.urandom(16) for _ in kids]),
+        drm_systems=cpix.DRMSystemList.from_records(
+            kids, cpix.WIDEVINE_SYSTEM_ID),
+        # a key per period, so the usage rules do not conflict
+        periods=cpix.PeriodList(*[cpix.Period(id="p{}".format(i), index=i)
+                                  for i in range(count)]),
+        usage_rules=cpix.UsageRuleList.from_records(
+            kids, [[cpix.KeyPeriodFilter("p{}".format(i)),
+                    cpix.VideoFilter(max_pixels=442368)]
+                   for i in range(count)]),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="time document validation")
+    parser.add_argument(
+        "--counts",
+        action="store",
+        dest="counts",
+        help="numbers of keys in the document (default: 1000 100000)",
+        default=[1000, 100000],
+        nargs="+",
+        type=int
+    )
+    args = parser.parse_args()
+
+    validators = (
+        ("validate_content", lambda doc: doc.validate_content(
+            rules=cpix.CONTENT_RULES)[0]),
+        ("validate", lambda doc: doc.validate()[0]),
+        ("xsd", lambda doc: cpix.validate(etree.tostring(doc.element()))[0]),
+    )
+    for count in args.counts:
+        cpix_document = document(count)
+        for name, validator in validators:
+            start = time.perf_counter()
+            valid = validator(cpix_document)
+            elapsed = time.perf_counter() - start
+            print("{count:>8} keys {name:<16} valid {valid} "
+                  "{ms:>8.1f}ms".format(count=count, name=name, valid=valid,
+                                        ms=elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Concurrent schema validation benchmark
+
+Validates a batch of serialized CPIX documents with validate_many at a range
+of thread counts and prints the throughput of each. Parallel speedup needs
+as many CPUs as threads.
+
+general usage
+
+    python benchmarks/validate_many.py [--docs N] [--keys N]
+        [--workers N [N ...]]
+"""
+import argparse
+import os
+import time
+import uuid
+import cpix
+from lxml import etree
+
+
+def document(keys):
+    kids = [uuid.uuid4() for _ in range(keys)]
+    cpix_doc = cpix.CPIX(
+        content_keys=cpix.ContentKeyList.from_records(
+            kids, [os.urandom(16) for _ in kids]),
+        usage_rules=cpix.UsageRuleList.from_records(
+            kids, [cpix.VideoFilter(max_pixels=442368)]),
+    )
+    return etree.tostring(cpix_doc.element())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="measure validate_many throughput per thread count")
+    parser.add_argument("--docs", type=int, default=200,
+                        help="number of documents (default: 200)")
+    parser.add_argument("--keys", type=int, default=200,
+                        help="content keys per document (default: 200)")
+    parser.add_argument(
+        "--workers",
+        action="store",
+        dest="workers",
+        help="thread counts to measure (default: 1 2 4 8)",
+        default=[1, 2, 4, 8],
+        nargs="+",
+        type=int
+    )
+    args = parser.parse_args()
+
+    docs = [document(args.keys) for _ in range(args.docs)]
+    print("{} CPUs".format(os.cpu_count()))
+
+    baseline = None
+    for workers in args.workers:
+        # compile the schemas for the threads outside the timing
+        list(cpix.validate_many(docs[:workers], workers=workers))
+        start = time.perf_counter()
+        results = list(cpix.validate_many(docs, workers=workers))
+        elapsed = time.perf_counter() - start
+        assert all(valid for valid, _ in results)
+        throughput = args.docs / elapsed
+        if baseline is None:
+            baseline = throughput
+        print("{workers:>3} threads {throughput:>9.1f} docs/s "
+              "{scaling:>5.2f}x".format(
+                  workers=workers, throughput=throughput,
+                  scaling=throughput / baseline))
+
+
+if __name__ == "__main__":
+    main()
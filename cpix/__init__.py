@@ -3,40 +3,145 @@ CPIX stuff
 """
 import uuid
 from lxml import etree
-from base64 import b64decode
+from base64 import b16encode, b64decode, b64encode
 from binascii import Error as BinasciiError
-import pkg_resources
+from functools import lru_cache
 import sys
 
 
-CPIX_SCHEMA_DOC = pkg_resources.resource_stream("cpix", "schema/cpix.xsd")
-CPIX_SCHEMA = etree.XMLSchema(etree.parse(CPIX_SCHEMA_DOC))
+CPIX_SCHEMA_RESOURCE = "schema/cpix.xsd"
+CPIX_NAMESPACE = "urn:dashif:org:cpix"
+# version of the bundled schema, used for documents without a version
+CPIX_SCHEMA_VERSION = "2.2"
+
+# schema of each CPIX version, relative paths are resources of this package
+# and absolute paths files. A version without a schema is validated against
+# the schema of the latest earlier version, or the bundled schema
+CPIX_SCHEMAS = {CPIX_SCHEMA_VERSION: CPIX_SCHEMA_RESOURCE}
+# version of documents without a version attribute, by root namespace
+CPIX_NAMESPACE_VERSIONS = {CPIX_NAMESPACE: CPIX_SCHEMA_VERSION}
 
 PLAYREADY_SYSTEM_ID = uuid.UUID("9a04f079-9840-4286-ab92-e65be0885f95")
 WIDEVINE_SYSTEM_ID = uuid.UUID("edef8ba9-79d6-4ace-a3c8-27dcd51d21ed")
 
-VALID_SYSTEM_IDS = [
-    uuid.UUID("1077efec-c0b2-4d02-ace3-3c1e52e2fb4b"),  # org.w3.clearkey
-    PLAYREADY_SYSTEM_ID,  # Microsoft Playready
-    uuid.UUID("F239E769-EFA3-4850-9C16-A903C6932EFB"),  # Adobe Primetime DRM
-    uuid.UUID("5E629AF5-38DA-4063-8977-97FFBD9902D4"),  # Marlin
-    uuid.UUID("9a27dd82-fde2-4725-8cbc-4234aa06ec09"),  # Verimatrix
-    WIDEVINE_SYSTEM_ID,  # Widevine
-    uuid.UUID("80a6be7e-1448-4c37-9e70-d5aebe04c8d2"),  # Irdeto
-    uuid.UUID("279fe473-512c-48fe-ade8-d176fee6b40f"),  # Latens
-    uuid.UUID("B4413586-C58C-FFB0-94A5-D4896C1AF6C3"),  # Viaccess-Orca DRM
-    uuid.UUID("94CE86FB-07FF-4F43-ADB8-93D2FA968CA2"),  # Apple FairPlay
-    uuid.UUID("81376844-F976-481E-A84E-CC25D39B0B33"),  # AES-128
-    uuid.UUID("3D5E6D35-9B9A-41E8-B843-DD3C6E72C42C"),  # ChinaDRM
-]
 PSKC = "urn:ietf:params:xml:ns:keyprov:pskc"
 XSI = "http://www.w3.org/2001/XMLSchema-instance"
 NSMAP = {
-    None: "urn:dashif:org:cpix",
+    None: CPIX_NAMESPACE,
     "xsi": XSI,
     "pskc": PSKC}
 
 
+# compiled schemas used by validate_many by schema path, an XMLSchema can
+# only validate one document at a time so each thread takes its own from the
+# pool
+_SCHEMA_POOLS = {}
+
+
+def _version_key(version):
+    try:
+        return tuple(int(part) for part in version.split("."))
+    except (AttributeError, ValueError):
+        return None
+
+
+def schema_path(version=None):
+    """
+    Return the path in CPIX_SCHEMAS of the schema for a CPIX version
+    """
+    if version is None:
+        version = CPIX_SCHEMA_VERSION
+    if version in CPIX_SCHEMAS:
+        return CPIX_SCHEMAS[version]
+    key = _version_key(version)
+    earlier = [known for known in CPIX_SCHEMAS if key is not None and
+               _version_key(known) is not None and _version_key(known) < key]
+    if earlier:
+        return CPIX_SCHEMAS[max(earlier, key=_version_key)]
+    return CPIX_SCHEMAS[CPIX_SCHEMA_VERSION]
+
+
+def schema_version(xml):
+    """
+    Return the CPIX version of a document element, from its version
+    attribute or else its namespace
+    """
+    version = xml.get("version")
+    if version is None:
+        version = CPIX_NAMESPACE_VERSIONS.get(etree.QName(xml).namespace)
+    return version
+
+
+def register_schema(version, path):
+    """
+    Validate documents of a CPIX version against the XSD file at path, the
+    schemas it imports are found relative to it. It is compiled when first
+    used, the schemas compiled before are dropped so a file registered again
+    is read again
+    """
+    from os.path import abspath
+
+    CPIX_SCHEMAS[version] = abspath(path)
+    get_schema.cache_clear()
+    _compiled_schema.cache_clear()
+    _SCHEMA_POOLS.clear()
+
+
+def load_schema(version=None):
+    """
+    Load and compile a new instance of the XMLSchema of a CPIX version
+    """
+    return _load_schema(schema_path(version))
+
+
+def _resources():
+    """Return the as_file and files functions of importlib.resources"""
+    try:
+        from importlib.resources import as_file, files
+    except ImportError:
+        # python < 3.9
+        from importlib_resources import as_file, files
+    return as_file, files
+
+
+def _load_schema(path):
+    from os.path import isabs
+
+    as_file, files = _resources()
+
+    if isabs(path):
+        return etree.XMLSchema(etree.parse(path))
+    with as_file(files(__name__).joinpath(path)) as file_path:
+        # parsed from the path so the schemas it imports are found
+        return etree.XMLSchema(etree.parse(str(file_path)))
+
+
+@lru_cache(maxsize=None)
+def _compiled_schema(path):
+    return _load_schema(path)
+
+
+@lru_cache(maxsize=None)
+def get_schema(version=None):
+    """
+    Return the XMLSchema of a CPIX version, defaulting to the bundled
+    version. Each schema is loaded and compiled on first use, versions
+    sharing a schema share the compiled instance
+    """
+    return _compiled_schema(schema_path(version))
+
+
+def __getattr__(name):
+    # CPIX_SCHEMA and CPIX_SCHEMA_DOC used to be loaded on import
+    if name == "CPIX_SCHEMA":
+        return get_schema()
+    if name == "CPIX_SCHEMA_DOC":
+        _, files = _resources()
+        return files(__name__).joinpath(CPIX_SCHEMA_RESOURCE).open("rb")
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
+
+
 def parse(xml):
     """
     Parse function, does an initial read to figure out the root element then
@@ -52,9 +157,10 @@ def parse(xml):
     return getattr(sys.modules[__name__], tag).parse(xml)
 
 
-def validate(xml):
+def validate(xml, schema=None):
     """
-    Validate a CPIX XML against the schema
+    Validate a CPIX XML against the schema, by default the schema of the
+    document's CPIX version
 
     Returns a tuple of valid true/false and if false the error(s)
     """
@@ -63,19 +169,92 @@ def validate(xml):
     if not isinstance(xml, etree._Element):
         raise TypeError("not valid xml")
 
+    if schema is None:
+        schema = get_schema(schema_version(xml))
     try:
-        CPIX_SCHEMA.assertValid(xml)
+        schema.assertValid(xml)
     except etree.DocumentInvalid as e:
         return (False, e)
     return (True, "")
 
 
-from .content_key import ContentKey, ContentKeyList
+def _validate_pooled(xml):
+    """Validate with a schema taken from the pool, or a new one"""
+    try:
+        if isinstance(xml, CPIX):
+            xml = etree.tostring(xml.element())
+        if isinstance(xml, (str, bytes)):
+            xml = etree.fromstring(xml)
+        if not isinstance(xml, etree._Element):
+            raise TypeError("not valid xml")
+    except (TypeError, etree.XMLSyntaxError) as e:
+        return (False, e)
+
+    path = schema_path(schema_version(xml))
+    pool = _SCHEMA_POOLS.setdefault(path, [])
+    try:
+        schema = pool.pop()
+    except IndexError:
+        schema = _load_schema(path)
+    try:
+        return validate(xml, schema)
+    finally:
+        pool.append(schema)
+
+
+def validate_many(docs, workers=None):
+    """
+    Validate an iterable of CPIX XMLs (strings, bytes, elements or CPIX
+    objects) against the schema of their CPIX version on a pool of threads
+
+    lxml releases the GIL while parsing and validating so documents are
+    validated in parallel, each thread with its own compiled schemas. Yields
+    the result of each document in order, as a tuple of valid true/false and
+    if false the error. At most two documents per worker are read ahead of
+    the results consumed, documents which are not XML give false and the
+    parse error rather than raising. workers defaults to the number of CPUs
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    from os import cpu_count
+
+    if workers is None:
+        workers = cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    with ThreadPoolExecutor(workers, "cpix-validate") as executor:
+        pending = deque()
+        for xml in docs:
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(_validate_pooled, xml))
+        while pending:
+            yield pending.popleft().result()
+
+
+from .registry import DRMSystemInfo, DRMSystemRegistry, DRM_SYSTEMS, \
+    VALID_SYSTEM_IDS
+from .key_id import KeyID, to_key_id
+from .content_key import ContentKey, ContentKeyList, COMMON_ENCRYPTION_SCHEMES
+from .columnar import ColumnarContentKeyList
+from .derivation import KeyDerivation
 from .drm_system import DRMSystem, DRMSystemList
 from .filters import AudioFilter, BitrateFilter, VideoFilter, KeyPeriodFilter,\
     LabelFilter
 from .usage_rule import UsageRule, UsageRuleList, AudioUsageRule, \
     VideoUsageRule, SDVideoUsageRule, HDVideoUsageRule, UHD1VideoUsageRule, \
     UHD2VideoUsageRule
+from .matcher import Track, UsageRuleMatcher
+from .conflicts import TrackRange, UsageRuleConflict
+from .timeline import PeriodTimeline
 from .period import Period, PeriodList
+from .period_range import PeriodRange, RangePeriodList
+from .validation import ContentError, CONTENT_RULES, DEFAULT_CONTENT_RULES
+from .incremental import IncrementalValidator
 from .cpix import CPIX
+
+if sys.version_info < (3, 7):
+    # module __getattr__ needs python 3.7, the schema is loaded on import
+    CPIX_SCHEMA = __getattr__("CPIX_SCHEMA")
+    CPIX_SCHEMA_DOC = __getattr__("CPIX_SCHEMA_DOC")
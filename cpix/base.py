@@ -6,7 +6,52 @@ from collections.abc import MutableSequence
 from lxml import etree
 
 
+# frozen subclass of each class, created when an instance is first frozen
+_FROZEN_CLASSES = {}
+
+
+def _slots(cls):
+    """Return the slot names of cls and its bases"""
+    return [slot for klass in reversed(cls.__mro__)
+            for slot in klass.__dict__.get("__slots__", ())]
+
+
+def _is_cache_slot(name):
+    """
+    Cache slots are filled in lazily from the other values, so they may
+    still be set on frozen objects
+    """
+    return (name in ("_hash", "_indexes", "_positions", "_offsets") or
+            name.endswith("_b64"))
+
+
+def _freeze_value(value):
+    if isinstance(value, CPIXComparableBase):
+        return value.freeze()
+    if isinstance(value, list) or type(value) is tuple:
+        return tuple(_freeze_value(item) for item in value)
+    if isinstance(value, bytearray):
+        return bytes(value)
+    return value
+
+
+def _frozen_class(cls):
+    """Return the frozen subclass of cls"""
+    frozen_class = _FROZEN_CLASSES.get(cls)
+    if frozen_class is None:
+        base = FrozenList if issubclass(cls, CPIXListBase) else Frozen
+        frozen_class = type("Frozen" + cls.__name__, (base, cls), {
+            "__slots__": ("_hash",),
+            "__module__": cls.__module__,
+            "_thawed_class": cls,
+        })
+        _FROZEN_CLASSES[cls] = frozen_class
+    return frozen_class
+
+
 class CPIXComparableBase(ABC):
+    __slots__ = ()
+
     def __str__(self):
         return str(etree.tostring(self.element()), "utf-8")
 
@@ -45,6 +90,26 @@ class CPIXComparableBase(ABC):
             kwargs["encoding"] = "utf-8"
         return etree.tostring(self.element(), **kwargs)
 
+    def freeze(self):
+        """
+        Return an immutable and hashable snapshot, lists and the objects in
+        them are frozen too so the snapshot can be shared between threads
+        """
+        frozen = object.__new__(_frozen_class(type(self)))
+        for slot in _slots(type(self)):
+            try:
+                value = getattr(self, slot)
+            except AttributeError:
+                continue
+            if not _is_cache_slot(slot):
+                object.__setattr__(frozen, slot, _freeze_value(value))
+            elif not isinstance(value, dict):
+                object.__setattr__(frozen, slot, None)
+        object.__setattr__(frozen, "_hash", None)
+        if isinstance(frozen, CPIXListBase):
+            frozen.reindex()
+        return frozen
+
     # Abstract methods element and parse must be overriden
     @abstractmethod
     def element(self):
@@ -56,7 +121,25 @@ class CPIXComparableBase(ABC):
 
 
 class CPIXListBase(MutableSequence, CPIXComparableBase):
-    """Base list class to be extended"""
+    """
+    Base list class to be extended
+
+    Subclasses can maintain constant time lookup indexes by setting
+    index_keys to a dict of index name to a function returning the key of an
+    item. The functions of the indexes named in multi_index_keys return an
+    iterable of keys, the item is indexed under each. The indexes are kept
+    up to date by every list operation, if an indexed attribute of an item
+    is changed in place the item must be assigned back to the list or
+    reindex called
+    """
+
+    __slots__ = ("_list", "_indexes")
+
+    index_keys = {}
+    multi_index_keys = frozenset()
+    # items are immutable values shared between lists, so a thawed list
+    # keeps them frozen
+    frozen_items = False
 
     def __init__(self, *args, **kwargs):
         self._list = list()
@@ -71,34 +154,241 @@ class CPIXListBase(MutableSequence, CPIXComparableBase):
             self.extend(list(args))
 
     def __len__(self):
-        return len(self.list)
+        return len(self._list)
 
     def __getitem__(self, index):
-        return self.list[index]
+        self._own_items()
+        if isinstance(index, slice):
+            return list(self._list[index])
+        return self._list[index]
+
+    def __iter__(self):
+        self._own_items()
+        return iter(self._list)
 
     def __setitem__(self, index, value):
-        self.check(value)
-        self.list[index] = value
+        self._writable()
+        if isinstance(index, slice):
+            value = list(value)
+            for item in value:
+                self.check(item)
+            removed = self._list[index]
+        else:
+            self.check(value)
+            removed = [self._list[index]]
+        self._list[index] = value
+        for item in removed:
+            self._index_remove(item)
+        for item in (value if isinstance(index, slice) else [value]):
+            self._index_add(item, ordered=False)
 
     def __delitem__(self, index):
-        del self.list[index]
+        self._writable()
+        removed = self._list[index]
+        del self._list[index]
+        for item in (removed if isinstance(index, slice) else [removed]):
+            self._index_remove(item)
 
     def insert(self, index, value):
+        self._writable()
         self.check(value)
-        self.list.insert(index, value)
+        appended = index >= len(self._list)
+        self._list.insert(index, value)
+        self._index_add(value, ordered=appended)
+
+    @classmethod
+    def _from_checked(cls, items):
+        """
+        Create a list holding items, which must already have been checked,
+        in a single step
+        """
+        new_list = cls()
+        new_list._list = items
+        new_list.reindex()
+        return new_list
+
+    def _writable(self):
+        """
+        Called before the list is changed, frozen lists raise TypeError
+        """
+        self._own_items()
+
+    def _own_items(self):
+        """
+        Replace the items shared with a frozen list, which a thawed list
+        starts with, by thawed copies. Called before the items are used, so
+        they are copied once and reads after that leave the list as it is
+        """
+        if isinstance(self._list, tuple):
+            self._list = [
+                item.thaw() if isinstance(item, Frozen) and
+                not self.frozen_items else item
+                for item in self._list]
+            self.reindex()
 
     @property
     def list(self):
-        return self._list
+        """
+        Copy of the items, changes to the list go through the list methods
+        so items are checked and indexed
+        """
+        self._own_items()
+        return list(self._list)
 
     @list.setter
     def list(self, l):
         if not isinstance(l, list):
             raise TypeError("must be a list")
-        elif all([self.check(x) for x in l]):
-            self._list = l
+        for x in l:
+            self.check(x)
+        self._list = list(l)
+        self.reindex()
+
+    def reindex(self):
+        """
+        Rebuild the lookup indexes
+        """
+        self._indexes = {name: {} for name in self.index_keys}
+        # one pass per index rather than per item
+        for name, key in self.index_keys.items():
+            index = self._indexes[name]
+            if name in self.multi_index_keys:
+                for item in self._list:
+                    for index_key in key(item):
+                        index.setdefault(index_key, []).append(item)
+            else:
+                for item in self._list:
+                    index.setdefault(key(item), []).append(item)
+
+    def _index_add(self, item, ordered=True):
+        """
+        Index an item, ordered is false if it was not added after the other
+        items, the items under a key it shares are then rebuilt in list order
+        """
+        for name, key in self.index_keys.items():
+            multi = name in self.multi_index_keys
+            index = self._indexes[name]
+            for index_key in (key(item) if multi else (key(item),)):
+                items = index.setdefault(index_key, [])
+                if ordered or not items:
+                    items.append(item)
+                elif multi:
+                    index[index_key] = [listed for listed in self._list
+                                        if index_key in key(listed)]
+                else:
+                    index[index_key] = [listed for listed in self._list
+                                        if key(listed) == index_key]
+
+    def _index_remove(self, item):
+        for name, key in self.index_keys.items():
+            index = self._indexes[name]
+            if name in self.multi_index_keys:
+                found = [self._index_discard(index, index_key, item)
+                         for index_key in key(item)]
+                if not all(found):
+                    # the indexed attribute was changed after the item was
+                    # added, the item may be under any keys
+                    for index_key in list(index):
+                        while self._index_discard(index, index_key, item):
+                            pass
+            elif not self._index_discard(index, key(item), item):
+                # the indexed attribute was changed after the item was added
+                for index_key in list(index):
+                    if self._index_discard(index, index_key, item):
+                        break
+
+    @staticmethod
+    def _index_discard(index, index_key, item):
+        items = index.get(index_key)
+        if items:
+            for position, indexed in enumerate(items):
+                if indexed is item:
+                    del items[position]
+                    if not items:
+                        del index[index_key]
+                    return True
+        return False
+
+    def _lookup(self, name, key):
+        """
+        Return a list of the items with key in the named index
+        """
+        self._own_items()
+        return list(self._indexes[name].get(key, ()))
 
     # Abstract method check must be overriden
     @abstractmethod
     def check(self, value):
         pass
+
+
+class Frozen(object):
+    """
+    Mixin of the frozen subclasses created by CPIXComparableBase.freeze
+
+    Setting attributes raises AttributeError, only caches of values derived
+    from the frozen values are filled in
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        if not _is_cache_slot(name):
+            raise AttributeError(
+                "{} is frozen".format(type(self).__name__))
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("{} is frozen".format(type(self).__name__))
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(str(self))
+        return self._hash
+
+    def freeze(self):
+        return self
+
+    def __reduce__(self):
+        # the frozen classes are not module attributes, so snapshots are
+        # pickled and copied as a thawed copy which is frozen again
+        return (_refreeze, (self.thaw(),))
+
+    def thaw(self):
+        """
+        Return a mutable copy which shares storage with this snapshot until
+        it is used. Each list copies its items as thawed, mutable items the
+        first time it is read or changed, by position, iteration or a lookup
+        such as get, so the lists which are never used are never copied
+        """
+        thawed_class = self._thawed_class
+        thawed = object.__new__(thawed_class)
+        for slot in _slots(thawed_class):
+            try:
+                value = getattr(self, slot)
+            except AttributeError:
+                continue
+            if isinstance(value, FrozenList):
+                value = value.thaw()
+            object.__setattr__(thawed, slot, value)
+        return thawed
+
+
+def _refreeze(thawed):
+    return thawed.freeze()
+
+
+class FrozenList(Frozen):
+    """Mixin of frozen lists, any change raises TypeError"""
+
+    __slots__ = ()
+
+    def _own_items(self):
+        pass
+
+    def _writable(self):
+        raise TypeError("{} is frozen".format(type(self).__name__))
+
+    @property
+    def list(self):
+        return tuple(self)
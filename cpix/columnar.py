@@ -0,0 +1,455 @@
+"""
+Columnar content key list
+"""
+from . import etree, uuid, b64encode, NSMAP, PSKC, KeyID, to_key_id
+from .content_key import ContentKey, ContentKeyList, COMMON_ENCRYPTION_SCHEMES
+from .columns import decode_key_column, random_keys
+
+
+# size in bytes of key IDs, content keys and explicit IVs
+KEY_SIZE = 16
+EMPTY_KEY = bytes(KEY_SIZE)
+
+
+def _kid_bytes(kid):
+    """Return the 16 big endian bytes of a key ID"""
+    if isinstance(kid, uuid.UUID):
+        return kid.bytes
+    if isinstance(kid, (bytes, bytearray)) and len(kid) == KEY_SIZE:
+        return bytes(kid)
+    return to_key_id(kid).bytes
+
+
+def _scheme_code(common_encryption_scheme):
+    """Return the column code of a common encryption scheme"""
+    try:
+        return COMMON_ENCRYPTION_SCHEMES.index(common_encryption_scheme)
+    except ValueError:
+        raise TypeError(
+            "common_encryption_scheme must be: cenc, cbc1, cens or cbcs")
+
+
+def _is_packed(values, count):
+    """Return whether values is a packed column of 16 bytes per key"""
+    return (isinstance(values, (bytes, bytearray, memoryview)) and
+            len(values) == count * KEY_SIZE)
+
+
+def _key_column(values, count, name):
+    """
+    Pack an optional column of 16 byte values, either a bytes-like object of
+    count * 16 bytes or an iterable of 16 byte values or None
+
+    Returns a tuple of the packed values and the presence flags
+    """
+    if values is None:
+        return EMPTY_KEY * count, bytes(count)
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        data = bytes(values)
+        if len(data) != count * KEY_SIZE:
+            raise ValueError(
+                "{} must be {} bytes per key".format(name, KEY_SIZE))
+        return data, b"\x01" * count
+    values = list(values)
+    if len(values) != count:
+        raise ValueError("{} must have one value per key".format(name))
+    for value in values:
+        if value is not None and len(value) != KEY_SIZE:
+            raise ValueError("{} must be {} bytes".format(name, KEY_SIZE))
+    data = b"".join(EMPTY_KEY if v is None else v for v in values)
+    flags = bytes(0 if v is None else 1 for v in values)
+    return data, flags
+
+
+class ColumnarContentKeyList(ContentKeyList):
+    """
+    List of ContentKeys stored as columns
+
+    Key IDs, content keys and explicit IVs are held in contiguous buffers of
+    16 bytes per key and the common encryption scheme as a single byte per
+    key. ContentKey objects are created when an item is accessed and are
+    copies, so changes to them must be assigned back to the list.
+
+    Content keys and explicit IVs must be 16 bytes long.
+
+    The kid index used by get is updated incrementally when keys are
+    appended and rebuilt on the next lookup after any other change.
+    """
+
+    __slots__ = ("_kids", "_ceks", "_has_cek", "_ivs", "_has_iv",
+                 "_schemes", "_positions")
+
+    def __init__(self, *args, **kwargs):
+        self._clear()
+        super().__init__(*args, **kwargs)
+
+    def _clear(self):
+        self._kids = bytearray()
+        self._ceks = bytearray()
+        self._has_cek = bytearray()
+        self._ivs = bytearray()
+        self._has_iv = bytearray()
+        self._schemes = bytearray()
+        self._positions = {}
+
+    def _writable(self):
+        """
+        Copy the columns shared with a frozen list, called before the list
+        is changed
+        """
+        if isinstance(self._schemes, bytes):
+            self._kids = bytearray(self._kids)
+            self._ceks = bytearray(self._ceks)
+            self._has_cek = bytearray(self._has_cek)
+            self._ivs = bytearray(self._ivs)
+            self._has_iv = bytearray(self._has_iv)
+            self._schemes = bytearray(self._schemes)
+            self._positions = None
+
+    def _position(self, index):
+        length = len(self._schemes)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("list index out of range")
+        return index
+
+    def _row(self, value):
+        """Validate a ContentKey and return its column values"""
+        self.check(value)
+        cek = value.cek_bytes
+        explicit_iv = value.explicit_iv_bytes
+        if cek is not None and len(cek) != KEY_SIZE:
+            raise ValueError("cek must be {} bytes".format(KEY_SIZE))
+        if explicit_iv is not None and len(explicit_iv) != KEY_SIZE:
+            raise ValueError("explicit_iv must be {} bytes".format(KEY_SIZE))
+        return (
+            value.kid.bytes,
+            EMPTY_KEY if cek is None else cek,
+            0 if cek is None else 1,
+            EMPTY_KEY if explicit_iv is None else explicit_iv,
+            0 if explicit_iv is None else 1,
+            _scheme_code(value.common_encryption_scheme),
+        )
+
+    def _index_append(self, kids, first):
+        """Add appended kids starting at position first to the kid index"""
+        if self._positions is not None:
+            for offset in range(0, len(kids), KEY_SIZE):
+                self._positions.setdefault(
+                    bytes(kids[offset:offset + KEY_SIZE]),
+                    first + offset // KEY_SIZE)
+
+    def reindex(self):
+        self._positions = None
+
+    def _build_positions(self):
+        positions = {}
+        with memoryview(self._kids) as kids:
+            for offset in range(0, len(kids), KEY_SIZE):
+                positions.setdefault(
+                    bytes(kids[offset:offset + KEY_SIZE]), offset // KEY_SIZE)
+        self._positions = positions
+
+    def freeze(self):
+        frozen = super().freeze()
+        # built up front as frozen lists may be read by many threads
+        frozen._build_positions()
+        return frozen
+
+    def get(self, kid, default=None):
+        """
+        Return the ContentKey with kid, or default if there is none
+        """
+        if self._positions is None:
+            self._build_positions()
+        position = self._positions.get(_kid_bytes(kid))
+        if position is None:
+            return default
+        return self._view(position)
+
+    def _view(self, position):
+        """Create a ContentKey from the columns at position"""
+        start = position * KEY_SIZE
+        end = start + KEY_SIZE
+        return ContentKey._from_values(
+            KeyID(bytes=bytes(self._kids[start:end])),
+            bytes(self._ceks[start:end]) if self._has_cek[position] else None,
+            COMMON_ENCRYPTION_SCHEMES[self._schemes[position]],
+            bytes(self._ivs[start:end]) if self._has_iv[position] else None,
+        )
+
+    def __len__(self):
+        return len(self._schemes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view(i) for i in range(*index.indices(len(self)))]
+        return self._view(self._position(index))
+
+    def __iter__(self):
+        return (self._view(position) for position in range(len(self)))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(self)))
+            values = list(value)
+            if index.step in (None, 1):
+                rows = [self._row(v) for v in values]
+                del self[index]
+                for offset, row in enumerate(rows):
+                    self._insert_row(positions.start + offset, row)
+            elif len(values) != len(positions):
+                raise ValueError(
+                    "attempt to assign sequence of size {} to extended slice "
+                    "of size {}".format(len(values), len(positions)))
+            else:
+                for position, v in zip(positions, values):
+                    self[position] = v
+            return
+
+        self._writable()
+        position = self._position(index)
+        kid, cek, has_cek, explicit_iv, has_iv, scheme = self._row(value)
+        start = position * KEY_SIZE
+        end = start + KEY_SIZE
+        self._kids[start:end] = kid
+        self._ceks[start:end] = cek
+        self._has_cek[position] = has_cek
+        self._ivs[start:end] = explicit_iv
+        self._has_iv[position] = has_iv
+        self._schemes[position] = scheme
+        self.reindex()
+
+    def __delitem__(self, index):
+        self._writable()
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(self)))
+            if positions.step != 1:
+                for position in sorted(positions, reverse=True):
+                    del self[position]
+                return
+            first, last = positions.start, max(positions.start, positions.stop)
+        else:
+            first = self._position(index)
+            last = first + 1
+        del self._kids[first * KEY_SIZE:last * KEY_SIZE]
+        del self._ceks[first * KEY_SIZE:last * KEY_SIZE]
+        del self._has_cek[first:last]
+        del self._ivs[first * KEY_SIZE:last * KEY_SIZE]
+        del self._has_iv[first:last]
+        del self._schemes[first:last]
+        self.reindex()
+
+    def insert(self, index, value):
+        length = len(self)
+        if index < 0:
+            index = max(0, index + length)
+        self._insert_row(min(index, length), self._row(value))
+
+    def _insert_row(self, position, row):
+        self._writable()
+        kid, cek, has_cek, explicit_iv, has_iv, scheme = row
+        if position == len(self):
+            self._index_append(kid, position)
+        else:
+            self.reindex()
+        start = position * KEY_SIZE
+        self._kids[start:start] = kid
+        self._ceks[start:start] = cek
+        self._has_cek.insert(position, has_cek)
+        self._ivs[start:start] = explicit_iv
+        self._has_iv.insert(position, has_iv)
+        self._schemes.insert(position, scheme)
+
+    @property
+    def list(self):
+        return [self._view(i) for i in range(len(self))]
+
+    @list.setter
+    def list(self, l):
+        if not isinstance(l, list):
+            raise TypeError("must be a list")
+        self._writable()
+        rows = [self._row(x) for x in l]
+        self._clear()
+        for row in rows:
+            self._insert_row(len(self), row)
+
+    def columns(self):
+        """
+        Return a copy of the columns as a dict of bytes:
+            kid: 16 byte big endian key IDs
+            cek: 16 byte content keys, zeros where has_cek is 0
+            has_cek: one byte per key, 1 if the key has a cek
+            explicit_iv: 16 byte explicit IVs, zeros where has_explicit_iv is 0
+            has_explicit_iv: one byte per key, 1 if the key has an explicit IV
+            common_encryption_scheme: one byte per key, index into
+                COMMON_ENCRYPTION_SCHEMES
+        """
+        return {
+            "kid": bytes(self._kids),
+            "cek": bytes(self._ceks),
+            "has_cek": bytes(self._has_cek),
+            "explicit_iv": bytes(self._ivs),
+            "has_explicit_iv": bytes(self._has_iv),
+            "common_encryption_scheme": bytes(self._schemes),
+        }
+
+    def extend_columns(self, kids, ceks=None, explicit_ivs=None,
+                       common_encryption_scheme="cenc"):
+        """
+        Append keys column by column
+
+        kids may be a bytes-like object of 16 bytes per key or an iterable of
+        key IDs. ceks and explicit_ivs may be a bytes-like object of 16 bytes
+        per key or an iterable of 16 byte values or None. The
+        common_encryption_scheme is either applied to every key or given as
+        an iterable with one scheme per key, None is "cenc".
+
+        All columns are validated before any is modified.
+        """
+        if isinstance(kids, (bytes, bytearray, memoryview)):
+            kid_data = bytes(kids)
+            if len(kid_data) % KEY_SIZE:
+                raise ValueError(
+                    "kids must be {} bytes per key".format(KEY_SIZE))
+        else:
+            kid_data = b"".join(_kid_bytes(kid) for kid in kids)
+        count = len(kid_data) // KEY_SIZE
+
+        cek_data, has_cek = _key_column(ceks, count, "ceks")
+        iv_data, has_iv = _key_column(explicit_ivs, count, "explicit_ivs")
+
+        if (common_encryption_scheme is None or
+                isinstance(common_encryption_scheme, (str, bytes))):
+            schemes = bytes(
+                [_scheme_code(common_encryption_scheme or "cenc")]) * count
+        else:
+            schemes = bytes(_scheme_code("cenc" if s is None else s)
+                            for s in common_encryption_scheme)
+            if len(schemes) != count:
+                raise ValueError(
+                    "common_encryption_scheme must have one value per key")
+
+        self._writable()
+        self._index_append(kid_data, len(self))
+        self._kids += kid_data
+        self._ceks += cek_data
+        self._has_cek += has_cek
+        self._ivs += iv_data
+        self._has_iv += has_iv
+        self._schemes += schemes
+
+    @classmethod
+    def from_records(cls, kids, ceks=None, explicit_ivs=None,
+                     common_encryption_scheme="cenc"):
+        """
+        Create a ColumnarContentKeyList from columns of values, see
+        ContentKeyList.from_records. Packed columns of ceks and explicit_ivs
+        are stored without being split
+        """
+        if not isinstance(kids, (bytes, bytearray, memoryview)):
+            kids = [_kid_bytes(kid) for kid in kids]
+        count = (len(kids) if isinstance(kids, list)
+                 else len(kids) // KEY_SIZE)
+        if not _is_packed(ceks, count):
+            ceks = decode_key_column(ceks, count, "ceks")
+            if all(cek is None for cek in ceks):
+                ceks = None
+        if not _is_packed(explicit_ivs, count):
+            explicit_ivs = decode_key_column(
+                explicit_ivs, count, "explicit_ivs")
+            if all(explicit_iv is None for explicit_iv in explicit_ivs):
+                explicit_ivs = None
+        new_list = cls()
+        new_list.extend_columns(
+            kids, ceks, explicit_ivs, common_encryption_scheme)
+        return new_list
+
+    @classmethod
+    def generate(cls, count, common_encryption_scheme="cenc",
+                 explicit_iv=False, exclude=None):
+        """
+        Create a ColumnarContentKeyList of count new content keys, see
+        ContentKeyList.generate. The random material is stored as drawn,
+        without creating any objects per key
+        """
+        kids, ceks, explicit_ivs = random_keys(count, explicit_iv, exclude)
+        new_list = cls()
+        # the kid index is built on the first lookup
+        new_list.reindex()
+        new_list.extend_columns(
+            kids, ceks, explicit_ivs, common_encryption_scheme)
+        return new_list
+
+    def take(self, positions):
+        """
+        Return a new ColumnarContentKeyList with the keys at positions
+        """
+        positions = [self._position(p) for p in positions]
+        new_list = ColumnarContentKeyList()
+        with memoryview(self._kids) as kids, \
+                memoryview(self._ceks) as ceks, \
+                memoryview(self._ivs) as ivs:
+            new_list._kids += b"".join(
+                kids[p * KEY_SIZE:(p + 1) * KEY_SIZE] for p in positions)
+            new_list._ceks += b"".join(
+                ceks[p * KEY_SIZE:(p + 1) * KEY_SIZE] for p in positions)
+            new_list._ivs += b"".join(
+                ivs[p * KEY_SIZE:(p + 1) * KEY_SIZE] for p in positions)
+        new_list._has_cek += bytes(self._has_cek[p] for p in positions)
+        new_list._has_iv += bytes(self._has_iv[p] for p in positions)
+        new_list._schemes += bytes(self._schemes[p] for p in positions)
+        return new_list
+
+    def filter(self, common_encryption_scheme=None, predicate=None):
+        """
+        Return a new ColumnarContentKeyList with the keys using
+        common_encryption_scheme and, if given, for which predicate returns
+        True. The scheme filter runs on the columns without creating
+        ContentKey objects
+        """
+        positions = range(len(self))
+        if common_encryption_scheme is not None:
+            code = _scheme_code(common_encryption_scheme)
+            positions = [
+                p for p, scheme in enumerate(self._schemes) if scheme == code]
+        if predicate is not None:
+            positions = [p for p in positions if predicate(self._view(p))]
+        return self.take(positions)
+
+    def element(self):
+        """Returns XML element, built directly from the columns"""
+        el = etree.Element("ContentKeyList", nsmap=NSMAP)
+        secret_tag = "{{{pskc}}}Secret".format(pskc=PSKC)
+        plain_value_tag = "{{{pskc}}}PlainValue".format(pskc=PSKC)
+        with memoryview(self._kids) as kids, \
+                memoryview(self._ceks) as ceks, \
+                memoryview(self._ivs) as ivs:
+            for position, scheme in enumerate(self._schemes):
+                start = position * KEY_SIZE
+                end = start + KEY_SIZE
+                content_key = etree.SubElement(el, "ContentKey", nsmap=NSMAP)
+                content_key.set(
+                    "kid", str(uuid.UUID(bytes=bytes(kids[start:end]))))
+                content_key.set(
+                    "commonEncryptionScheme",
+                    COMMON_ENCRYPTION_SCHEMES[scheme])
+                if self._has_iv[position]:
+                    content_key.set(
+                        "explicitIV", str(b64encode(ivs[start:end]), "ascii"))
+                if self._has_cek[position]:
+                    data = etree.SubElement(content_key, "Data", nsmap=NSMAP)
+                    secret = etree.SubElement(data, secret_tag, nsmap=NSMAP)
+                    plain_value = etree.SubElement(
+                        secret, plain_value_tag, nsmap=NSMAP)
+                    plain_value.text = str(b64encode(ceks[start:end]), "ascii")
+        return el
+
+    @staticmethod
+    def parse(xml):
+        """
+        Parse and return new ColumnarContentKeyList
+        """
+        return ColumnarContentKeyList(ContentKeyList.parse(xml).list)
@@ -0,0 +1,137 @@
+"""
+Column helpers for the bulk list constructors
+"""
+import os
+from . import uuid, b64decode, BinasciiError, to_key_id
+
+
+# size in bytes of generated key IDs, content keys and explicit IVs
+KEY_SIZE = 16
+# tables setting the version 4 and RFC 4122 variant bits of random key IDs
+UUID4_VERSION = bytes((byte & 0x0f) | 0x40 for byte in range(256))
+UUID4_VARIANT = bytes((byte & 0x3f) | 0x80 for byte in range(256))
+
+
+def broadcast(values, count, name):
+    """
+    Return a list of count values, a single value (None, a string, bytes or
+    a uuid) is repeated for every entry, otherwise values must be an
+    iterable with one value per entry
+    """
+    if values is None or isinstance(values, (str, bytes, uuid.UUID)):
+        return [values] * count
+    values = list(values)
+    if len(values) != count:
+        raise ValueError("{} must have one value per kid".format(name))
+    return values
+
+
+def decode_column(values, count, name):
+    """
+    Return a list of count raw bytes values or None, each value may be raw
+    bytes, a base64 string or None. Repeated values are only decoded once
+    """
+    values = [bytes(value) if isinstance(value, bytearray) else value
+              for value in broadcast(values, count, name)]
+    decoded = {None: None}
+    for value in values:
+        if value in decoded:
+            continue
+        if isinstance(value, str):
+            try:
+                decoded[value] = b64decode(value)
+            except BinasciiError:
+                raise ValueError(
+                    "{} has an invalid base64 string".format(name))
+        elif isinstance(value, bytes):
+            decoded[value] = value
+        else:
+            raise TypeError(
+                "{} should be bytes or base64 strings".format(name))
+    return [decoded[value] for value in values]
+
+
+def decode_key_column(values, count, name):
+    """
+    Return a list of count 16 byte keys or None, see decode_column. A
+    bytes-like values is either a single key, used for every entry, or a
+    packed column of 16 bytes per entry
+    """
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        data = bytes(values)
+        if len(data) == KEY_SIZE:
+            return [data] * count
+        if len(data) != count * KEY_SIZE:
+            raise ValueError("{} must be {} bytes or {} bytes per kid".format(
+                name, KEY_SIZE, KEY_SIZE))
+        return [data[offset:offset + KEY_SIZE]
+                for offset in range(0, len(data), KEY_SIZE)]
+    decoded = decode_column(values, count, name)
+    for value in set(decoded):
+        if value is not None and len(value) != KEY_SIZE:
+            raise ValueError("{} must be {} bytes".format(name, KEY_SIZE))
+    return decoded
+
+
+def _packed_kids(kids):
+    """
+    Return the key IDs of a content key list or a collection of content
+    keys and key IDs as packed 16 byte big endian values
+    """
+    columns = getattr(kids, "columns", None)
+    if columns is not None:
+        return columns()["kid"]
+    kids = [getattr(kid, "kid", kid) for kid in kids]
+    return b"".join(kid.bytes if isinstance(kid, uuid.UUID)
+                    else to_key_id(kid).bytes for kid in kids)
+
+
+def _uuid4_kids(data):
+    """Set the version 4 and variant bits of packed random key IDs"""
+    kids = bytearray(data)
+    kids[6::KEY_SIZE] = kids[6::KEY_SIZE].translate(UUID4_VERSION)
+    kids[8::KEY_SIZE] = kids[8::KEY_SIZE].translate(UUID4_VARIANT)
+    return bytes(kids)
+
+
+def _prefixes(kids):
+    """Return the first 8 bytes of each packed key ID as integers"""
+    return memoryview(kids).cast("Q")[::2]
+
+
+def random_keys(count, explicit_iv=False, exclude=None):
+    """
+    Return random key material for count content keys as packed columns of
+    16 bytes per key: key IDs, which are version 4 UUIDs, content keys and
+    explicit IVs, or None without explicit_iv
+
+    All the material is drawn from the OS in a single call. The key IDs are
+    unique and distinct from those of exclude, a list of content keys or a
+    collection of content keys and key IDs
+    """
+    if not isinstance(count, int):
+        raise TypeError("count should be an int")
+    if count < 0:
+        raise ValueError("count should not be negative")
+    size = count * KEY_SIZE
+    data = os.urandom(size * (3 if explicit_iv else 2))
+    kids = _uuid4_kids(data[:size])
+    ceks = data[size:2 * size]
+    ivs = data[2 * size:] if explicit_iv else None
+
+    excluded = b"" if exclude is None else _packed_kids(exclude)
+    # distinct prefixes are distinct key IDs, which is checked on integers
+    prefixes = set(_prefixes(kids))
+    if len(prefixes) == count and prefixes.isdisjoint(_prefixes(excluded)):
+        return kids, ceks, ivs
+
+    seen = {excluded[offset:offset + KEY_SIZE]
+            for offset in range(0, len(excluded), KEY_SIZE)}
+    redrawn = bytearray()
+    for offset in range(0, size, KEY_SIZE):
+        kid = kids[offset:offset + KEY_SIZE]
+        while kid in seen:
+            kid = _uuid4_kids(os.urandom(KEY_SIZE))
+        redrawn += kid
+        seen.add(kid)
+    return bytes(redrawn), ceks, ivs
@@ -0,0 +1,289 @@
+"""
+Detection of usage rules matching the same tracks
+"""
+from collections import namedtuple
+from heapq import heappop, heappush
+from itertools import combinations, product
+from .matcher import VIDEO, AUDIO, _CompiledRule
+
+
+TrackRange = namedtuple(
+    "TrackRange",
+    ("type", "periods", "labels", "pixels", "fps", "hdr", "wcg", "channels",
+     "bitrate"))
+TrackRange.__doc__ = """
+Set of tracks, a track is in the set if each of its values is
+
+type is the track type or None for any type, periods and labels frozensets
+of period ids and labels or None for any. pixels, fps, channels and bitrate
+are inclusive (low, high) ranges with None for an open end, hdr and wcg
+True, False or None for either
+"""
+
+UsageRuleConflict = namedtuple("UsageRuleConflict",
+                               ("first", "second", "tracks"))
+UsageRuleConflict.__doc__ = """
+Two usage rules with different kids which both match some tracks
+
+first and second are the positions of the rules in the list, first before
+second, and tracks a tuple of the TrackRanges of the tracks both match
+"""
+
+UNBOUNDED = (None, None)
+# returned by _same when flags exclude each other
+EXCLUSIVE = object()
+
+
+def _intersect(a, b):
+    """Return the intersection of two inclusive ranges, or None if empty"""
+    low = a[0] if b[0] is None else b[0] if a[0] is None else max(a[0], b[0])
+    high = (a[1] if b[1] is None else b[1] if a[1] is None
+            else min(a[1], b[1]))
+    if low is not None and high is not None and low > high:
+        return None
+    return low, high
+
+
+def _same(a, b):
+    """Return the flag both a and b allow, EXCLUSIVE if there is none"""
+    if a is None or b is None or a == b:
+        return a if b is None else b
+    return EXCLUSIVE
+
+
+def _common(a, b):
+    """
+    Return the values of two sets, None for any value, both allow,
+    EXCLUSIVE if there are none
+    """
+    if a is None or b is None:
+        return a if b is None else b
+    return a & b or EXCLUSIVE
+
+
+def _video(first, second):
+    """Return (pixels, fps, hdr, wcg) of the tracks both video alts match"""
+    regions = []
+    for a, b in product(first or ((None,) * 6,), second or ((None,) * 6,)):
+        pixels = _intersect(a[0:2], b[0:2])
+        fps = _intersect(a[4:6], b[4:6])
+        hdr = _same(a[2], b[2])
+        wcg = _same(a[3], b[3])
+        if (pixels is not None and fps is not None and
+                hdr is not EXCLUSIVE and wcg is not EXCLUSIVE):
+            regions.append((pixels, fps, hdr, wcg))
+    return regions
+
+
+def _ranges(first, second):
+    """Return the intersections of two tuples of alternative ranges"""
+    regions = []
+    for a, b in product(first or (UNBOUNDED,), second or (UNBOUNDED,)):
+        region = _intersect(a, b)
+        if region is not None:
+            regions.append(region)
+    return regions
+
+
+def tracks_matched_by_both(first, second):
+    """
+    Return a tuple of the TrackRanges of the tracks two compiled rules both
+    match, empty if there are none
+    """
+    if first.track_type is False or second.track_type is False:
+        return ()
+    if (first.track_type is not None and second.track_type is not None and
+            first.track_type != second.track_type):
+        return ()
+    track_type = first.track_type or second.track_type
+    periods = _common(first.periods, second.periods)
+    labels = _common(first.labels, second.labels)
+    if periods is EXCLUSIVE or labels is EXCLUSIVE:
+        return ()
+    video = _video(first.video, second.video)
+    audio = _ranges(first.audio, second.audio)
+    bitrate = _ranges(first.bitrate, second.bitrate)
+    return tuple(
+        TrackRange(track_type, periods, labels, pixels, fps,
+                   hdr if first.video or second.video else None,
+                   wcg if first.video or second.video else None,
+                   channels, rate)
+        for (pixels, fps, hdr, wcg), channels, rate
+        in product(video, audio, bitrate))
+
+
+def _sweep(track_type, rules, others=None):
+    """
+    Generate the pairs of rules whose ranges on the indexed attribute of
+    track_type overlap, among rules or, with others, between rules and
+    others. Rules are visited in order of the start of their range while a
+    heap keeps those still open, so only overlapping pairs are visited
+    """
+    if not rules or (others is not None and not others):
+        return
+    events = []
+    for group, members in enumerate((rules, others or ())):
+        for rule in members:
+            low, high = rule.bounds(track_type)
+            events.append((float("-inf") if low is None else low,
+                           float("inf") if high is None else high,
+                           rule.position, group, rule))
+    events.sort(key=lambda event: (event[0], event[2]))
+    open_rules = ([], [])
+    for low, high, _, group, rule in events:
+        for members in open_rules:
+            while members and members[0][0] < low:
+                heappop(members)
+        candidates = open_rules[0 if others is None else 1 - group]
+        for _, _, other in candidates:
+            yield other, rule
+        heappush(open_rules[group], (high, rule.position, rule))
+
+
+def _typed_pairs(rules, others=None):
+    """
+    Generate the candidate pairs of rules, or of rules and others, sweeping
+    video rules on pixels, audio rules on channels and rules for any track
+    type on bitrate, the only filter they can have besides periods
+    """
+    groups = ({}, {})
+    for group, members in zip(groups, (rules, others or ())):
+        for rule in members:
+            if rule.track_type is not False:
+                group.setdefault(rule.track_type, []).append(rule)
+    typed = [[rule for track_type in (VIDEO, AUDIO)
+              for rule in group.get(track_type, ())] for group in groups]
+    untyped = [group.get(None, []) for group in groups]
+    if others is None:
+        for track_type in (VIDEO, AUDIO):
+            yield from _sweep(track_type, groups[0].get(track_type, []))
+        yield from _sweep(None, untyped[0])
+        yield from _sweep(None, untyped[0], typed[0])
+    else:
+        for track_type in (VIDEO, AUDIO):
+            yield from _sweep(track_type, groups[0].get(track_type, []),
+                              groups[1].get(track_type, []))
+        yield from _sweep(None, untyped[0], untyped[1] + typed[1])
+        yield from _sweep(None, typed[0], untyped[1])
+
+
+def _classes(usage_rules):
+    """
+    Compile usage rules and group those with the same filters, returns the
+    groups, each in order, and a dict of group number to a dict of the
+    numbers of the groups whose rules match some of the same tracks, itself
+    included, to the TrackRanges of those tracks
+
+    Groups are split by period, groups without period filters apply to every
+    period, and the overlapping groups of each period are found with a sweep
+    over the pixels, channels or bitrate ranges of the rules, so only groups
+    which overlap there are compared
+    """
+    groups = {}
+    compiled = {}
+    for position, usage_rule in enumerate(usage_rules):
+        rule = _CompiledRule(usage_rule, position, compiled)
+        key = (rule.track_type, rule.periods, rule.labels, rule.video,
+               rule.audio, rule.bitrate)
+        groups.setdefault(key, []).append(rule)
+    groups = list(groups.values())
+    # the first rule of each group stands for the group
+    numbers = {members[0].position: number
+               for number, members in enumerate(groups)}
+    firsts = [members[0] for members in groups]
+
+    by_period = {}
+    any_period = []
+    for rule in firsts:
+        if rule.periods is None:
+            any_period.append(rule)
+        else:
+            for period in rule.periods:
+                by_period.setdefault(period, []).append(rule)
+    candidates = [_typed_pairs(any_period)]
+    candidates.append(_typed_pairs(
+        any_period, [rule for rule in firsts if rule.periods is not None]))
+    candidates.extend(_typed_pairs(members) for members in by_period.values()
+                      if len(members) > 1)
+
+    neighbours = {}
+    for number, members in enumerate(groups):
+        # rules with the same filters only conflict if their kids differ
+        if len(members) > 1 and any(rule.kid != members[0].kid
+                                    for rule in members):
+            tracks = tracks_matched_by_both(members[0], members[0])
+            if tracks:
+                neighbours.setdefault(number, {})[number] = tracks
+    for pairs in candidates:
+        for a, b in pairs:
+            a, b = numbers[a.position], numbers[b.position]
+            if b in neighbours.get(a, ()):
+                continue
+            tracks = tracks_matched_by_both(firsts[a], firsts[b])
+            if tracks:
+                neighbours.setdefault(a, {})[b] = tracks
+                neighbours.setdefault(b, {})[a] = tracks
+    return groups, neighbours
+
+
+def usage_rule_conflicts(usage_rules):
+    """
+    Return the UsageRuleConflicts of a sequence of usage rules, every pair
+    of rules with different kids which match the same tracks, ordered by
+    position. Rules with the same filters are compared once
+    """
+    groups, neighbours = _classes(usage_rules)
+    conflicts = []
+    for a, adjacent in neighbours.items():
+        for b, tracks in adjacent.items():
+            if b < a:
+                continue
+            if a == b:
+                pairs = combinations(groups[a], 2)
+            else:
+                pairs = product(groups[a], groups[b])
+            for first, second in pairs:
+                if first.kid == second.kid:
+                    continue
+                if first.position > second.position:
+                    first, second = second, first
+                conflicts.append(UsageRuleConflict(
+                    first.position, second.position, tracks))
+    conflicts.sort()
+    return conflicts
+
+
+def first_conflicts(usage_rules):
+    """
+    Return a UsageRuleConflict for each rule which matches tracks of an
+    earlier rule with a different kid, with the earliest such rule, ordered
+    by position. Unlike usage_rule_conflicts the result grows with the
+    number of rules, not of pairs
+    """
+    groups, neighbours = _classes(usage_rules)
+    # the first rule of each group and its first rule with another kid
+    heads = []
+    for members in groups:
+        other = None
+        if len(members) > 1:
+            other = next((rule for rule in members
+                          if rule.kid != members[0].kid), None)
+        heads.append((members[0], other))
+
+    conflicts = []
+    for number, adjacent in neighbours.items():
+        for rule in groups[number]:
+            earliest = None
+            for other_number, tracks in adjacent.items():
+                first, other = heads[other_number]
+                candidate = first if first.kid != rule.kid else other
+                if (candidate is not None and
+                        candidate.position < rule.position and
+                        (earliest is None or
+                         candidate.position < earliest.first)):
+                    earliest = UsageRuleConflict(
+                        candidate.position, rule.position, tracks)
+            if earliest is not None:
+                conflicts.append(earliest)
+    conflicts.sort(key=lambda conflict: conflict.second)
+    return conflicts
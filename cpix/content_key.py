@@ -1,20 +1,131 @@
 """
 Content key classes
 """
-from . import etree, uuid, b64decode, BinasciiError, NSMAP, PSKC
+from . import etree, uuid, b16encode, b64decode, b64encode, BinasciiError, \
+    NSMAP, PSKC, KeyID, to_key_id
 from .base import CPIXComparableBase, CPIXListBase
+from .columns import broadcast, decode_key_column, random_keys, KEY_SIZE
+from operator import attrgetter
+
+
+COMMON_ENCRYPTION_SCHEMES = ("cenc", "cbc1", "cens", "cbcs")
 
 
 class ContentKeyList(CPIXListBase):
-    """List of ContentKeys"""
+    """List of ContentKeys, indexed by kid"""
+
+    __slots__ = ()
+
+    index_keys = {"kid": attrgetter("kid")}
 
     def check(self, value):
         if not isinstance(value, ContentKey):
             raise TypeError("{} is not a ContentKey".format(value))
 
+    @classmethod
+    def from_records(cls, kids, ceks=None, explicit_ivs=None,
+                     common_encryption_scheme="cenc"):
+        """
+        Create a list of ContentKeys from columns of values
+
+        ceks and explicit_ivs may be None, a single value used for every key
+        or an iterable with one value per key, where each value is 16 raw
+        bytes, a base64 string or None. They may also be a bytes-like object
+        of 16 bytes per key. common_encryption_scheme is either a single
+        scheme or an iterable of one scheme per key, None is "cenc".
+
+        Each column is validated as a whole before any ContentKey is created
+        """
+        kids = [to_key_id(kid) for kid in kids]
+        count = len(kids)
+        ceks = decode_key_column(ceks, count, "ceks")
+        explicit_ivs = decode_key_column(explicit_ivs, count, "explicit_ivs")
+        schemes = broadcast(
+            common_encryption_scheme, count, "common_encryption_scheme")
+        schemes = ["cenc" if scheme is None else scheme for scheme in schemes]
+        if not set(schemes).issubset(COMMON_ENCRYPTION_SCHEMES):
+            raise TypeError(
+                "common_encryption_scheme must be: cenc, cbc1, cens or cbcs")
+        return cls._from_checked([
+            ContentKey._from_values(kid, cek, scheme, explicit_iv)
+            for kid, cek, scheme, explicit_iv
+            in zip(kids, ceks, schemes, explicit_ivs)
+        ])
+
+    @classmethod
+    def generate(cls, count, common_encryption_scheme="cenc",
+                 explicit_iv=False, exclude=None):
+        """
+        Create a list of count new content keys with random version 4 UUID
+        kids and random content keys, and explicit IVs with explicit_iv
+
+        The random material is drawn from the OS in one call. The kids are
+        unique and distinct from those of exclude, a list of content keys or
+        a collection of key IDs such as an existing document's keys
+
+        The list is built from the drawn bytes in one step, but each key is
+        still a ContentKey object, a few microseconds per key.
+        ColumnarContentKeyList.generate is the bulk path, it stores the same
+        bytes as columns and creates a million keys in well under a second
+        """
+        if common_encryption_scheme not in COMMON_ENCRYPTION_SCHEMES:
+            raise TypeError(
+                "common_encryption_scheme must be: cenc, cbc1, cens or cbcs")
+        kids, ceks, explicit_ivs = random_keys(count, explicit_iv, exclude)
+        return cls._from_checked([
+            ContentKey._from_values(
+                KeyID._from_bytes(kids[offset:offset + KEY_SIZE]),
+                ceks[offset:offset + KEY_SIZE], common_encryption_scheme,
+                None if explicit_ivs is None
+                else explicit_ivs[offset:offset + KEY_SIZE])
+            for offset in range(0, len(kids), KEY_SIZE)
+        ])
+
+    def to_numpy(self):
+        """
+        Return a NumPy structured array with one row per content key, the
+        common encryption scheme is stored as its index in
+        COMMON_ENCRYPTION_SCHEMES. Content keys and explicit IVs must be 16
+        bytes
+        """
+        from .interop import content_keys_to_numpy
+        return content_keys_to_numpy(self)
+
+    @classmethod
+    def from_numpy(cls, array):
+        """
+        Create a list from a NumPy structured array, as returned by to_numpy
+        """
+        from .interop import content_keys_from_numpy
+        return content_keys_from_numpy(cls, array)
+
+    def to_arrow(self):
+        """
+        Return a pyarrow Table with one row per content key
+        """
+        from .interop import content_keys_to_arrow
+        return content_keys_to_arrow(self)
+
+    @classmethod
+    def from_arrow(cls, table):
+        """
+        Create a list from a pyarrow Table, as returned by to_arrow
+        """
+        from .interop import content_keys_from_arrow
+        return content_keys_from_arrow(cls, table)
+
+    def get(self, kid, default=None):
+        """
+        Return the ContentKey with kid, or default if there is none
+        """
+        content_keys = self._lookup("kid", to_key_id(kid))
+        if content_keys:
+            return content_keys[0]
+        return default
+
     def element(self):
         el = etree.Element("ContentKeyList", nsmap=NSMAP)
-        for content_key in self:
+        for content_key in self._list:
             el.append(content_key.element())
         return el
 
@@ -43,34 +154,61 @@ class ContentKey(CPIXComparableBase):
         kid: key ID
     And child element:
         Data: data element containing content encryption key
+
+    The content key and explicit IV are stored as raw bytes, the base64
+    representations are only encoded when first requested and then cached
     """
 
-    def __init__(self, kid, cek=None, common_encryption_scheme=None, explicit_iv=None):
+    __slots__ = ("_kid", "_cek", "_cek_b64", "_common_encryption_scheme",
+                 "_explicit_iv", "_explicit_iv_b64")
+
+    def __init__(self, kid, cek=None, common_encryption_scheme=None,
+                 explicit_iv=None):
         self._kid = None
         self._cek = None
+        self._cek_b64 = None
         self._common_encryption_scheme = None
         self._explicit_iv = None
+        self._explicit_iv_b64 = None
         self.kid = kid
         self.cek = cek
         self.common_encryption_scheme = common_encryption_scheme
         self.explicit_iv = explicit_iv
 
+    @staticmethod
+    def _from_values(kid, cek, common_encryption_scheme, explicit_iv):
+        """
+        Create a ContentKey from already validated values, skipping the
+        property setters. kid must be a KeyID, cek and explicit_iv raw bytes
+        or None
+        """
+        content_key = ContentKey.__new__(ContentKey)
+        content_key._kid = kid
+        content_key._cek = cek
+        content_key._cek_b64 = None
+        content_key._common_encryption_scheme = common_encryption_scheme
+        content_key._explicit_iv = explicit_iv
+        content_key._explicit_iv_b64 = None
+        return content_key
+
     @property
     def kid(self):
         return self._kid
 
     @kid.setter
     def kid(self, kid):
-        if isinstance(kid, str):
-            self._kid = uuid.UUID(kid)
-        elif isinstance(kid, uuid.UUID):
-            self._kid = kid
+        if isinstance(kid, (str, uuid.UUID)):
+            self._kid = to_key_id(kid)
         else:
             raise TypeError("kid should be a uuid")
 
     @property
     def cek(self):
-        return self._cek
+        if self._cek is None:
+            return None
+        if self._cek_b64 is None:
+            self._cek_b64 = str(b64encode(self._cek), "ascii")
+        return self._cek_b64
 
     @cek.setter
     def cek(self, cek):
@@ -78,13 +216,30 @@ class ContentKey(CPIXComparableBase):
             return
         if isinstance(cek, (str, bytes)):
             try:
-                b64decode(cek)
+                self.cek_bytes = b64decode(cek)
             except BinasciiError:
                 raise ValueError("cek is not a valid base64 string")
-            self._cek = cek
         else:
             raise TypeError("cek should be a base64 string")
 
+    @property
+    def cek_bytes(self):
+        return self._cek
+
+    @cek_bytes.setter
+    def cek_bytes(self, cek_bytes):
+        if isinstance(cek_bytes, (bytes, bytearray)):
+            self._cek = bytes(cek_bytes)
+            self._cek_b64 = None
+        else:
+            raise TypeError("cek_bytes should be bytes")
+
+    @property
+    def cek_hex(self):
+        if self._cek is None:
+            return None
+        return str(b16encode(self._cek), "ascii")
+
     @property
     def common_encryption_scheme(self):
         return self._common_encryption_scheme
@@ -98,7 +253,7 @@ class ContentKey(CPIXComparableBase):
             common_encryption_scheme = str(common_encryption_scheme)
         if isinstance(
             common_encryption_scheme, str
-        ) and common_encryption_scheme in ["cenc", "cbc1", "cens", "cbcs"]:
+        ) and common_encryption_scheme in COMMON_ENCRYPTION_SCHEMES:
             self._common_encryption_scheme = common_encryption_scheme
         else:
             raise TypeError(
@@ -107,7 +262,11 @@ class ContentKey(CPIXComparableBase):
 
     @property
     def explicit_iv(self):
-        return self._explicit_iv
+        if self._explicit_iv is None:
+            return None
+        if self._explicit_iv_b64 is None:
+            self._explicit_iv_b64 = str(b64encode(self._explicit_iv), "ascii")
+        return self._explicit_iv_b64
 
     @explicit_iv.setter
     def explicit_iv(self, explicit_iv):
@@ -115,13 +274,30 @@ class ContentKey(CPIXComparableBase):
             return
         if isinstance(explicit_iv, (str, bytes)):
             try:
-                b64decode(explicit_iv)
+                self.explicit_iv_bytes = b64decode(explicit_iv)
             except BinasciiError:
                 raise ValueError("explicit_iv is not a valid base64 string")
-            self._explicit_iv = explicit_iv
         else:
             raise TypeError("explicit_iv should be a base64 string")
 
+    @property
+    def explicit_iv_bytes(self):
+        return self._explicit_iv
+
+    @explicit_iv_bytes.setter
+    def explicit_iv_bytes(self, explicit_iv_bytes):
+        if isinstance(explicit_iv_bytes, (bytes, bytearray)):
+            self._explicit_iv = bytes(explicit_iv_bytes)
+            self._explicit_iv_b64 = None
+        else:
+            raise TypeError("explicit_iv_bytes should be bytes")
+
+    @property
+    def explicit_iv_hex(self):
+        if self._explicit_iv is None:
+            return None
+        return str(b16encode(self._explicit_iv), "ascii")
+
     def element(self):
         """Returns XML element"""
         el = etree.Element("ContentKey", nsmap=NSMAP)
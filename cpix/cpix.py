@@ -2,11 +2,16 @@
 Root CPIX class
 """
 from . import etree, ContentKeyList, DRMSystemList, UsageRuleList, PeriodList,\
-    KeyPeriodFilter, XSI, NSMAP
+    XSI, NSMAP, validate as validate_xml
 from .base import CPIXComparableBase
+from .memory import memory_usage
+from .validation import content_errors, schema_errors, ContentError
 
 
 class CPIX(CPIXComparableBase):
+    __slots__ = ("_content_keys", "_drm_systems", "_usage_rules", "_periods",
+                 "_content_id", "_version")
+
     def __init__(self,
                  content_keys=None,
                  drm_systems=None,
@@ -162,71 +167,84 @@ class CPIX(CPIXComparableBase):
 
         return new_cpix
 
+    def memory_usage(self, deep=True):
+        """
+        Return the bytes used by the document per section (content_keys,
+        drm_systems, periods, usage_rules and cpix for the root) and in
+        total. With deep the referenced values are counted too and broken
+        down per payload type
+        """
+        return memory_usage(self, deep)
+
+    def validate(self, strict=False):
+        """
+        Validate the document against the CPIX schema constraints, checked on
+        the objects so the document is not serialized, see
+        cpix.validation.schema_errors
+
+        With strict the serialized document is also validated against the
+        XSD if the objects are valid. Returns a tuple of valid true/false
+        and a list of ContentErrors
+        """
+        errors = list(schema_errors(self))
+        if strict and len(errors) == 0:
+            valid, error = validate_xml(etree.tostring(self.element()))
+            if not valid:
+                errors.append(ContentError(str(error), "/CPIX", "schema"))
+        return (len(errors) == 0, errors)
+
     # content check functions
+    def content_errors(self, rules=None):
+        """
+        Generate the ContentErrors of the document for the named rules, by
+        default DEFAULT_CONTENT_RULES, see cpix.validation.content_errors
+        """
+        return content_errors(self, rules)
+
+    def _check(self, rules):
+        errors = list(self.content_errors(rules))
+        return (len(errors) == 0, errors)
+
     def check_usage_rules(self):
         """
         Checks each usage rule references a valid content key
         """
-        keys = [key.kid for key in self.content_keys]
-        errors = []
-
-        for usage_rule in self.usage_rules:
-            if usage_rule.kid not in keys:
-                errors.append(
-                    "usage rule references missing kid: {kid}".format(
-                        kid=usage_rule.kid))
-        if len(errors) == 0:
-            return (True, errors)
-        else:
-            return (False, errors)
+        return self._check({"usage-rule-kid"})
 
     def check_drm_systems(self):
         """
         Checks each drm system references a valid content key
         """
-        keys = [key.kid for key in self.content_keys]
-        errors = []
-
-        for drm_system in self.drm_systems:
-            if drm_system.kid not in keys:
-                errors.append(
-                    "DRM system references missing kid: {kid}".format(
-                        kid=drm_system.kid))
-        if len(errors) == 0:
-            return (True, errors)
-        else:
-            return (False, errors)
+        return self._check({"drm-system-kid"})
 
     def check_period_filters(self):
         """
         Checks each period filter references a valid period
         """
-        periods = [period.id for period in self.periods]
-        errors = []
-
-        for usage_rule in self.usage_rules:
-            for filter in usage_rule:
-                if (isinstance(filter, KeyPeriodFilter) and
-                        filter.period_id not in periods):
-                    errors.append(
-                        "period filter references missing period: {id}".format(
-                            id=filter.period_id))
-        if len(errors) == 0:
-            return (True, errors)
-        else:
-            return (False, errors)
+        return self._check({"period-filter"})
 
-    def validate_content(self):
+    def validate_content(self, fail_fast=False, rules=None):
         """
         Confirms content is valid:
             usage rules must reference a valid content key
             drm systems must reference a valid content key
             period filters in usage rules must reference a valid period
+        rules names the rules to check instead, CONTENT_RULES adds:
+            content key kids and period ids must be unique
+            periods with start and end times must not overlap
+            key IDs in drm system PSSH boxes must be valid content keys
+            drm system PSSH must be PSSH boxes
+            usage rules with different kids must not match the same tracks
+
+        The errors are ContentErrors, strings which also carry the path of
+        the element with the error. With fail_fast validation stops at the
+        first error
         """
         errors = []
-        errors += self.check_usage_rules()[1]
-        errors += self.check_drm_systems()[1]
-        errors += self.check_period_filters()[1]
+        for error in self.content_errors(rules):
+            errors.append(error)
+            if fail_fast:
+                break
 
         if len(errors) == 0:
             return (True, errors)
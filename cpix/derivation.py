@@ -0,0 +1,210 @@
+"""
+Deterministic derivation of key IDs and content keys
+"""
+import hashlib
+import hmac
+from . import uuid
+from .key_id import KeyID
+from .content_key import ContentKey, ContentKeyList, COMMON_ENCRYPTION_SCHEMES
+from .columns import KEY_SIZE
+
+
+# namespace of the version 5 UUID key IDs derived by default
+KEY_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "urn:dashif:org:cpix")
+# minimum size in bytes of a master secret
+MIN_SECRET_SIZE = 16
+# maximum number of content IDs whose HKDF pseudorandom keys are remembered
+PRK_CACHE_SIZE = 65536
+
+# tables setting the version 5 and RFC 4122 variant bits of key IDs
+UUID5_VERSION = bytes((byte & 0x0f) | 0x50 for byte in range(256))
+UUID5_VARIANT = bytes((byte & 0x3f) | 0x80 for byte in range(256))
+
+
+def _check_name(value, name):
+    if not isinstance(value, str):
+        raise TypeError("{} should be a string".format(name))
+    return value
+
+
+def _period_id(period):
+    """Return the id of a Period, or a period id, "" for None"""
+    if period is None:
+        return ""
+    period = _check_name(getattr(period, "id", period), "period")
+    if "/" in period:
+        raise ValueError("period should not contain /")
+    return period
+
+
+def _check_scheme(common_encryption_scheme):
+    if common_encryption_scheme not in COMMON_ENCRYPTION_SCHEMES:
+        raise TypeError(
+            "common_encryption_scheme must be: cenc, cbc1, cens or cbcs")
+
+
+def _uuid5_kids(data):
+    """Set the version 5 and variant bits of packed hashed key IDs"""
+    kids = bytearray(data)
+    kids[6::KEY_SIZE] = kids[6::KEY_SIZE].translate(UUID5_VERSION)
+    kids[8::KEY_SIZE] = kids[8::KEY_SIZE].translate(UUID5_VARIANT)
+    return bytes(kids)
+
+
+def _distinct(values, name):
+    """Return the distinct values of a name or an iterable of names"""
+    if isinstance(values, str):
+        values = (values,)
+    return list(dict.fromkeys(_check_name(value, name) for value in values))
+
+
+class KeyDerivation(object):
+    """
+    Derives key IDs and content keys from a master secret, so every holder
+    of the secret computes the same keys without exchanging them
+
+    The key ID of a track of a period of some content is the version 5 UUID,
+    in namespace, of the name "content_id/track/period", with an empty period
+    for none. Tracks and periods may not contain "/", which keeps names
+    distinct.
+
+    The content key of a key ID is the first 16 bytes of HKDF-SHA256 (RFC
+    5869) of the master secret, with the content ID as salt and the key ID's
+    bytes as info. The pseudorandom key extracted for each content ID is
+    remembered, so deriving keys of the same content only runs the expand
+    step
+    """
+
+    __slots__ = ("_master_secret", "_namespace", "_prks")
+
+    def __init__(self, master_secret, namespace=KEY_ID_NAMESPACE):
+        if not isinstance(master_secret, bytes):
+            raise TypeError("master_secret should be bytes")
+        if len(master_secret) < MIN_SECRET_SIZE:
+            raise ValueError("master_secret must be >= {} bytes".format(
+                MIN_SECRET_SIZE))
+        if not isinstance(namespace, uuid.UUID):
+            raise TypeError("namespace should be a uuid")
+        self._master_secret = master_secret
+        self._namespace = namespace
+        self._prks = {}
+
+    def _name_hash(self, content_id):
+        """Return a SHA1 hash of the namespace and content ID to be copied"""
+        return hashlib.sha1(self._namespace.bytes + _check_name(
+            content_id, "content_id").encode("utf-8") + b"/")
+
+    def _expander(self, content_id):
+        """
+        Return an HMAC-SHA256 keyed with the pseudorandom key of content_id,
+        to be copied for each key
+        """
+        try:
+            return self._prks[content_id]
+        except KeyError:
+            pass
+        salt = _check_name(content_id, "content_id").encode("utf-8")
+        prk = hmac.new(salt, self._master_secret, hashlib.sha256).digest()
+        if len(self._prks) >= PRK_CACHE_SIZE:
+            self._prks.clear()
+        # keyed once, copies skip hashing the padded key for each HMAC
+        expander = self._prks[content_id] = hmac.new(
+            prk, digestmod=hashlib.sha256)
+        return expander
+
+    @staticmethod
+    def _hashed_kids(name_hash, names):
+        """
+        Return the packed SHA1 hashes of the names, encoded "track/period",
+        of a content ID, before the version bits are set
+        """
+        hashed = []
+        for name in names:
+            sha = name_hash.copy()
+            sha.update(name)
+            hashed.append(sha.digest()[:KEY_SIZE])
+        return b"".join(hashed)
+
+    @staticmethod
+    def _ceks(expander, kids):
+        """Return the packed content keys of packed key IDs"""
+        ceks = []
+        for offset in range(0, len(kids), KEY_SIZE):
+            mac = expander.copy()
+            # the first block of the expand step, T(1) = HMAC(PRK, info | 1)
+            mac.update(kids[offset:offset + KEY_SIZE] + b"\x01")
+            ceks.append(mac.digest()[:KEY_SIZE])
+        return b"".join(ceks)
+
+    def key_id(self, content_id, track, period=None):
+        """
+        Return the KeyID of a track of a period, a Period or period id, of
+        content_id
+        """
+        track = _check_name(track, "track")
+        if "/" in track:
+            raise ValueError("track should not contain /")
+        name = "{}/{}".format(track, _period_id(period)).encode("utf-8")
+        return KeyID._from_bytes(_uuid5_kids(
+            self._hashed_kids(self._name_hash(content_id), (name,))))
+
+    def cek(self, content_id, key_id):
+        """Return the 16 byte content key of a key ID of content_id"""
+        if not isinstance(key_id, uuid.UUID):
+            raise TypeError("key_id should be a uuid")
+        return self._ceks(self._expander(content_id), key_id.bytes)
+
+    def content_key(self, content_id, track, period=None,
+                    common_encryption_scheme="cenc"):
+        """Return the ContentKey of a track of a period of content_id"""
+        _check_scheme(common_encryption_scheme)
+        key_id = self.key_id(content_id, track, period)
+        return ContentKey._from_values(
+            key_id, self.cek(content_id, key_id), common_encryption_scheme,
+            None)
+
+    def content_keys(self, content_ids, tracks, periods=None,
+                     common_encryption_scheme="cenc", cls=ContentKeyList):
+        """
+        Return a content key list, of class cls, with the keys of every
+        track of every period of every content ID, ordered by content ID,
+        then period, then track
+
+        content_ids and tracks are names or iterables of names and periods
+        an iterable of Periods or period ids, such as a PeriodList, or None
+        for keys without periods. Repeated values are derived once. Columnar
+        lists are built from packed columns, without objects per key
+        """
+        _check_scheme(common_encryption_scheme)
+        content_ids = _distinct(content_ids, "content_id")
+        tracks = _distinct(tracks, "track")
+        if any("/" in track for track in tracks):
+            raise ValueError("track should not contain /")
+        periods = [""] if periods is None else list(
+            dict.fromkeys(_period_id(period) for period in periods))
+
+        names = ["{}/{}".format(track, period).encode("utf-8")
+                 for period in periods for track in tracks]
+
+        kids = []
+        ceks = []
+        for content_id in content_ids:
+            content_kids = _uuid5_kids(
+                self._hashed_kids(self._name_hash(content_id), names))
+            kids.append(content_kids)
+            ceks.append(self._ceks(self._expander(content_id), content_kids))
+        kids = b"".join(kids)
+        ceks = b"".join(ceks)
+
+        if hasattr(cls, "extend_columns"):
+            new_list = cls()
+            # the kid index is built on the first lookup
+            new_list.reindex()
+            new_list.extend_columns(kids, ceks, None, common_encryption_scheme)
+            return new_list
+        return cls._from_checked([
+            ContentKey._from_values(
+                KeyID._from_bytes(kids[offset:offset + KEY_SIZE]),
+                ceks[offset:offset + KEY_SIZE], common_encryption_scheme, None)
+            for offset in range(0, len(kids), KEY_SIZE)
+        ])
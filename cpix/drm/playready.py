@@ -2,17 +2,21 @@
 Functions for manipulating Playready DRM
 """
 from base64 import b16decode, b16encode, b64decode, b64encode
+import hashlib
 import uuid
 import warnings
-from Crypto.Hash import SHA256
 from Crypto.Cipher import AES
 from construct.core import Prefixed, Struct, Const, Int8ub, Int24ub, Int32ub, \
     Bytes, GreedyBytes, PrefixedArray, Default, If, this
 from lxml import etree
+from ..key_id import to_key_id
 
 
 PLAYREADY_SYSTEM_ID = uuid.UUID("9a04f079-9840-4286-ab92-e65be0885f95")
 
+# content keys are the XOR of the halves of SHA256 digests
+HALF_DIGEST_MASK = (1 << 128) - 1
+
 # Construct for a Playready PSSH box
 pssh_box = Prefixed(
     Int32ub,
@@ -28,50 +32,98 @@ pssh_box = Prefixed(
 )
 
 
-def generate_content_key(key_id, key_seed):
+def _seed_hash(key_seed):
     """
-    Generate content key from key ID
+    Check and decode a key seed, returns the seed and a SHA256 hash of it
+    to be copied for each key
     """
     if len(key_seed) < 30:
         raise Exception("seed must be >= 30 bytes")
     key_seed = b64decode(key_seed)
+    return key_seed, hashlib.sha256(key_seed)
+
+
+def _key_id_bytes(key_id):
+    if isinstance(key_id, uuid.UUID):
+        # KeyIDs cache their bytes, plain UUIDs need no conversion
+        return key_id.bytes_le
     # key ID should be a UUID
-    if isinstance(key_id, str):
-        key_id = uuid.UUID(key_id)
-    elif isinstance(key_id, bytes):
-        key_id = uuid.UUID(str(key_id, "ASCII"))
-    elif isinstance(key_id, uuid.UUID):
-        pass
-    else:
+    try:
+        return to_key_id(key_id).bytes_le
+    except TypeError:
         raise TypeError("key_id should be a uuid")
 
-    key_id = key_id.bytes_le
 
-    sha = SHA256.new()
-    sha.update(key_seed)
-    sha.update(key_id)
-    sha_a = [x for x in sha.digest()]
+def _derive_content_keys(key_seed, seed_hash, key_ids):
+    """
+    Derive the content key of each key ID, given as bytes_le
 
-    sha = SHA256.new()
-    sha.update(key_seed)
-    sha.update(key_id)
-    sha.update(key_seed)
-    sha_b = [x for x in sha.digest()]
+    The three digests are of seed + kid, seed + kid + seed and
+    seed + kid + seed + kid, so each extends the previous one's hash state.
+    The halves of the digests are XORed as integers
+    """
+    content_keys = []
+    for key_id in key_ids:
+        sha = seed_hash.copy()
+        sha.update(key_id)
+        sha_a = sha.digest()
+        sha.update(key_seed)
+        sha_b = sha.digest()
+        sha.update(key_id)
+        sha_c = sha.digest()
+        value = (int.from_bytes(sha_a, "big") ^ int.from_bytes(sha_b, "big") ^
+                 int.from_bytes(sha_c, "big"))
+        content_keys.append(b16encode(
+            ((value >> 128) ^ (value & HALF_DIGEST_MASK)).to_bytes(16, "big")))
+    return content_keys
+
+
+def _derive_chunk(key_seed, key_ids):
+    """Derive content keys in a worker process"""
+    return _derive_content_keys(key_seed, hashlib.sha256(key_seed), key_ids)
 
-    sha = SHA256.new()
-    sha.update(key_seed)
-    sha.update(key_id)
-    sha.update(key_seed)
-    sha.update(key_id)
-    sha_c = [x for x in sha.digest()]
 
-    content_key = b""
-    for i in range(16):
-        content_key += (
-            sha_a[i] ^ sha_a[i + 16] ^ sha_b[i] ^ sha_b[i + 16] ^ sha_c[i] ^
-            sha_c[i + 16]).to_bytes(1, byteorder='big')
+def generate_content_key(key_id, key_seed):
+    """
+    Generate content key from key ID
+    """
+    key_seed, seed_hash = _seed_hash(key_seed)
+    return _derive_content_keys(
+        key_seed, seed_hash, [_key_id_bytes(key_id)])[0]
+
 
-    return b16encode(content_key)
+def generate_content_keys(key_ids, key_seed, workers=1):
+    """
+    Generate the content keys of many key IDs from one key seed, in order
+
+    Gives the same keys as generate_content_key, the seed is decoded and
+    hashed once. With workers greater than 1 the key IDs are split into
+    chunks derived on a pool of that many processes, None uses a process
+    per CPU
+    """
+    from os import cpu_count
+
+    key_seed, seed_hash = _seed_hash(key_seed)
+    key_ids = [_key_id_bytes(key_id) for key_id in key_ids]
+    if workers is None:
+        workers = cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if workers == 1 or len(key_ids) < 2:
+        return _derive_content_keys(key_seed, seed_hash, key_ids)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # a few chunks per worker to even out the load
+    size = -(-len(key_ids) // (workers * 4))
+    chunks = [key_ids[start:start + size]
+              for start in range(0, len(key_ids), size)]
+    content_keys = []
+    with ProcessPoolExecutor(workers) as executor:
+        for chunk_keys in executor.map(
+                _derive_chunk, [key_seed] * len(chunks), chunks):
+            content_keys.extend(chunk_keys)
+    return content_keys
 
 
 def checksum(kid, cek):
@@ -85,10 +137,7 @@ def checksum(kid, cek):
     16-byte AES content key using ECB mode. The first 8 bytes of the buffer is
     extracted and base64 encoded.
     """
-    if isinstance(kid, str):
-        kid = uuid.UUID(kid)
-    elif isinstance(kid, bytes):
-        kid = uuid.UUID(str(kid, "ASCII"))
+    kid = to_key_id(kid)
     cipher = AES.new(b16decode(cek), AES.MODE_ECB)
     ciphertext = cipher.encrypt(kid.bytes_le)
 
@@ -96,12 +145,7 @@ def checksum(kid, cek):
 
 
 def _convert_key_id_to_uuid(key_id):
-    if isinstance(key_id, str):
-        return uuid.UUID(key_id)
-    elif isinstance(key_id, bytes):
-        return uuid.UUID(str(key_id, "ASCII"))
-    else:
-        return key_id
+    return to_key_id(key_id)
 
 
 def generate_wrmheader(keys, url, algorithm="AESCTR", use_checksum=True,
@@ -140,7 +184,7 @@ def generate_wrmheader(keys, url, algorithm="AESCTR", use_checksum=True,
 
         key["key_id"] = _convert_key_id_to_uuid(key["key_id"])
         kid = etree.SubElement(data, "KID")
-        kid.text = b64encode(key["key_id"].bytes_le).decode("utf-8")
+        kid.text = key["key_id"].base64_le
         if use_checksum: 
             cs = etree.SubElement(data, "CHECKSUM")
             cs.text = checksum(key["key_id"], key["key"]).decode("utf-8")
@@ -153,7 +197,7 @@ def generate_wrmheader(keys, url, algorithm="AESCTR", use_checksum=True,
             kid.set("ALGID", algorithm)
             if algorithm == "AESCTR" and use_checksum:
                 kid.set("CHECKSUM", checksum(key["key_id"], key["key"]))
-            kid.set("VALUE", b64encode(key["key_id"].bytes_le))
+            kid.set("VALUE", key["key_id"].base64_le)
             kid.text = ""
             kids.append(kid)
 
@@ -9,6 +9,7 @@ import requests
 import json
 from uuid import UUID
 from .widevine_pb2 import WidevineCencHeader
+from ..key_id import to_key_id
 from construct.core import (
     Prefixed,
     Struct,
@@ -128,14 +129,7 @@ def generate_widevine_data(
 
     if key_ids is not None:
         for key_id in key_ids:
-            if isinstance(key_id, str):
-                key_id = UUID(key_id).bytes
-            elif isinstance(key_id, bytes) and len(key_id) == 32:
-                # assume a length 32 byte string is an encoded hex string
-                key_id = UUID(str(key_id, "ASCII")).bytes
-            elif isinstance(key_id, UUID):
-                key_id = key_id.bytes
-            pssh_data.key_id.append(key_id)
+            pssh_data.key_id.append(to_key_id(key_id).bytes)
 
     if content_id is not None:
         if isinstance(content_id, str):
@@ -169,15 +163,7 @@ def generate_pssh(
     if key_ids is None:
         raise Exception("Must provide a list of key IDs")
 
-    kids = []
-    for key_id in key_ids:
-        if isinstance(key_id, str):
-            key_id = UUID(key_id).bytes
-        elif isinstance(key_id, bytes):
-            key_id = UUID(str(key_id, "ASCII")).bytes
-        elif isinstance(key_id, UUID):
-            key_id = key_id.bytes
-        kids.append(key_id)
+    kids = [to_key_id(key_id).bytes for key_id in key_ids]
 
     pssh_data = generate_widevine_data(
         kids, provider, content_id, protection_scheme
@@ -1,20 +1,118 @@
 """
 DRM System classes
 """
-from . import etree, uuid, b64decode, BinasciiError, VALID_SYSTEM_IDS
+from . import etree, uuid, b64decode, BinasciiError, \
+    DRM_SYSTEMS, to_key_id
 from .base import CPIXComparableBase, CPIXListBase
+from .columns import broadcast, decode_column
+from .flyweight import encode_payload, intern_payload
+from operator import attrgetter
 
 
 class DRMSystemList(CPIXListBase):
-    """List of DRMSystems"""
+    """List of DRMSystems, indexed by kid and system ID"""
+
+    __slots__ = ()
+
+    index_keys = {
+        "kid": attrgetter("kid"),
+        "system_id": attrgetter("system_id"),
+    }
 
     def check(self, value):
         if not isinstance(value, DRMSystem):
             raise TypeError("{} is not a DRMSystem".format(value))
 
+    @classmethod
+    def from_records(cls, kids, system_id, pssh=None,
+                     content_protection_data=None, hls_signaling_data=None,
+                     hls_signaling_data_master=None):
+        """
+        Create a list of DRMSystems from columns of values
+
+        system_id is either a single system ID or an iterable of one per
+        kid. Each payload may be None, a single value used for every kid or
+        an iterable with one value per kid, where each value is raw bytes, a
+        base64 string or None.
+
+        Each column is validated as a whole before any DRMSystem is created
+        """
+        kids = [to_key_id(kid) for kid in kids]
+        count = len(kids)
+        system_ids = broadcast(system_id, count, "system_id")
+        parsed = {}
+        for value in set(system_ids):
+            if isinstance(value, str):
+                parsed[value] = uuid.UUID(value)
+            elif isinstance(value, uuid.UUID):
+                parsed[value] = value
+            else:
+                raise TypeError("system_id should be a uuid")
+            if parsed[value] not in DRM_SYSTEMS:
+                raise ValueError("system_id is unknown")
+        payloads = [
+            [intern_payload(value) if value is not None else None
+             for value in decode_column(values, count, name)]
+            for values, name in (
+                (pssh, "pssh"),
+                (content_protection_data, "content_protection_data"),
+                (hls_signaling_data, "hls_signaling_data"),
+                (hls_signaling_data_master, "hls_signaling_data_master"),
+            )
+        ]
+        return cls._from_checked([
+            DRMSystem._from_values(kid, parsed[value], *values)
+            for kid, value, *values in zip(kids, system_ids, *payloads)
+        ])
+
+    def to_numpy(self):
+        """
+        Return a NumPy structured array with one row per DRM system, the
+        payloads are raw bytes or None
+        """
+        from .interop import drm_systems_to_numpy
+        return drm_systems_to_numpy(self)
+
+    @classmethod
+    def from_numpy(cls, array):
+        """
+        Create a list from a NumPy structured array, as returned by to_numpy
+        """
+        from .interop import drm_systems_from_numpy
+        return drm_systems_from_numpy(cls, array)
+
+    def to_arrow(self):
+        """
+        Return a pyarrow Table with one row per DRM system
+        """
+        from .interop import drm_systems_to_arrow
+        return drm_systems_to_arrow(self)
+
+    @classmethod
+    def from_arrow(cls, table):
+        """
+        Create a list from a pyarrow Table, as returned by to_arrow
+        """
+        from .interop import drm_systems_from_arrow
+        return drm_systems_from_arrow(cls, table)
+
+    def for_kid(self, kid):
+        """
+        Return a list of the DRMSystems for kid
+        """
+        return self._lookup("kid", to_key_id(kid))
+
+    def for_system(self, system_id):
+        """
+        Return a list of the DRMSystems for system_id
+        """
+        if isinstance(system_id, str):
+            system_id = uuid.UUID(system_id)
+        return self._lookup("system_id", system_id)
+
     def element(self):
         el = etree.Element("DRMSystemList")
-        for drm_system in self:
+        for drm_system in self._list:
             el.append(drm_system.element())
         return el
 
@@ -46,8 +144,19 @@ class DRMSystem(CPIXComparableBase):
         PSSH: PSSH box for insertion in ISOBMFF output
         ContentProtectionData: ContentProtection XML for DASH manifest
         HLSSignalingData: signaling information for HLS manifest
+
+    The payloads are stored as raw bytes (available through the *_bytes
+    properties), the base64 representations are only encoded when first
+    requested and then cached. Identical payloads are interned so they are
+    stored and encoded once however many DRMSystems carry them
     """
 
+    __slots__ = ("_kid", "_system_id", "_pssh", "_pssh_b64",
+                 "_content_protection_data", "_content_protection_data_b64",
+                 "_hls_signaling_data", "_hls_signaling_data_b64",
+                 "_hls_signaling_data_master",
+                 "_hls_signaling_data_master_b64")
+
     def __init__(
         self,
         kid,
@@ -60,9 +169,13 @@ class DRMSystem(CPIXComparableBase):
         self._kid = None
         self._system_id = None
         self._pssh = None
+        self._pssh_b64 = None
         self._content_protection_data = None
+        self._content_protection_data_b64 = None
         self._hls_signaling_data = None
+        self._hls_signaling_data_b64 = None
         self._hls_signaling_data_master = None
+        self._hls_signaling_data_master_b64 = None
 
         self.kid = kid
         self.system_id = system_id
@@ -75,16 +188,34 @@ class DRMSystem(CPIXComparableBase):
         if hls_signaling_data_master is not None:
             self.hls_signaling_data_master = hls_signaling_data_master
 
+    @staticmethod
+    def _from_values(kid, system_id, pssh, content_protection_data,
+                     hls_signaling_data, hls_signaling_data_master):
+        """
+        Create a DRMSystem from already validated values, skipping the
+        property setters. kid must be a KeyID, the payloads raw bytes or None
+        """
+        drm_system = DRMSystem.__new__(DRMSystem)
+        drm_system._kid = kid
+        drm_system._system_id = system_id
+        drm_system._pssh = pssh
+        drm_system._pssh_b64 = None
+        drm_system._content_protection_data = content_protection_data
+        drm_system._content_protection_data_b64 = None
+        drm_system._hls_signaling_data = hls_signaling_data
+        drm_system._hls_signaling_data_b64 = None
+        drm_system._hls_signaling_data_master = hls_signaling_data_master
+        drm_system._hls_signaling_data_master_b64 = None
+        return drm_system
+
     @property
     def kid(self):
         return self._kid
 
     @kid.setter
     def kid(self, kid):
-        if isinstance(kid, str):
-            self._kid = uuid.UUID(kid)
-        elif isinstance(kid, uuid.UUID):
-            self._kid = kid
+        if isinstance(kid, (str, uuid.UUID)):
+            self._kid = to_key_id(kid)
         else:
             raise TypeError("kid should be a uuid")
 
@@ -102,79 +233,148 @@ class DRMSystem(CPIXComparableBase):
         else:
             raise TypeError("system_id should be a uuid")
 
-        if tmp_system_id in VALID_SYSTEM_IDS:
+        if tmp_system_id in DRM_SYSTEMS:
             self._system_id = tmp_system_id
         else:
             raise ValueError("system_id is unknown")
 
     @property
     def pssh(self):
-        return self._pssh
+        if self._pssh is None:
+            return None
+        if self._pssh_b64 is None:
+            self._pssh_b64 = encode_payload(self._pssh)
+        return self._pssh_b64
 
     @pssh.setter
     def pssh(self, pssh):
         if isinstance(pssh, (str, bytes)):
             try:
-                b64decode(pssh)
+                self.pssh_bytes = b64decode(pssh)
             except BinasciiError:
                 raise ValueError("pssh is not a valid base64 string")
-            self._pssh = pssh
         else:
             raise TypeError("pssh should be a base64 string")
 
+    @property
+    def pssh_bytes(self):
+        return self._pssh
+
+    @pssh_bytes.setter
+    def pssh_bytes(self, pssh_bytes):
+        if isinstance(pssh_bytes, (bytes, bytearray)):
+            self._pssh = intern_payload(bytes(pssh_bytes))
+            self._pssh_b64 = None
+        else:
+            raise TypeError("pssh_bytes should be bytes")
+
     @property
     def content_protection_data(self):
-        return self._content_protection_data
+        if self._content_protection_data is None:
+            return None
+        if self._content_protection_data_b64 is None:
+            self._content_protection_data_b64 = encode_payload(
+                self._content_protection_data)
+        return self._content_protection_data_b64
 
     @content_protection_data.setter
     def content_protection_data(self, content_protection_data):
         if isinstance(content_protection_data, str):
             try:
-                b64decode(content_protection_data)
+                self.content_protection_data_bytes = b64decode(
+                    content_protection_data)
             except BinasciiError:
                 raise ValueError(
                     "content_protection_data is not a valid base64 string"
                 )
-            self._content_protection_data = content_protection_data
         else:
             raise TypeError("content_protection_data must be a base64 string")
 
+    @property
+    def content_protection_data_bytes(self):
+        return self._content_protection_data
+
+    @content_protection_data_bytes.setter
+    def content_protection_data_bytes(self, content_protection_data_bytes):
+        if isinstance(content_protection_data_bytes, (bytes, bytearray)):
+            self._content_protection_data = intern_payload(
+                bytes(content_protection_data_bytes))
+            self._content_protection_data_b64 = None
+        else:
+            raise TypeError("content_protection_data_bytes should be bytes")
+
     @property
     def hls_signaling_data(self):
-        return self._hls_signaling_data
+        if self._hls_signaling_data is None:
+            return None
+        if self._hls_signaling_data_b64 is None:
+            self._hls_signaling_data_b64 = encode_payload(
+                self._hls_signaling_data)
+        return self._hls_signaling_data_b64
 
     @hls_signaling_data.setter
     def hls_signaling_data(self, hls_signaling_data):
         if isinstance(hls_signaling_data, (str, bytes)):
             try:
-                b64decode(hls_signaling_data)
+                self.hls_signaling_data_bytes = b64decode(hls_signaling_data)
             except BinasciiError:
                 raise ValueError(
                     "hls_signaling_data is not a valid base64 string"
                 )
-            self._hls_signaling_data = hls_signaling_data
         else:
             raise TypeError("hls_signaling_data should be a base64 string")
 
+    @property
+    def hls_signaling_data_bytes(self):
+        return self._hls_signaling_data
+
+    @hls_signaling_data_bytes.setter
+    def hls_signaling_data_bytes(self, hls_signaling_data_bytes):
+        if isinstance(hls_signaling_data_bytes, (bytes, bytearray)):
+            self._hls_signaling_data = intern_payload(
+                bytes(hls_signaling_data_bytes))
+            self._hls_signaling_data_b64 = None
+        else:
+            raise TypeError("hls_signaling_data_bytes should be bytes")
+
     @property
     def hls_signaling_data_master(self):
-        return self._hls_signaling_data_master
+        if self._hls_signaling_data_master is None:
+            return None
+        if self._hls_signaling_data_master_b64 is None:
+            self._hls_signaling_data_master_b64 = encode_payload(
+                self._hls_signaling_data_master)
+        return self._hls_signaling_data_master_b64
 
     @hls_signaling_data_master.setter
     def hls_signaling_data_master(self, hls_signaling_data_master):
         if isinstance(hls_signaling_data_master, (str, bytes)):
             try:
-                b64decode(hls_signaling_data_master)
+                self.hls_signaling_data_master_bytes = b64decode(
+                    hls_signaling_data_master)
             except BinasciiError:
                 raise ValueError(
                     "hls_signaling_data_master is not a valid base64 string"
                 )
-            self._hls_signaling_data_master = hls_signaling_data_master
         else:
             raise TypeError(
                 "hls_signaling_data_master should be a base64 string"
             )
 
+    @property
+    def hls_signaling_data_master_bytes(self):
+        return self._hls_signaling_data_master
+
+    @hls_signaling_data_master_bytes.setter
+    def hls_signaling_data_master_bytes(self, hls_signaling_data_master_bytes):
+        if isinstance(hls_signaling_data_master_bytes, (bytes, bytearray)):
+            self._hls_signaling_data_master = intern_payload(
+                bytes(hls_signaling_data_master_bytes))
+            self._hls_signaling_data_master_b64 = None
+        else:
+            raise TypeError(
+                "hls_signaling_data_master_bytes should be bytes")
+
     def element(self):
         """Returns XML element"""
         el = etree.Element("DRMSystem")
@@ -3,6 +3,7 @@ Filter classes
 """
 from . import etree
 from .base import CPIXComparableBase
+from .flyweight import FILTERS
 
 
 def encode_bool(value):
@@ -12,15 +13,59 @@ def encode_bool(value):
     return "false"
 
 
-class KeyPeriodFilter(CPIXComparableBase):
+def intern_filter(value):
+    """
+    Return the canonical instance of a frozen filter equal to value
+
+    Frozen filters are immutable so equal filters can be shared between any
+    number of usage rules. Values which are not frozen filters are returned
+    unchanged
+    """
+    if not isinstance(value, (KeyPeriodFilter, LabelFilter, VideoFilter,
+                              AudioFilter, BitrateFilter)):
+        return value
+    thawed_class = getattr(value, "_thawed_class", None)
+    if thawed_class is None:
+        return value
+    # with the type of each value, as 2, 2.0 and True are equal but are
+    # serialized differently
+    key = (type(value),) + tuple(
+        (type(field), field) for field in (
+            getattr(value, slot) for slot in thawed_class.__slots__))
+    return FILTERS.intern(value, key)
+
+
+class FilterBase(CPIXComparableBase):
+    """
+    Base of the filter classes, frozen filters are interned so equal frozen
+    filters are one instance
+    """
+
+    __slots__ = ()
+
+    def freeze(self):
+        return intern_filter(super().freeze())
+
+
+class KeyPeriodFilter(FilterBase):
     """
     KeyPeriodFilter element
     Has single required attribute:
         periodId
     """
 
+    __slots__ = ("_period_id",)
+
     def __init__(self, period_id):
-        self.period_id = period_id
+        self._period_id = period_id
+
+    @property
+    def period_id(self):
+        return self._period_id
+
+    @period_id.setter
+    def period_id(self, period_id):
+        self._period_id = period_id
 
     def element(self):
         """Returns XML element"""
@@ -41,14 +86,46 @@ class KeyPeriodFilter(CPIXComparableBase):
         return KeyPeriodFilter(period_id)
 
 
-class LabelFilter(CPIXComparableBase):
+class LabelFilter(FilterBase):
     """
     LabelFilter element
-    Not yet implemented
+    Has single required attribute:
+        label
     """
 
+    __slots__ = ("_label",)
+
+    def __init__(self, label):
+        self._label = label
+
+    @property
+    def label(self):
+        return self._label
+
+    @label.setter
+    def label(self, label):
+        self._label = label
+
+    def element(self):
+        """Returns XML element"""
+        el = etree.Element("LabelFilter")
+        el.set("label", str(self.label))
+        return el
+
+    @staticmethod
+    def parse(xml):
+        """
+        Parse XML and return LabelFilter
+        """
+        if isinstance(xml, (str, bytes)):
+            xml = etree.fromstring(xml)
 
-class VideoFilter(CPIXComparableBase):
+        label = xml.attrib["label"]
+
+        return LabelFilter(label)
+
+
+class VideoFilter(FilterBase):
     """
     VideoFilter element
     Has optional attributes:
@@ -60,14 +137,65 @@ class VideoFilter(CPIXComparableBase):
         maxFps
     """
 
+    __slots__ = ("_min_pixels", "_max_pixels", "_hdr", "_wcg", "_min_fps",
+                 "_max_fps")
+
     def __init__(self, min_pixels=None, max_pixels=None, hdr=None, wcg=None,
                  min_fps=None, max_fps=None):
-        self.min_pixels = min_pixels
-        self.max_pixels = max_pixels
-        self.hdr = hdr
-        self.wcg = wcg
-        self.min_fps = min_fps
-        self.max_fps = max_fps
+        self._min_pixels = min_pixels
+        self._max_pixels = max_pixels
+        self._hdr = hdr
+        self._wcg = wcg
+        self._min_fps = min_fps
+        self._max_fps = max_fps
+
+    @property
+    def min_pixels(self):
+        return self._min_pixels
+
+    @min_pixels.setter
+    def min_pixels(self, min_pixels):
+        self._min_pixels = min_pixels
+
+    @property
+    def max_pixels(self):
+        return self._max_pixels
+
+    @max_pixels.setter
+    def max_pixels(self, max_pixels):
+        self._max_pixels = max_pixels
+
+    @property
+    def hdr(self):
+        return self._hdr
+
+    @hdr.setter
+    def hdr(self, hdr):
+        self._hdr = hdr
+
+    @property
+    def wcg(self):
+        return self._wcg
+
+    @wcg.setter
+    def wcg(self, wcg):
+        self._wcg = wcg
+
+    @property
+    def min_fps(self):
+        return self._min_fps
+
+    @min_fps.setter
+    def min_fps(self, min_fps):
+        self._min_fps = min_fps
+
+    @property
+    def max_fps(self):
+        return self._max_fps
+
+    @max_fps.setter
+    def max_fps(self, max_fps):
+        self._max_fps = max_fps
 
     def element(self):
         """Returns XML element"""
@@ -117,7 +245,7 @@ class VideoFilter(CPIXComparableBase):
         return VideoFilter(min_pixels, max_pixels, hdr, wcg, min_fps, max_fps)
 
 
-class AudioFilter(CPIXComparableBase):
+class AudioFilter(FilterBase):
     """
     AudioFilter element
     Has optional attributes:
@@ -125,9 +253,27 @@ class AudioFilter(CPIXComparableBase):
         maxChannels
     """
 
+    __slots__ = ("_min_channels", "_max_channels")
+
     def __init__(self, min_channels=None, max_channels=None):
-        self.min_channels = min_channels
-        self.max_channels = max_channels
+        self._min_channels = min_channels
+        self._max_channels = max_channels
+
+    @property
+    def min_channels(self):
+        return self._min_channels
+
+    @min_channels.setter
+    def min_channels(self, min_channels):
+        self._min_channels = min_channels
+
+    @property
+    def max_channels(self):
+        return self._max_channels
+
+    @max_channels.setter
+    def max_channels(self, max_channels):
+        self._max_channels = max_channels
 
     def element(self):
         """Returns XML element"""
@@ -157,7 +303,7 @@ class AudioFilter(CPIXComparableBase):
         return AudioFilter(min_channels, max_channels)
 
 
-class BitrateFilter(CPIXComparableBase):
+class BitrateFilter(FilterBase):
     """
     BitrateFilter element
     Has optional attributes:
@@ -165,9 +311,27 @@ class BitrateFilter(CPIXComparableBase):
         maxBitrate
     """
 
+    __slots__ = ("_min_bitrate", "_max_bitrate")
+
     def __init__(self, min_bitrate=None, max_bitrate=None):
-        self.min_bitrate = min_bitrate
-        self.max_bitrate = max_bitrate
+        self._min_bitrate = min_bitrate
+        self._max_bitrate = max_bitrate
+
+    @property
+    def min_bitrate(self):
+        return self._min_bitrate
+
+    @min_bitrate.setter
+    def min_bitrate(self, min_bitrate):
+        self._min_bitrate = min_bitrate
+
+    @property
+    def max_bitrate(self):
+        return self._max_bitrate
+
+    @max_bitrate.setter
+    def max_bitrate(self, max_bitrate):
+        self._max_bitrate = max_bitrate
 
     def element(self):
         """Returns XML element"""
@@ -0,0 +1,63 @@
+"""
+Interning of values shared between many entries of a document
+"""
+from functools import lru_cache
+from . import b64encode
+
+
+# maximum number of distinct values held by each intern table
+INTERN_TABLE_SIZE = 4096
+
+
+class InternTable(object):
+    """
+    Bounded table returning one canonical instance for equal values
+
+    The table is emptied when it is full, this keeps its memory bounded while
+    still deduplicating documents where a small number of values are shared
+    by many entries
+    """
+
+    __slots__ = ("_values", "_size")
+
+    def __init__(self, size=INTERN_TABLE_SIZE):
+        self._values = {}
+        self._size = size
+
+    def __len__(self):
+        return len(self._values)
+
+    def intern(self, value, key=None):
+        """
+        Return the canonical instance for value, key defaults to the value
+        """
+        if key is None:
+            key = value
+        canonical = self._values.get(key)
+        if canonical is None:
+            if len(self._values) >= self._size:
+                self._values.clear()
+            canonical = self._values.setdefault(key, value)
+        return canonical
+
+    def clear(self):
+        self._values.clear()
+
+
+PAYLOADS = InternTable()
+FILTERS = InternTable()
+
+
+def intern_payload(payload):
+    """
+    Return the canonical bytes object for a DRM system payload
+    """
+    return PAYLOADS.intern(payload)
+
+
+@lru_cache(maxsize=INTERN_TABLE_SIZE)
+def encode_payload(payload):
+    """
+    Base64 encode a payload, identical payloads are only encoded once
+    """
+    return str(b64encode(payload), "ascii")
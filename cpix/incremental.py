@@ -0,0 +1,207 @@
+"""
+Incremental schema validation of CPIX documents
+"""
+from datetime import datetime
+from functools import lru_cache
+from . import uuid, etree, get_schema, NSMAP, KeyID
+from .base import CPIXComparableBase, _slots, _is_cache_slot
+from .validation import ContentError
+
+
+# list attribute, list element and path of the entries of each section, in
+# document order
+SECTIONS = (
+    ("content_keys", "ContentKeyList",
+     "/CPIX/ContentKeyList/ContentKey[{}]"),
+    ("drm_systems", "DRMSystemList",
+     "/CPIX/DRMSystemList/DRMSystem[{}]"),
+    ("periods", "ContentKeyPeriodList",
+     "/CPIX/ContentKeyPeriodList/ContentKeyPeriod[{}]"),
+    ("usage_rules", "ContentKeyUsageRuleList",
+     "/CPIX/ContentKeyUsageRuleList/ContentKeyUsageRule[{}]"),
+)
+
+# types of values which are their own fingerprint, UUIDs are replaced by
+# their integer value which hashes faster
+PLAIN_TYPES = frozenset((type(None), bool, int, float, str, bytes, datetime))
+UUID_TYPES = frozenset((uuid.UUID, KeyID))
+
+
+@lru_cache(maxsize=None)
+def _value_slots(cls):
+    """Return the slots of cls holding values, not caches"""
+    return tuple(slot for slot in _slots(cls) if not _is_cache_slot(slot))
+
+
+def fingerprint(value):
+    """
+    Return a hashable value which is equal for entries which serialize to the
+    same XML, built from the stored values so nothing is serialized. Frozen
+    and mutable entries with the same values have the same fingerprint
+    """
+    if isinstance(value, CPIXComparableBase):
+        cls = getattr(type(value), "_thawed_class", type(value))
+        values = [getattr(value, slot, None) for slot in _value_slots(cls)]
+        return (cls,) + tuple(
+            item if type(item) in PLAIN_TYPES else fingerprint(item)
+            for item in values)
+    if isinstance(value, (list, tuple)):
+        return tuple(fingerprint(item) for item in value)
+    if isinstance(value, bytearray):
+        return bytes(value)
+    if type(value) in UUID_TYPES:
+        return value.int
+    return value
+
+
+def _root(content_id=None, version=None):
+    """Return the opening tag of a CPIX document"""
+    el = etree.Element("CPIX", nsmap=NSMAP)
+    if content_id is not None:
+        el.set("contentId", content_id)
+    if version is not None:
+        el.set("version", version)
+    return etree.tostring(el)[:-2] + b">"
+
+
+class IncrementalValidator(object):
+    """
+    Schema validation of a CPIX document which remembers the entries that
+    have been validated
+
+    Entries are identified by a fingerprint of their values, only entries
+    whose fingerprint was not seen by the previous validation are serialized
+    and validated, in one document per section. Period IDs, which must be
+    unique in the document, are checked on every validation. The results of
+    entries no longer in the document are dropped, so one validator should
+    be kept per document. Documents are validated against the schema given
+    or else the schema of their CPIX version
+    """
+
+    __slots__ = ("_schema", "_current", "_results", "_revalidated")
+
+    def __init__(self, schema=None):
+        self._schema = schema
+        self._current = schema
+        self._results = {}
+        self._revalidated = 0
+
+    @property
+    def schema(self):
+        """
+        The schema given, or else the schema of the CPIX version of the last
+        document validated
+        """
+        return self._current
+
+    @property
+    def revalidated(self):
+        """Number of entries schema validated by the last validate call"""
+        return self._revalidated
+
+    def clear(self):
+        """Forget all validation results"""
+        self._results = {}
+
+    def validate(self, cpix):
+        """
+        Validate a CPIX document against the schema
+
+        Returns a tuple of valid true/false and a list of ContentErrors with
+        the rule "schema"
+        """
+        errors = []
+        self._revalidated = 0
+        schema = self._schema
+        if schema is None:
+            schema = get_schema(cpix.version)
+        if schema is not self._current:
+            # the results of another version's schema do not apply
+            self._results = {}
+            self._current = schema
+
+        root = (cpix.content_id, cpix.version)
+        results = self._results.get("root", {})
+        if root not in results:
+            results = {root: self._validate_root(*root)}
+        self._results["root"] = results
+        if results[root] is not None:
+            errors.append(ContentError(results[root], "/CPIX", "schema"))
+
+        period_ids = set()
+        for section, tag, path in SECTIONS:
+            entries = list(getattr(cpix, section))
+            keys = [fingerprint(entry) for entry in entries]
+            results = self._results.get(section, {})
+            pending = {}
+            for key, entry in zip(keys, entries):
+                if key not in results and key not in pending:
+                    pending[key] = entry
+            results = {key: results[key] for key in keys if key in results}
+            results.update(self._validate_entries(tag, pending))
+            self._results[section] = results
+            self._revalidated += len(pending)
+
+            for position, (key, entry) in enumerate(zip(keys, entries), 1):
+                if results[key] is not None:
+                    errors.append(ContentError(
+                        results[key], path.format(position), "schema"))
+                if section == "periods":
+                    if entry.id in period_ids:
+                        errors.append(ContentError(
+                            "ID '{}' is already defined".format(entry.id),
+                            path.format(position), "schema"))
+                    period_ids.add(entry.id)
+
+        return (len(errors) == 0, errors)
+
+    def _check(self, xml):
+        """
+        Validate a document, returns the error messages by line number
+        """
+        schema = self._current
+        if schema.validate(etree.fromstring(xml)):
+            return {}
+        messages = {}
+        for entry in schema.error_log:
+            messages.setdefault(entry.line, entry.message)
+        return messages
+
+    def _validate_root(self, content_id, version):
+        messages = self._check(_root(content_id, version) + b"</CPIX>")
+        return next(iter(messages.values()), None)
+
+    def _validate_entries(self, tag, entries):
+        """
+        Validate entries in one document with each entry on its own line,
+        returns a dict of fingerprint to the first error message of the
+        entry or None. Periods are split into batches so that their IDs are
+        unique in each document
+        """
+        results = {}
+        batches = [[]]
+        ids = [set()]
+        for key, entry in entries.items():
+            for batch, batch_ids in zip(batches, ids):
+                if tag != "ContentKeyPeriodList" or entry.id not in batch_ids:
+                    break
+            else:
+                batch, batch_ids = [], set()
+                batches.append(batch)
+                ids.append(batch_ids)
+            if tag == "ContentKeyPeriodList":
+                batch_ids.add(entry.id)
+            batch.append((key, entry))
+
+        for batch in batches:
+            if not batch:
+                continue
+            lines = [_root(), "<{}>".format(tag).encode("ascii")]
+            first_line = len(lines) + 1
+            lines.extend(etree.tostring(entry.element()) for _, entry in batch)
+            lines.append("</{}></CPIX>".format(tag).encode("ascii"))
+
+            messages = self._check(b"\n".join(lines))
+            for line, (key, _) in enumerate(batch, first_line):
+                results[key] = messages.get(line)
+        return results
@@ -0,0 +1,324 @@
+"""
+Conversion of lists to and from NumPy structured arrays and Arrow tables
+
+NumPy and pyarrow are optional, they are only imported when a conversion is
+used and can be installed with the numpy and arrow extras:
+
+    pip install cpix[numpy,arrow]
+"""
+from datetime import timezone
+from importlib import import_module
+from . import uuid
+from .content_key import COMMON_ENCRYPTION_SCHEMES
+from .period import Period
+
+
+# size in bytes of key IDs, system IDs, content keys and explicit IVs
+KEY_SIZE = 16
+
+DRM_SYSTEM_PAYLOADS = ("pssh", "content_protection_data",
+                       "hls_signaling_data", "hls_signaling_data_master")
+
+# fields of the structured arrays, the common encryption scheme is stored as
+# its index in COMMON_ENCRYPTION_SCHEMES
+CONTENT_KEY_FIELDS = [
+    ("kid", "V16"),
+    ("cek", "V16"),
+    ("has_cek", "?"),
+    ("explicit_iv", "V16"),
+    ("has_explicit_iv", "?"),
+    ("common_encryption_scheme", "u1"),
+]
+DRM_SYSTEM_FIELDS = [("kid", "V16"), ("system_id", "V16")] + [
+    (payload, "O") for payload in DRM_SYSTEM_PAYLOADS]
+PERIOD_FIELDS = [
+    ("id", "O"),
+    ("index", "i8"),
+    ("has_index", "?"),
+    ("start", "M8[us]"),
+    ("end", "M8[us]"),
+    ("start_aware", "?"),
+    ("end_aware", "?"),
+]
+
+
+def _import(module, extra):
+    try:
+        return import_module(module)
+    except ImportError:
+        raise ImportError(
+            "{} is required, install it with: pip install cpix[{}]".format(
+                module, extra))
+
+
+def _split(data):
+    """Split packed 16 byte values into a list"""
+    return [data[i:i + KEY_SIZE] for i in range(0, len(data), KEY_SIZE)]
+
+
+def _optional(values, flags):
+    return [value if flag else None for value, flag in zip(values, flags)]
+
+
+def _pack(value, name):
+    if value is None:
+        return bytes(KEY_SIZE), 0
+    if len(value) != KEY_SIZE:
+        raise ValueError("{} must be {} bytes".format(name, KEY_SIZE))
+    return value, 1
+
+
+def _content_key_columns(content_keys):
+    """
+    Return the packed columns of a content key list, in the format of
+    ColumnarContentKeyList.columns
+    """
+    columns = getattr(content_keys, "columns", None)
+    if columns is not None:
+        return columns()
+    kids, ceks, ivs = [], [], []
+    has_cek, has_iv, schemes = bytearray(), bytearray(), bytearray()
+    for content_key in content_keys:
+        kids.append(content_key.kid.bytes)
+        cek, flag = _pack(content_key.cek_bytes, "cek")
+        ceks.append(cek)
+        has_cek.append(flag)
+        explicit_iv, flag = _pack(content_key.explicit_iv_bytes,
+                                  "explicit_iv")
+        ivs.append(explicit_iv)
+        has_iv.append(flag)
+        schemes.append(COMMON_ENCRYPTION_SCHEMES.index(
+            content_key.common_encryption_scheme))
+    return {
+        "kid": b"".join(kids),
+        "cek": b"".join(ceks),
+        "has_cek": bytes(has_cek),
+        "explicit_iv": b"".join(ivs),
+        "has_explicit_iv": bytes(has_iv),
+        "common_encryption_scheme": bytes(schemes),
+    }
+
+
+def _scheme_names(codes):
+    try:
+        return [COMMON_ENCRYPTION_SCHEMES[code] for code in codes]
+    except IndexError:
+        raise ValueError("common_encryption_scheme code is unknown")
+
+
+def content_keys_to_numpy(content_keys):
+    np = _import("numpy", "numpy")
+    columns = _content_key_columns(content_keys)
+    array = np.zeros(
+        len(columns["common_encryption_scheme"]), dtype=CONTENT_KEY_FIELDS)
+    for name, dtype in CONTENT_KEY_FIELDS:
+        array[name] = np.frombuffer(
+            columns[name], dtype="u1" if dtype == "?" else dtype)
+    return array
+
+
+def content_keys_from_numpy(cls, array):
+    kids = _split(array["kid"].tobytes())
+    ceks = _optional(_split(array["cek"].tobytes()),
+                     array["has_cek"].tolist())
+    explicit_ivs = _optional(_split(array["explicit_iv"].tobytes()),
+                             array["has_explicit_iv"].tolist())
+    schemes = _scheme_names(array["common_encryption_scheme"].tolist())
+    return cls.from_records(kids, ceks, explicit_ivs, schemes)
+
+
+def content_keys_to_arrow(content_keys):
+    pa = _import("pyarrow", "arrow")
+    columns = _content_key_columns(content_keys)
+    key_type = pa.binary(KEY_SIZE)
+    return pa.table({
+        "kid": pa.array(_split(columns["kid"]), type=key_type),
+        "cek": pa.array(_optional(_split(columns["cek"]),
+                                  columns["has_cek"]), type=key_type),
+        "explicit_iv": pa.array(_optional(_split(columns["explicit_iv"]),
+                                          columns["has_explicit_iv"]),
+                                type=key_type),
+        "common_encryption_scheme": pa.DictionaryArray.from_arrays(
+            pa.array(columns["common_encryption_scheme"], type=pa.int8()),
+            pa.array(COMMON_ENCRYPTION_SCHEMES, type=pa.string())),
+    })
+
+
+def _arrow_column(table, name):
+    if name not in table.column_names:
+        return None
+    return table.column(name).to_pylist()
+
+
+def content_keys_from_arrow(cls, table):
+    return cls.from_records(
+        _arrow_column(table, "kid"),
+        _arrow_column(table, "cek"),
+        _arrow_column(table, "explicit_iv"),
+        _arrow_column(table, "common_encryption_scheme"),
+    )
+
+
+def drm_systems_to_numpy(drm_systems):
+    np = _import("numpy", "numpy")
+    array = np.zeros(len(drm_systems), dtype=DRM_SYSTEM_FIELDS)
+    array["kid"] = np.frombuffer(
+        b"".join(drm_system.kid.bytes for drm_system in drm_systems),
+        dtype="V16")
+    array["system_id"] = np.frombuffer(
+        b"".join(drm_system.system_id.bytes for drm_system in drm_systems),
+        dtype="V16")
+    for payload in DRM_SYSTEM_PAYLOADS:
+        attribute = payload + "_bytes"
+        array[payload] = [getattr(drm_system, attribute)
+                          for drm_system in drm_systems]
+    return array
+
+
+def drm_systems_from_numpy(cls, array):
+    return cls.from_records(
+        _split(array["kid"].tobytes()),
+        [uuid.UUID(bytes=system_id)
+         for system_id in _split(array["system_id"].tobytes())],
+        *[array[payload].tolist() for payload in DRM_SYSTEM_PAYLOADS])
+
+
+def drm_systems_to_arrow(drm_systems):
+    pa = _import("pyarrow", "arrow")
+    key_type = pa.binary(KEY_SIZE)
+    columns = {
+        "kid": pa.array([drm_system.kid.bytes for drm_system in drm_systems],
+                        type=key_type),
+        "system_id": pa.array([drm_system.system_id.bytes
+                               for drm_system in drm_systems],
+                              type=key_type),
+    }
+    for payload in DRM_SYSTEM_PAYLOADS:
+        attribute = payload + "_bytes"
+        columns[payload] = pa.array(
+            [getattr(drm_system, attribute) for drm_system in drm_systems],
+            type=pa.binary())
+    return pa.table(columns)
+
+
+def drm_systems_from_arrow(cls, table):
+    return cls.from_records(
+        _arrow_column(table, "kid"),
+        [uuid.UUID(bytes=system_id)
+         for system_id in _arrow_column(table, "system_id")],
+        *[_arrow_column(table, payload) for payload in DRM_SYSTEM_PAYLOADS])
+
+
+def _utc(value):
+    """Return a datetime as naive UTC, naive datetimes are taken as UTC"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _is_aware(value):
+    return value is not None and value.tzinfo is not None
+
+
+def _aware(value, aware):
+    """
+    Return a naive UTC datetime as given, or as UTC if it was aware
+    """
+    if value is None:
+        return None
+    value = _utc(value)
+    if aware:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _periods(cls, ids, indexes, starts, ends, starts_aware, ends_aware):
+    """
+    Create a period list, each period is built by the Period constructor so
+    its values are checked
+    """
+    new_list = cls()
+    new_list.list = [
+        Period(id, index, _aware(start, start_aware), _aware(end, end_aware))
+        for id, index, start, end, start_aware, end_aware in zip(
+            ids, indexes, starts, ends, starts_aware, ends_aware)
+    ]
+    return new_list
+
+
+def periods_to_numpy(periods):
+    np = _import("numpy", "numpy")
+    periods = list(periods)
+    array = np.zeros(len(periods), dtype=PERIOD_FIELDS)
+    array["id"] = [period.id for period in periods]
+    array["index"] = [period.index or 0 for period in periods]
+    array["has_index"] = [period.index is not None for period in periods]
+    array["start"] = [_utc(period.start) for period in periods]
+    array["end"] = [_utc(period.end) for period in periods]
+    array["start_aware"] = [_is_aware(period.start) for period in periods]
+    array["end_aware"] = [_is_aware(period.end) for period in periods]
+    return array
+
+
+def _numpy_flags(array, name):
+    """Return a boolean field of an array, all false if it has none"""
+    if name not in array.dtype.names:
+        return [False] * len(array)
+    return array[name].tolist()
+
+
+def periods_from_numpy(cls, array):
+    return _periods(
+        cls,
+        array["id"].tolist(),
+        _optional(array["index"].tolist(), array["has_index"].tolist()),
+        array["start"].tolist(),
+        array["end"].tolist(),
+        _numpy_flags(array, "start_aware"),
+        _numpy_flags(array, "end_aware"),
+    )
+
+
+def periods_to_arrow(periods):
+    pa = _import("pyarrow", "arrow")
+    periods = list(periods)
+    time_type = pa.timestamp("us", tz="UTC")
+    return pa.table({
+        "id": pa.array([period.id for period in periods], type=pa.string()),
+        "index": pa.array([period.index for period in periods],
+                          type=pa.int64()),
+        "start": pa.array([_utc(period.start) for period in periods],
+                          type=time_type),
+        "end": pa.array([_utc(period.end) for period in periods],
+                        type=time_type),
+        "start_aware": pa.array(
+            [_is_aware(period.start) for period in periods], type=pa.bool_()),
+        "end_aware": pa.array(
+            [_is_aware(period.end) for period in periods], type=pa.bool_()),
+    })
+
+
+def _arrow_flags(table, name, times):
+    """
+    Return a boolean column of a table, by default whether the times column
+    has a timezone
+    """
+    flags = _arrow_column(table, name)
+    if flags is not None:
+        return flags
+    aware = (times in table.column_names and
+             getattr(table.schema.field(times).type, "tz", None) is not None)
+    return [aware] * table.num_rows
+
+
+def periods_from_arrow(cls, table):
+    count = table.num_rows
+    return _periods(
+        cls,
+        _arrow_column(table, "id"),
+        _arrow_column(table, "index") or [None] * count,
+        _arrow_column(table, "start") or [None] * count,
+        _arrow_column(table, "end") or [None] * count,
+        _arrow_flags(table, "start_aware", "start"),
+        _arrow_flags(table, "end_aware", "end"),
+    )
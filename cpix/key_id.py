@@ -0,0 +1,117 @@
+"""
+Key ID value type
+"""
+from functools import lru_cache
+from . import uuid, b64encode
+
+
+# maximum number of distinct key ID inputs remembered by to_key_id
+KEY_ID_CACHE_SIZE = 65536
+try:
+    SAFE_UNKNOWN = uuid.SafeUUID.unknown
+except AttributeError:
+    # python < 3.7
+    SAFE_UNKNOWN = None
+
+
+class KeyID(uuid.UUID):
+    """
+    Key ID, a UUID which caches its canonical string, big and little endian
+    bytes, hex and base64 representations after they are first used
+
+    Compares and hashes equal to the uuid.UUID with the same value
+    """
+
+    __slots__ = ("_str", "_bytes", "_bytes_le", "_hex", "_base64",
+                 "_base64_le")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for slot in KeyID.__slots__:
+            object.__setattr__(self, slot, None)
+
+    @staticmethod
+    def _from_bytes(data):
+        """
+        Create a KeyID from 16 big endian bytes, skipping the checks of
+        uuid.UUID. The bytes are kept as the cached big endian bytes
+        """
+        key_id = object.__new__(KeyID)
+        set_slot = object.__setattr__
+        set_slot(key_id, "int", int.from_bytes(data, "big"))
+        set_slot(key_id, "is_safe", SAFE_UNKNOWN)
+        set_slot(key_id, "_str", None)
+        set_slot(key_id, "_bytes", data)
+        set_slot(key_id, "_bytes_le", None)
+        set_slot(key_id, "_hex", None)
+        set_slot(key_id, "_base64", None)
+        set_slot(key_id, "_base64_le", None)
+        return key_id
+
+    def __reduce__(self):
+        return (KeyID, (None, None, None, None, self.int))
+
+    def __str__(self):
+        if self._str is None:
+            object.__setattr__(self, "_str", super().__str__())
+        return self._str
+
+    @property
+    def bytes(self):
+        if self._bytes is None:
+            object.__setattr__(self, "_bytes", super().bytes)
+        return self._bytes
+
+    @property
+    def bytes_le(self):
+        if self._bytes_le is None:
+            object.__setattr__(self, "_bytes_le", super().bytes_le)
+        return self._bytes_le
+
+    @property
+    def hex(self):
+        if self._hex is None:
+            object.__setattr__(self, "_hex", super().hex)
+        return self._hex
+
+    @property
+    def base64(self):
+        """Base64 encoding of the big endian bytes"""
+        if self._base64 is None:
+            object.__setattr__(
+                self, "_base64", str(b64encode(self.bytes), "ascii"))
+        return self._base64
+
+    @property
+    def base64_le(self):
+        """Base64 encoding of the little endian bytes, as used by PlayReady"""
+        if self._base64_le is None:
+            object.__setattr__(
+                self, "_base64_le", str(b64encode(self.bytes_le), "ascii"))
+        return self._base64_le
+
+
+def to_key_id(key_id):
+    """
+    Convert a key ID to a KeyID
+
+    Accepts a KeyID, uuid.UUID, UUID string, UUID string as ASCII bytes or
+    16 raw bytes. Conversions are interned through a bounded cache so the
+    same key ID is only parsed once
+    """
+    if isinstance(key_id, KeyID):
+        return key_id
+    if isinstance(key_id, (str, bytes, uuid.UUID)):
+        return _parse_key_id(key_id)
+    raise TypeError("key ID should be a uuid")
+
+
+@lru_cache(maxsize=KEY_ID_CACHE_SIZE)
+def _parse_key_id(key_id):
+    if isinstance(key_id, uuid.UUID):
+        return KeyID(int=key_id.int)
+    if isinstance(key_id, bytes):
+        if len(key_id) == 16:
+            return KeyID(bytes=key_id)
+        key_id = str(key_id, "ASCII")
+    return KeyID(key_id)
@@ -0,0 +1,329 @@
+"""
+Resolution of tracks to content keys by usage rules
+"""
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from heapq import merge
+from operator import attrgetter
+from . import AudioFilter, BitrateFilter, VideoFilter, KeyPeriodFilter, \
+    LabelFilter
+
+
+VIDEO = "video"
+AUDIO = "audio"
+
+Track = namedtuple(
+    "Track",
+    ("type", "pixels", "fps", "channels", "bitrate", "hdr", "wcg", "period",
+     "label"))
+Track.__new__.__defaults__ = (None,) * 8
+Track.__doc__ = """
+Track, or segment of a track, to resolve to a content key
+
+type is "video", "audio" or any other track type such as "text", pixels is
+width times height, bitrate is in bits per second, period the id of the
+key period the segment is in and label the label of the track. Values which
+are None only match rules without a filter on them, except hdr and wcg where
+None is unknown and matches rules for either
+"""
+
+# the attribute of tracks of each type the rules are indexed on
+INDEX_ATTRIBUTES = {VIDEO: "pixels", AUDIO: "channels", None: "bitrate"}
+
+
+def _number(value):
+    """Parse a filter threshold, which may be the string of a parsed XML"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if value in ("true", "1"):
+        return True
+    if value in ("false", "0"):
+        return False
+    raise ValueError("{!r} is not a boolean".format(value))
+
+
+def _in_range(value, low, high):
+    if low is not None and (value is None or value < low):
+        return False
+    if high is not None and (value is None or value > high):
+        return False
+    return True
+
+
+def _compile_filter(filter):
+    """
+    Return the part of a compiled rule a filter goes in, an index into
+    periods, video, audio, bitrate and labels, and its parsed values
+    """
+    if isinstance(filter, KeyPeriodFilter):
+        return 0, filter.period_id
+    if isinstance(filter, LabelFilter):
+        return 4, filter.label
+    if isinstance(filter, VideoFilter):
+        return 1, (_number(filter.min_pixels), _number(filter.max_pixels),
+                   _bool(filter.hdr), _bool(filter.wcg),
+                   _number(filter.min_fps), _number(filter.max_fps))
+    if isinstance(filter, AudioFilter):
+        return 2, (_number(filter.min_channels),
+                   _number(filter.max_channels))
+    if isinstance(filter, BitrateFilter):
+        return 3, (_number(filter.min_bitrate), _number(filter.max_bitrate))
+    return None, None
+
+
+class _CompiledRule(object):
+    """
+    Usage rule with its thresholds parsed, each filter type present is a
+    tuple of alternatives of which at least one must match
+    """
+
+    __slots__ = ("kid", "position", "track_type", "periods", "labels",
+                 "video", "audio", "bitrate")
+
+    def __init__(self, usage_rule, position, compiled=None):
+        """
+        compiled is a dict of the id of filters to their parsed values,
+        shared by the rules compiled together as filters, such as interned
+        frozen filters, may be used by many rules
+        """
+        if compiled is None:
+            compiled = {}
+        self.kid = usage_rule.kid
+        self.position = position
+        parts = periods, video, audio, bitrate, labels = [], [], [], [], []
+        for filter in usage_rule._list:
+            try:
+                part, value = compiled[id(filter)]
+            except KeyError:
+                part, value = compiled[id(filter)] = _compile_filter(filter)
+            if part is not None:
+                parts[part].append(value)
+        self.periods = frozenset(periods) if periods else None
+        self.labels = frozenset(labels) if labels else None
+        self.video = tuple(video) or None
+        self.audio = tuple(audio) or None
+        self.bitrate = tuple(bitrate) or None
+        if video and audio:
+            # no track is both video and audio
+            self.track_type = False
+        elif video:
+            self.track_type = VIDEO
+        elif audio:
+            self.track_type = AUDIO
+        else:
+            self.track_type = None
+
+    def bounds(self, track_type):
+        """
+        Return the lowest and highest value of the indexed attribute of
+        tracks of a type the rule can match, None if unbounded
+        """
+        if track_type == VIDEO and self.video:
+            ranges = [(video[0], video[1]) for video in self.video]
+        elif track_type == AUDIO and self.audio:
+            ranges = self.audio
+        elif track_type not in (VIDEO, AUDIO) and self.bitrate:
+            ranges = self.bitrate
+        else:
+            return None, None
+        lows = [low for low, _ in ranges]
+        highs = [high for _, high in ranges]
+        return (None if None in lows else min(lows),
+                None if None in highs else max(highs))
+
+    def matches(self, track):
+        if self.track_type is not None and self.track_type != track.type:
+            return False
+        if self.periods is not None and track.period not in self.periods:
+            return False
+        if self.labels is not None and track.label not in self.labels:
+            return False
+        if self.video is not None and not any(
+                _in_range(track.pixels, min_pixels, max_pixels) and
+                (hdr is None or track.hdr is None or
+                 hdr == bool(track.hdr)) and
+                (wcg is None or track.wcg is None or
+                 wcg == bool(track.wcg)) and
+                _in_range(track.fps, min_fps, max_fps)
+                for min_pixels, max_pixels, hdr, wcg, min_fps, max_fps
+                in self.video):
+            return False
+        if self.audio is not None and not any(
+                _in_range(track.channels, low, high)
+                for low, high in self.audio):
+            return False
+        if self.bitrate is not None and not any(
+                _in_range(track.bitrate, low, high)
+                for low, high in self.bitrate):
+            return False
+        return True
+
+
+class _Index(object):
+    """
+    Interval index of the rules which can match tracks of one type on the
+    indexed attribute. The attribute's line is cut at every rule bound into
+    segments, and the rules are stored in a segment tree over them: each
+    rule is in the few nodes whose segments its range covers, in document
+    order. The candidates of a value are the rules of the nodes from its
+    segment's leaf to the root, merged by position, so building takes
+    O(n log n) and a lookup is a binary search and a walk up the tree. Rules
+    without bounds on the attribute are kept apart rather than in the tree
+    """
+
+    __slots__ = ("attribute", "points", "size", "nodes", "unbounded",
+                 "rules")
+
+    def __init__(self, track_type, rules):
+        self.attribute = INDEX_ATTRIBUTES.get(track_type,
+                                              INDEX_ATTRIBUTES[None])
+        self.rules = rules
+        self.unbounded = []
+        bounded = []
+        for rule in rules:
+            low, high = rule.bounds(track_type)
+            if low is None and high is None:
+                self.unbounded.append(rule)
+            else:
+                # ranges are inclusive, the segments are half open
+                bounded.append((rule, low, None if high is None else high + 1))
+        self.points = sorted({value for _, low, high in bounded
+                              for value in (low, high) if value is not None})
+        size = 1
+        while size < len(self.points) + 1:
+            size *= 2
+        self.size = size
+        self.nodes = {}
+        for rule, low, high in bounded:
+            first = 0 if low is None else bisect_left(self.points, low) + 1
+            last = (len(self.points) if high is None
+                    else bisect_left(self.points, high))
+            # the nodes covering the segments first to last
+            left = first + size
+            right = last + size + 1
+            while left < right:
+                if left & 1:
+                    self.nodes.setdefault(left, []).append(rule)
+                    left += 1
+                if right & 1:
+                    right -= 1
+                    self.nodes.setdefault(right, []).append(rule)
+                left //= 2
+                right //= 2
+
+    def candidates(self, track):
+        """Return the rules which may match track, in document order"""
+        value = getattr(track, self.attribute)
+        if value is None:
+            return self.rules
+        node = bisect_right(self.points, value) + self.size
+        found = []
+        while node:
+            rules = self.nodes.get(node)
+            if rules:
+                found.append(rules)
+            node //= 2
+        if self.unbounded:
+            found.append(self.unbounded)
+        if len(found) == 1:
+            return found[0]
+        if not found:
+            return ()
+        return merge(*found, key=attrgetter("position"))
+
+
+class UsageRuleMatcher(object):
+    """
+    Usage rules compiled to resolve tracks to content keys
+
+    The rules are split by the key periods of their KeyPeriodFilters, then
+    by the track type they apply to, and indexed on the pixels of video, the
+    channels of audio and the bitrate of other tracks. Resolving a track
+    looks up its period, then searches the index of the rules of that period
+    and of the rules without periods, checking the few rules whose range
+    contains the track in document order. The matcher is a snapshot, it
+    does not follow later changes to the usage rules
+    """
+
+    __slots__ = ("_rules", "_indexes", "_period_indexes")
+
+    def __init__(self, usage_rules):
+        compiled = {}
+        self._rules = [_CompiledRule(usage_rule, position, compiled)
+                       for position, usage_rule in enumerate(usage_rules)]
+        by_period = {}
+        for rule in self._rules:
+            for period in rule.periods or ():
+                by_period.setdefault(period, []).append(rule)
+        self._indexes = self._type_indexes(
+            [rule for rule in self._rules if rule.periods is None])
+        self._period_indexes = {period: self._type_indexes(rules)
+                                for period, rules in by_period.items()}
+
+    @staticmethod
+    def _type_indexes(rules):
+        """Return the indexes of rules by the track type they apply to"""
+        return {track_type: _Index(track_type, [
+            rule for rule in rules
+            if rule.track_type is None or rule.track_type == track_type])
+            for track_type in (VIDEO, AUDIO, None)}
+
+    def __len__(self):
+        return len(self._rules)
+
+    @staticmethod
+    def _index(indexes, track_type):
+        return indexes.get(track_type) or indexes[None]
+
+    def _candidates(self, track):
+        """
+        Return the rules which may match track, in document order
+        """
+        candidates = self._index(self._indexes, track.type).candidates(track)
+        period_indexes = self._period_indexes.get(track.period)
+        if period_indexes is None:
+            return candidates
+        return merge(
+            candidates,
+            self._index(period_indexes, track.type).candidates(track),
+            key=attrgetter("position"))
+
+    def matching_kids(self, track):
+        """
+        Return the kids of every rule matching track, in document order
+        """
+        return [rule.kid for rule in self._candidates(track)
+                if rule.matches(track)]
+
+    def resolve(self, track, default=None):
+        """
+        Return the kid of the first rule matching track, or default
+        """
+        for rule in self._candidates(track):
+            if rule.matches(track):
+                return rule.kid
+        return default
+
+    def resolve_many(self, tracks, default=None):
+        """
+        Return the kid of each of tracks, such as the renditions of a bitrate
+        ladder or the segments of a track. Equal tracks are resolved once
+        """
+        resolved = {}
+        kids = []
+        for track in tracks:
+            try:
+                kid = resolved[track]
+            except KeyError:
+                kid = resolved[track] = self.resolve(track, default)
+            kids.append(kid)
+        return kids
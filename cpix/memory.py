@@ -0,0 +1,166 @@
+"""
+Memory accounting for CPIX documents
+"""
+import sys
+import tracemalloc
+from . import uuid
+from .base import CPIXComparableBase, _slots
+
+
+# payload type of the values held in each slot, cached encodings of a value
+# are counted with the value
+SLOT_PAYLOADS = {
+    "_kid": "uuid",
+    "_kids": "uuid",
+    "_system_id": "uuid",
+    "_cek": "cek",
+    "_cek_b64": "cek",
+    "_ceks": "cek",
+    "_has_cek": "cek",
+    "_explicit_iv": "explicit_iv",
+    "_explicit_iv_b64": "explicit_iv",
+    "_ivs": "explicit_iv",
+    "_has_iv": "explicit_iv",
+    "_pssh": "pssh",
+    "_pssh_b64": "pssh",
+    "_content_protection_data": "content_protection_data",
+    "_content_protection_data_b64": "content_protection_data",
+    "_hls_signaling_data": "hls_signaling_data",
+    "_hls_signaling_data_b64": "hls_signaling_data",
+    "_hls_signaling_data_master": "hls_signaling_data_master",
+    "_hls_signaling_data_master_b64": "hls_signaling_data_master",
+}
+
+SECTIONS = (("content_keys", "_content_keys"),
+            ("drm_systems", "_drm_systems"),
+            ("periods", "_periods"),
+            ("usage_rules", "_usage_rules"))
+
+
+class _Sizer(object):
+    """
+    Sums the sizes of objects, each object is only counted the first time it
+    is seen so values shared between entries are counted once
+    """
+
+    __slots__ = ("_seen", "deep", "payloads")
+
+    def __init__(self, deep):
+        self._seen = set()
+        self.deep = deep
+        self.payloads = dict.fromkeys(sorted(set(SLOT_PAYLOADS.values())), 0)
+
+    def size(self, value, payload=None):
+        if value is None or id(value) in self._seen:
+            return 0
+        self._seen.add(id(value))
+        size = sys.getsizeof(value)
+
+        if isinstance(value, CPIXComparableBase):
+            for slot in _slots(type(value)):
+                try:
+                    slot_value = getattr(value, slot)
+                except AttributeError:
+                    continue
+                size += self._size_of(slot_value, SLOT_PAYLOADS.get(slot))
+            return size
+
+        if isinstance(value, (list, tuple)):
+            size += sum(self._size_of(item) for item in value)
+        elif isinstance(value, dict):
+            size += sum(self._size_of(k) + self._size_of(v)
+                        for k, v in value.items())
+        elif isinstance(value, uuid.UUID):
+            size += self.size(value.int)
+            for slot in getattr(type(value), "__slots__", ()):
+                size += self.size(getattr(value, slot, None))
+        if payload is not None:
+            self.payloads[payload] += size
+        return size
+
+    def _size_of(self, value, payload=None):
+        """
+        Size of a value referenced by another, without deep only objects and
+        containers are counted
+        """
+        if self.deep or isinstance(
+                value, (CPIXComparableBase, list, tuple, dict)):
+            return self.size(value, payload)
+        return 0
+
+
+def memory_usage(cpix, deep=True):
+    """
+    Return the bytes used by a CPIX document, per section and in total
+
+    With deep the values referenced by the entries (key IDs, keys, payloads,
+    strings and dates) are counted and also broken down per payload type,
+    otherwise only the document's objects and lists are counted. Values shared
+    between entries, such as interned payloads, are counted once
+    """
+    sizer = _Sizer(deep)
+    usage = {}
+    for name, slot in SECTIONS:
+        usage[name] = sizer.size(getattr(cpix, slot))
+    usage["cpix"] = sizer.size(cpix)
+    usage["total"] = sum(usage.values())
+    if deep:
+        usage["payloads"] = sizer.payloads
+    return usage
+
+
+def _snapshot():
+    """Take a snapshot of the traced memory, excluding tracemalloc itself"""
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)])
+
+
+def _profile(function):
+    """
+    Return the peak and retained bytes and the net number of memory blocks
+    allocated by calling function, and its result
+
+    Python < 3.9 cannot reset the peak, there the peak is the highest since
+    tracing started, which can be above the peak of function when tracing
+    was already running
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = _snapshot()
+        current = tracemalloc.get_traced_memory()[0]
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        result = function()
+        retained, peak = tracemalloc.get_traced_memory()
+        after = _snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+    return {
+        "peak": peak - current,
+        "retained": retained - current,
+        "blocks": sum(stat.count_diff
+                      for stat in after.compare_to(before, "filename")),
+    }, result
+
+
+def allocation_profile(xml):
+    """
+    Profile the memory allocated when parsing a CPIX XML document and
+    serializing it with element and pretty_print
+
+    Returns a dict of operation to the peak bytes allocated while it ran, the
+    bytes still allocated afterwards including its result and the net number
+    of memory blocks allocated
+    """
+    from .cpix import CPIX
+
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    profile = {}
+    profile["parse"], cpix = _profile(lambda: CPIX.parse(xml))
+    profile["element"], _ = _profile(cpix.element)
+    profile["pretty_print"], _ = _profile(cpix.pretty_print)
+    return profile
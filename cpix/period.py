@@ -3,6 +3,7 @@ Content key classes
 """
 from . import etree, NSMAP
 from .base import CPIXComparableBase, CPIXListBase
+from .timeline import PeriodTimeline
 from datetime import datetime
 from isodate import datetime_isoformat, parse_datetime
 
@@ -10,13 +11,54 @@ from isodate import datetime_isoformat, parse_datetime
 class PeriodList(CPIXListBase):
     """List of Periods"""
 
+    __slots__ = ()
+
     def check(self, value):
         if not isinstance(value, Period):
             raise TypeError("{} is not a Period".format(value))
 
+    def timeline(self):
+        """
+        Return a PeriodTimeline finding the periods of this list by time
+        and by index
+        """
+        return PeriodTimeline(self)
+
+    def to_numpy(self):
+        """
+        Return a NumPy structured array with one row per period, the
+        start and end times are stored in UTC with flags for whether they
+        had a timezone, so naive times are restored naive
+        """
+        from .interop import periods_to_numpy
+        return periods_to_numpy(self)
+
+    @classmethod
+    def from_numpy(cls, array):
+        """
+        Create a list from a NumPy structured array, as returned by to_numpy
+        """
+        from .interop import periods_from_numpy
+        return periods_from_numpy(cls, array)
+
+    def to_arrow(self):
+        """
+        Return a pyarrow Table with one row per period
+        """
+        from .interop import periods_to_arrow
+        return periods_to_arrow(self)
+
+    @classmethod
+    def from_arrow(cls, table):
+        """
+        Create a list from a pyarrow Table, as returned by to_arrow
+        """
+        from .interop import periods_from_arrow
+        return periods_from_arrow(cls, table)
+
     def element(self):
         el = etree.Element("ContentKeyPeriodList", nsmap=NSMAP)
-        for period in self:
+        for period in self._list:
             el.append(period.element())
         return el
 
@@ -53,6 +95,8 @@ class Period(CPIXComparableBase):
     inclusive
     """
 
+    __slots__ = ("_id", "_index", "_start", "_end")
+
     def __init__(self, id, index=None, start=None, end=None):
         self._id = None
         self._index = None
@@ -64,6 +108,19 @@ class Period(CPIXComparableBase):
         self.start = start
         self.end = end
 
+    @staticmethod
+    def _from_values(id, index, start, end):
+        """
+        Create a Period from already validated values, skipping the property
+        setters
+        """
+        period = Period.__new__(Period)
+        period._id = id
+        period._index = index
+        period._start = start
+        period._end = end
+        return period
+
     @property
     def id(self):
         return self._id
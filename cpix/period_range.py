@@ -0,0 +1,412 @@
+"""
+Range compressed period list
+"""
+import re
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
+from isodate import datetime_isoformat, parse_datetime
+from . import etree, NSMAP
+from .period import Period, PeriodList
+
+
+# last run of digits in a period id, the counter of a range of periods
+ID_NUMBER = re.compile(r"\d+(?=\D*$)")
+
+
+PeriodRange = namedtuple(
+    "PeriodRange",
+    ("id_format", "first", "count", "indexed", "start", "end", "interval"))
+PeriodRange.__doc__ = """
+Run of count periods
+
+The id of the nth period of the range is id_format formatted with
+index=first + n. Indexed ranges have index first + n, otherwise the nth
+period starts at start + n * interval and ends at end + n * interval.
+interval is None for ranges of a single period
+"""
+
+
+def _escape(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _id_format(id, index=None):
+    """
+    Return the id format and first counter of a range starting with a
+    period, the last number in the id is taken as the counter. For indexed
+    periods the counter is the index
+    """
+    match = ID_NUMBER.search(id)
+    if match is None or (index is not None and int(match.group()) != index):
+        return _escape(id), index or 0
+    digits = match.group()
+    if len(digits) > 1 and digits.startswith("0"):
+        placeholder = "{{index:0{}d}}".format(len(digits))
+    else:
+        placeholder = "{index}"
+    return (_escape(id[:match.start()]) + placeholder +
+            _escape(id[match.end():]), int(digits))
+
+
+def _new_range(id, index, start, end):
+    """Return a range of the single period with the given values"""
+    id_format, first = _id_format(id, index)
+    return PeriodRange(id_format, first, 1, index is not None, start, end,
+                       None)
+
+
+def _join_ranges(a, b):
+    """Return the range of b following a, or None if they can not be joined"""
+    if (a.id_format != b.id_format or a.indexed != b.indexed or
+            a.first + a.count != b.first):
+        return None
+    if a.indexed:
+        return a._replace(count=a.count + b.count)
+    if None in (a.start, a.end, b.start, b.end):
+        return None
+    if a.end - a.start != b.end - b.start:
+        return None
+    interval = a.interval or b.interval or b.start - a.start
+    if (interval <= timedelta(0) or
+            (a.interval is not None and a.interval != interval) or
+            (b.interval is not None and b.interval != interval) or
+            b.start != a.start + a.count * interval):
+        return None
+    return a._replace(count=a.count + b.count, interval=interval)
+
+
+def _sub_range(period_range, offset, count):
+    """Return the range of count periods starting at offset"""
+    start, end = period_range.start, period_range.end
+    if offset and not period_range.indexed:
+        start += offset * period_range.interval
+        end += offset * period_range.interval
+    return period_range._replace(
+        first=period_range.first + offset, count=count, start=start, end=end,
+        interval=period_range.interval if count > 1 else None)
+
+
+def _range_values(period_range, offset):
+    """Return the id, index, start and end of the period at offset"""
+    counter = period_range.first + offset
+    id = period_range.id_format.format(index=counter)
+    if period_range.indexed:
+        return id, counter, None, None
+    start, end = period_range.start, period_range.end
+    if offset:
+        start += offset * period_range.interval
+        end += offset * period_range.interval
+    return id, None, start, end
+
+
+def _parse_time(value, name):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return parse_datetime(value)
+    except Exception:
+        raise TypeError("{} should be a datetime".format(name))
+
+
+class RangePeriodList(PeriodList):
+    """
+    List of Periods stored as ranges
+
+    Runs of periods with consecutive indexes, or with evenly spaced start and
+    end times, and ids which only differ by a counter are stored as a single
+    PeriodRange. Period objects are created when an item is accessed and are
+    copies, so changes to them must be assigned back to the list.
+
+    Appending extends the last range where possible, changes elsewhere in
+    the list split ranges.
+    """
+
+    __slots__ = ("_ranges", "_offsets")
+
+    def __init__(self, *args, **kwargs):
+        self._ranges = []
+        self._offsets = None
+        super().__init__(*args, **kwargs)
+
+    def _writable(self):
+        if isinstance(self._ranges, tuple):
+            self._ranges = list(self._ranges)
+            self._offsets = None
+
+    def _range_offsets(self):
+        """Return the position of the first period of each range"""
+        offsets = self._offsets
+        if offsets is None:
+            offsets = []
+            total = 0
+            for period_range in self._ranges:
+                offsets.append(total)
+                total += period_range.count
+            self._offsets = offsets
+        return offsets
+
+    def _locate(self, position):
+        """Return the index of the range holding position and the offset"""
+        offsets = self._range_offsets()
+        index = bisect_right(offsets, position) - 1
+        return index, position - offsets[index]
+
+    def _position(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("list index out of range")
+        return index
+
+    def _split(self, position):
+        """
+        Split the range holding position so a range starts at position,
+        returns the index of that range
+        """
+        if position == len(self):
+            return len(self._ranges)
+        index, offset = self._locate(position)
+        if offset:
+            period_range = self._ranges[index]
+            self._ranges[index:index + 1] = [
+                _sub_range(period_range, 0, offset),
+                _sub_range(period_range, offset, period_range.count - offset),
+            ]
+            self._offsets = None
+            index += 1
+        return index
+
+    def _add_range(self, period_range):
+        """Append a range, joining it to the last range where possible"""
+        if period_range.count == 0:
+            return
+        ranges = self._ranges
+        if ranges:
+            joined = _join_ranges(ranges[-1], period_range)
+            if joined is not None:
+                ranges[-1] = joined
+                return
+        if self._offsets is not None:
+            self._offsets.append(len(self))
+        ranges.append(period_range)
+
+    def __len__(self):
+        if not self._ranges:
+            return 0
+        return self._range_offsets()[-1] + self._ranges[-1].count
+
+    def __iter__(self):
+        for period_range in self._ranges:
+            for offset in range(period_range.count):
+                yield Period._from_values(
+                    *_range_values(period_range, offset))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        range_index, offset = self._locate(self._position(index))
+        return Period._from_values(
+            *_range_values(self._ranges[range_index], offset))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(self)))
+            values = list(value)
+            for v in values:
+                self.check(v)
+            if index.step in (None, 1):
+                del self[index]
+                for offset, v in enumerate(values):
+                    self.insert(positions.start + offset, v)
+            elif len(values) != len(positions):
+                raise ValueError(
+                    "attempt to assign sequence of size {} to extended slice "
+                    "of size {}".format(len(values), len(positions)))
+            else:
+                for position, v in zip(positions, values):
+                    self[position] = v
+            return
+
+        self.check(value)
+        position = self._position(index)
+        del self[position]
+        self.insert(position, value)
+
+    def __delitem__(self, index):
+        self._writable()
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(self)))
+            if positions.step != 1:
+                for position in sorted(positions, reverse=True):
+                    del self[position]
+                return
+            first, last = positions.start, max(positions.start, positions.stop)
+        else:
+            first = self._position(index)
+            last = first + 1
+        first_range = self._split(first)
+        last_range = self._split(last)
+        del self._ranges[first_range:last_range]
+        self._offsets = None
+
+    def insert(self, index, value):
+        self._writable()
+        self.check(value)
+        length = len(self)
+        if index < 0:
+            index = max(0, index + length)
+        period_range = _new_range(value.id, value.index, value.start,
+                                  value.end)
+        if index >= length:
+            self._add_range(period_range)
+        else:
+            self._ranges.insert(self._split(index), period_range)
+            self._offsets = None
+
+    @property
+    def list(self):
+        return list(self)
+
+    @list.setter
+    def list(self, l):
+        if not isinstance(l, list):
+            raise TypeError("must be a list")
+        self._writable()
+        for x in l:
+            self.check(x)
+        self._ranges = []
+        self._offsets = None
+        for x in l:
+            self._add_range(_new_range(x.id, x.index, x.start, x.end))
+
+    def ranges(self):
+        """Return the PeriodRanges of the list"""
+        return tuple(self._ranges)
+
+    def extend_indices(self, first, count, id_format="period_{index}"):
+        """
+        Append count periods with indexes starting at first, the id of each
+        period is id_format formatted with its index
+        """
+        if not isinstance(first, int) or not isinstance(count, int):
+            raise TypeError("first and count should be ints")
+        if count < 0:
+            raise ValueError("count should not be negative")
+        self._writable()
+        self._add_range(
+            PeriodRange(id_format, first, count, True, None, None, None))
+
+    def extend_windows(self, start, duration, count, interval=None, first=0,
+                       id_format="period_{index}"):
+        """
+        Append count periods of duration, the first starting at start and
+        each following period interval after the previous one. interval
+        defaults to duration. The id of each period is id_format formatted
+        with a counter starting at first
+        """
+        start = _parse_time(start, "start")
+        if interval is None:
+            interval = duration
+        if (not isinstance(duration, timedelta) or
+                not isinstance(interval, timedelta)):
+            raise TypeError("duration and interval should be timedeltas")
+        if interval <= timedelta(0):
+            raise ValueError("interval should be positive")
+        if not isinstance(first, int) or not isinstance(count, int):
+            raise TypeError("first and count should be ints")
+        if count < 0:
+            raise ValueError("count should not be negative")
+        self._writable()
+        self._add_range(PeriodRange(
+            id_format, first, count, False, start, start + duration,
+            interval if count > 1 else None))
+
+    def merge_windows(self):
+        """
+        Return a new RangePeriodList with overlapping or adjacent time
+        windows merged, each merged window keeps the id of its earliest
+        period. Periods which are not time windows come first, in their
+        current order, followed by the merged windows in time order
+        """
+        merged = RangePeriodList()
+        windows = []
+        for period_range in self._ranges:
+            if (period_range.indexed or period_range.start is None or
+                    period_range.end is None):
+                merged._add_range(period_range)
+            elif (period_range.count > 1 and period_range.end -
+                    period_range.start >= period_range.interval):
+                # every window of the range overlaps or touches the next
+                windows.append((
+                    period_range.start,
+                    period_range.end +
+                    (period_range.count - 1) * period_range.interval,
+                    period_range.id_format.format(index=period_range.first),
+                ))
+            else:
+                for offset in range(period_range.count):
+                    id, _, start, end = _range_values(period_range, offset)
+                    windows.append((start, end, id))
+
+        windows.sort(key=lambda window: window[0])
+
+        current = None
+        for start, end, id in windows:
+            if current is not None and start <= current[1]:
+                current[1] = max(current[1], end)
+                continue
+            if current is not None:
+                merged._add_range(_new_range(current[2], None, *current[:2]))
+            current = [start, end, id]
+        if current is not None:
+            merged._add_range(_new_range(current[2], None, *current[:2]))
+        return merged
+
+    def element(self):
+        """Returns XML element, built directly from the ranges"""
+        el = etree.Element("ContentKeyPeriodList", nsmap=NSMAP)
+        for period_range in self._ranges:
+            for offset in range(period_range.count):
+                id, index, start, end = _range_values(period_range, offset)
+                period = etree.SubElement(
+                    el, "ContentKeyPeriod", nsmap=NSMAP)
+                period.set("id", id)
+                if index is not None:
+                    period.set("index", str(index))
+                if start is not None:
+                    period.set("start", datetime_isoformat(start))
+                if end is not None:
+                    period.set("end", datetime_isoformat(end))
+        return el
+
+    @staticmethod
+    def parse(xml):
+        """
+        Parse and return new RangePeriodList, without creating Period
+        objects
+        """
+        if isinstance(xml, (str, bytes)):
+            xml = etree.fromstring(xml)
+
+        new_period_list = RangePeriodList()
+
+        for element in xml.getchildren():
+            tag = etree.QName(element.tag).localname
+            if tag != "ContentKeyPeriod":
+                continue
+            index = start = end = None
+            if "index" in element.attrib:
+                index = int(element.attrib["index"])
+            if "start" in element.attrib:
+                start = _parse_time(element.attrib["start"], "start")
+            if "end" in element.attrib:
+                end = _parse_time(element.attrib["end"], "end")
+            if index is not None and (start is not None or end is not None):
+                raise ValueError(
+                    "index is mutually exclusive with start and end")
+            new_period_list._add_range(
+                _new_range(element.attrib["id"], index, start, end))
+
+        return new_period_list
@@ -0,0 +1,257 @@
+"""
+Registry of known DRM systems
+"""
+import warnings
+from importlib import import_module
+from . import uuid, PLAYREADY_SYSTEM_ID, WIDEVINE_SYSTEM_ID
+
+
+# entry point group of packages registering DRM systems, each entry point is
+# either a DRMSystemInfo or a function called with the registry
+ENTRY_POINT_GROUP = "cpix.drm_systems"
+
+
+def _to_uuid(system_id):
+    if isinstance(system_id, uuid.UUID):
+        return system_id
+    if isinstance(system_id, str):
+        return uuid.UUID(system_id)
+    raise TypeError("system_id should be a uuid")
+
+
+def _entry_points(group):
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        # python < 3.8
+        from importlib_metadata import entry_points
+
+    try:
+        return entry_points(group=group)
+    except TypeError:
+        # python < 3.10
+        return entry_points().get(group, [])
+
+
+class DRMSystemInfo(object):
+    """
+    Name, metadata and generators of a DRM system
+
+    generators is a dict of generator name (such as "pssh") to a function or
+    the dotted path of one, "module:function". Paths are imported the first
+    time the generator is requested
+    """
+
+    __slots__ = ("_system_id", "_name", "_generators", "_metadata")
+
+    def __init__(self, system_id, name, generators=None, **metadata):
+        self._system_id = _to_uuid(system_id)
+        if not isinstance(name, str):
+            raise TypeError("name should be a string")
+        self._name = name
+        self._generators = dict(generators or {})
+        self._metadata = metadata
+
+    def __repr__(self):
+        return "DRMSystemInfo({!r}, {!r})".format(
+            str(self._system_id), self._name)
+
+    @property
+    def system_id(self):
+        return self._system_id
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def metadata(self):
+        return self._metadata
+
+    @property
+    def generators(self):
+        """Names of the available generators"""
+        return frozenset(self._generators)
+
+    def generator(self, name):
+        """
+        Return the named generator function, raises KeyError if the system
+        has none
+        """
+        try:
+            generator = self._generators[name]
+        except KeyError:
+            raise KeyError("{} has no {} generator".format(self._name, name))
+        if isinstance(generator, str):
+            module, _, attribute = generator.partition(":")
+            generator = getattr(import_module(module), attribute)
+            self._generators[name] = generator
+        return generator
+
+
+class DRMSystemRegistry(object):
+    """
+    Registry of DRM system IDs
+
+    Membership is tested against a frozenset of the IDs. Registering or
+    unregistering a system replaces the lookup tables rather than changing
+    them, so lookups need no locking. Systems registered by installed
+    packages through the cpix.drm_systems entry point group are loaded the
+    first time an ID is not found or the registry is iterated
+
+    system_ids is an optional list kept up to date with the registered IDs,
+    IDs added to it directly are known systems without a DRMSystemInfo
+    """
+
+    __slots__ = ("_systems", "_ids", "_names", "_entry_points_loaded",
+                 "_system_ids")
+
+    def __init__(self, systems=(), load_entry_points=True, system_ids=None):
+        self._systems = {}
+        self._ids = frozenset()
+        self._names = {}
+        self._entry_points_loaded = not load_entry_points
+        self._system_ids = system_ids
+        for system in systems:
+            self.add(system)
+
+    def _update(self, systems):
+        self._names = {system.name.lower(): system
+                       for system in systems.values()}
+        self._ids = frozenset(systems)
+        self._systems = systems
+
+    def add(self, system):
+        """Add a DRMSystemInfo, replacing any with the same system ID"""
+        if not isinstance(system, DRMSystemInfo):
+            raise TypeError("{} is not a DRMSystemInfo".format(system))
+        systems = dict(self._systems)
+        systems[system.system_id] = system
+        self._update(systems)
+        if (self._system_ids is not None and
+                system.system_id not in self._system_ids):
+            self._system_ids.append(system.system_id)
+        return system
+
+    def register(self, system_id, name, generators=None, **metadata):
+        """
+        Register a DRM system and return its DRMSystemInfo
+        """
+        return self.add(
+            DRMSystemInfo(system_id, name, generators, **metadata))
+
+    def unregister(self, system_id):
+        """Remove a DRM system, raises KeyError if it is not registered"""
+        system_id = _to_uuid(system_id)
+        systems = dict(self._systems)
+        del systems[system_id]
+        self._update(systems)
+        if self._system_ids is not None and system_id in self._system_ids:
+            self._system_ids.remove(system_id)
+
+    def load_entry_points(self):
+        """
+        Register the DRM systems of the cpix.drm_systems entry points, an
+        entry point which fails to load or register is skipped with a warning
+        """
+        self._entry_points_loaded = True
+        for entry_point in _entry_points(ENTRY_POINT_GROUP):
+            try:
+                value = entry_point.load()
+                if isinstance(value, DRMSystemInfo):
+                    self.add(value)
+                else:
+                    value(self)
+            except Exception as e:
+                warnings.warn("skipped DRM system entry point {}: {!r}".format(
+                    getattr(entry_point, "name", entry_point), e))
+
+    def _find(self, system_id):
+        system = self._systems.get(system_id)
+        if system is None and not self._entry_points_loaded:
+            self.load_entry_points()
+            system = self._systems.get(system_id)
+        return system
+
+    def __contains__(self, system_id):
+        if not isinstance(system_id, uuid.UUID):
+            try:
+                system_id = _to_uuid(system_id)
+            except (TypeError, ValueError):
+                return False
+        if system_id in self._ids:
+            return True
+        if self._find(system_id) is not None:
+            return True
+        return self._system_ids is not None and system_id in self._system_ids
+
+    def __getitem__(self, system_id):
+        system = self._find(_to_uuid(system_id))
+        if system is None:
+            raise KeyError("system_id {} is unknown".format(system_id))
+        return system
+
+    def get(self, system_id, default=None):
+        """
+        Return the DRMSystemInfo of system_id, or default if it is unknown
+        """
+        try:
+            return self[system_id]
+        except KeyError:
+            return default
+
+    def by_name(self, name, default=None):
+        """
+        Return the DRMSystemInfo with name, ignoring case
+        """
+        if not self._entry_points_loaded:
+            self.load_entry_points()
+        return self._names.get(name.lower(), default)
+
+    def generator(self, system_id, name):
+        """
+        Return the named generator function of a DRM system
+        """
+        return self[system_id].generator(name)
+
+    def __iter__(self):
+        if not self._entry_points_loaded:
+            self.load_entry_points()
+        return iter(self._systems)
+
+    def __len__(self):
+        if not self._entry_points_loaded:
+            self.load_entry_points()
+        return len(self._systems)
+
+
+# IDs of the registered systems, the list cpix.VALID_SYSTEM_IDS used to be.
+# IDs appended to it are accepted as known systems, DRM_SYSTEMS.register is
+# preferred as it also names the system
+VALID_SYSTEM_IDS = []
+
+DRM_SYSTEMS = DRMSystemRegistry([
+    DRMSystemInfo("1077efec-c0b2-4d02-ace3-3c1e52e2fb4b", "ClearKey",
+                  key_system="org.w3.clearkey"),
+    DRMSystemInfo(PLAYREADY_SYSTEM_ID, "PlayReady", {
+        "pssh": "cpix.drm.playready:generate_pssh",
+        "wrmheader": "cpix.drm.playready:generate_wrmheader",
+        "content_key": "cpix.drm.playready:generate_content_key",
+    }, key_system="com.microsoft.playready"),
+    DRMSystemInfo("F239E769-EFA3-4850-9C16-A903C6932EFB", "Adobe Primetime",
+                  key_system="com.adobe.primetime"),
+    DRMSystemInfo("5E629AF5-38DA-4063-8977-97FFBD9902D4", "Marlin",
+                  key_system="com.marlin-drm"),
+    DRMSystemInfo("9a27dd82-fde2-4725-8cbc-4234aa06ec09", "Verimatrix"),
+    DRMSystemInfo(WIDEVINE_SYSTEM_ID, "Widevine", {
+        "pssh": "cpix.drm.widevine:generate_pssh",
+        "widevine_data": "cpix.drm.widevine:generate_widevine_data",
+    }, key_system="com.widevine.alpha"),
+    DRMSystemInfo("80a6be7e-1448-4c37-9e70-d5aebe04c8d2", "Irdeto"),
+    DRMSystemInfo("279fe473-512c-48fe-ade8-d176fee6b40f", "Latens"),
+    DRMSystemInfo("B4413586-C58C-FFB0-94A5-D4896C1AF6C3", "Viaccess-Orca"),
+    DRMSystemInfo("94CE86FB-07FF-4F43-ADB8-93D2FA968CA2", "FairPlay",
+                  key_system="com.apple.fps"),
+    DRMSystemInfo("81376844-F976-481E-A84E-CC25D39B0B33", "AES-128"),
+    DRMSystemInfo("3D5E6D35-9B9A-41E8-B843-DD3C6E72C42C", "ChinaDRM"),
+], system_ids=VALID_SYSTEM_IDS)
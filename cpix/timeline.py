@@ -0,0 +1,127 @@
+"""
+Lookup of key periods by time and index
+"""
+from bisect import bisect_left, bisect_right
+from .validation import _utc
+
+
+class PeriodTimeline(object):
+    """
+    Index of the periods of a PeriodList by start time and by index
+
+    Periods with start and end times are kept sorted by start, with the
+    running maximum of their ends so a search back from a time stops once no
+    earlier window can reach it, and indexed periods are kept sorted by
+    index. Lookups are binary searches. Times without a timezone are taken
+    as UTC, as when a document is validated, so parsed periods and periods
+    created with naive times can be mixed
+
+    Periods appended to the list, directly or with append, are indexed on
+    the next lookup. Other changes to the list are only seen after rebuild
+    """
+
+    __slots__ = ("_periods", "_count", "_starts", "_ends", "_max_ends",
+                 "_windows", "_indices", "_indexed")
+
+    def __init__(self, periods):
+        self._periods = periods
+        self.rebuild()
+
+    def rebuild(self):
+        """Index the periods of the list again"""
+        self._count = 0
+        self._starts = []
+        self._ends = []
+        self._max_ends = []
+        self._windows = []
+        self._indices = []
+        self._indexed = []
+        self._sync()
+
+    def _sync(self):
+        """Index the periods appended to the list since the last lookup"""
+        count = len(self._periods)
+        if count < self._count:
+            self.rebuild()
+        elif count > self._count:
+            for period in self._periods[self._count:]:
+                self._add(period)
+            self._count = count
+
+    def _add(self, period):
+        if period.index is not None:
+            position = bisect_right(self._indices, period.index)
+            self._indices.insert(position, period.index)
+            self._indexed.insert(position, period)
+        if period.start is None or period.end is None:
+            return
+        start = _utc(period.start)
+        end = _utc(period.end)
+        starts = self._starts
+        if not starts or starts[-1] <= start:
+            # rotation appends periods in time order
+            starts.append(start)
+            self._ends.append(end)
+            self._windows.append(period)
+            self._max_ends.append(max(self._max_ends[-1], end)
+                                  if self._max_ends else end)
+            return
+        position = bisect_right(starts, start)
+        starts.insert(position, start)
+        self._ends.insert(position, end)
+        self._windows.insert(position, period)
+        max_ends = self._max_ends[:position]
+        for end in self._ends[position:]:
+            max_ends.append(max(max_ends[-1], end) if max_ends else end)
+        self._max_ends = max_ends
+
+    def append(self, period):
+        """Append a period to the list and index it"""
+        self._periods.append(period)
+        self._sync()
+
+    def __len__(self):
+        self._sync()
+        return self._count
+
+    def period_at(self, time):
+        """
+        Return the period whose window holds time, start inclusive and end
+        exclusive, or None. Of overlapping windows the latest to start wins
+        """
+        self._sync()
+        time = _utc(time)
+        position = bisect_right(self._starts, time) - 1
+        while position >= 0 and self._max_ends[position] > time:
+            if self._ends[position] > time:
+                return self._windows[position]
+            position -= 1
+        return None
+
+    def periods_between(self, start, end):
+        """
+        Return the periods whose windows overlap the time range from start
+        to end, ordered by start
+        """
+        self._sync()
+        start = _utc(start)
+        end = _utc(end)
+        periods = []
+        position = bisect_left(self._starts, end) - 1
+        while position >= 0 and self._max_ends[position] > start:
+            if self._ends[position] > start:
+                periods.append(self._windows[position])
+            position -= 1
+        periods.reverse()
+        return periods
+
+    def period_for_index(self, index):
+        """
+        Return the indexed period in effect at index, the period with the
+        highest index not above it, or None
+        """
+        self._sync()
+        position = bisect_right(self._indices, index) - 1
+        if position < 0:
+            return None
+        return self._indexed[position]
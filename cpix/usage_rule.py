@@ -1,22 +1,113 @@
 """
 Usage rule classes
 """
-from . import etree, uuid
+from . import etree, uuid, to_key_id
 from .base import CPIXListBase
+from operator import attrgetter
 from . import AudioFilter, BitrateFilter, VideoFilter, KeyPeriodFilter, \
     LabelFilter
+from .matcher import UsageRuleMatcher
+from .conflicts import usage_rule_conflicts
+
+
+def _check_filter(value):
+    if not isinstance(value, (KeyPeriodFilter, LabelFilter, AudioFilter,
+                              VideoFilter, BitrateFilter)):
+        raise TypeError(
+            "{} is not filter (KeyPeriodFilter, LabelFilter, AudioFilter, "
+            "VideoFilter, BitrateFilter)".format(value))
+
+
+def _check_filters(filters):
+    """Check and freeze a sequence of filters, which interns them"""
+    for value in filters:
+        _check_filter(value)
+    return [value.freeze() for value in filters]
+
+
+def _labels(usage_rule):
+    """Return the labels of the LabelFilters of a usage rule"""
+    return {filter.label for filter in usage_rule._list
+            if isinstance(filter, LabelFilter)}
 
 
 class UsageRuleList(CPIXListBase):
-    """List of UsageRules"""
+    """
+    List of UsageRules, indexed by kid and by the labels of their
+    LabelFilters. A rule whose filters are changed after it was added must
+    be assigned back to the list, or reindex called
+    """
+
+    __slots__ = ()
+
+    index_keys = {"kid": attrgetter("kid"), "label": _labels}
+    multi_index_keys = frozenset(["label"])
 
     def check(self, value):
         if not isinstance(value, UsageRule):
             raise TypeError("{} is not a UsageRule".format(value))
 
+    @classmethod
+    def from_records(cls, kids, filters=()):
+        """
+        Create a list of UsageRules from a column of kids
+
+        filters is either a sequence of filters given to every rule or an
+        iterable with one sequence of filters per kid. The filters are
+        checked and frozen, so the rules share one immutable instance of
+        each distinct filter
+        """
+        kids = [to_key_id(kid) for kid in kids]
+        filters = list(filters)
+        if all(not isinstance(f, (list, tuple)) for f in filters):
+            checked = _check_filters(filters)
+            rules = [UsageRule._from_values(kid, checked) for kid in kids]
+        elif len(filters) != len(kids):
+            raise ValueError("filters must have one value per kid")
+        else:
+            rules = [
+                UsageRule._from_values(kid, _check_filters(rule_filters))
+                for kid, rule_filters in zip(kids, filters)
+            ]
+        return cls._from_checked(rules)
+
+    def for_kid(self, kid):
+        """
+        Return a list of the UsageRules for kid
+        """
+        return self._lookup("kid", to_key_id(kid))
+
+    def for_label(self, label):
+        """
+        Return a list of the UsageRules with a LabelFilter for label
+        """
+        return self._lookup("label", label)
+
+    def kids_for_label(self, label):
+        """
+        Return a list of the distinct kids of the UsageRules with a
+        LabelFilter for label, in the order the rules were added
+        """
+        return list(dict.fromkeys(
+            usage_rule.kid for usage_rule in self._lookup("label", label)))
+
+    def matcher(self):
+        """
+        Return a UsageRuleMatcher resolving tracks to the kids of these
+        rules, the first matching rule in the list wins
+        """
+        return UsageRuleMatcher(self._list)
+
+    def conflicts(self):
+        """
+        Return the UsageRuleConflicts of the list, the pairs of rules with
+        different kids which match the same tracks
+        """
+        return usage_rule_conflicts(self._list)
+
     def element(self):
         el = etree.Element("ContentKeyUsageRuleList")
-        for usage_rule in self:
+        for usage_rule in self._list:
             el.append(usage_rule.element())
         return el
 
@@ -47,45 +138,60 @@ class UsageRule(CPIXListBase):
         kid: key ID to which this rule applies
     And optional child elements:
         KeyPeriodFilter: period id based filters
-        LabelFilter: not currently supported
+        LabelFilter: label based filters
         VideoFilter: video based filters
         AudioFilter: audio based filters
         BitrateFilter: bitrate based filters
+
+    The filters of the presets, of parsed rules and of from_records are
+    interned frozen filters, so equal filters are shared between rules. They
+    are replaced rather than changed, rule[0] = VideoFilter(...), and stay
+    frozen in thawed rules
     """
 
+    __slots__ = ("_kid",)
+
+    frozen_items = True
+
     def __init__(self, kid, filters=[]):
-        self.list = list()
-        self.extend(list(filters))
+        super().__init__(list(filters))
         self._kid = None
 
         self.kid = kid
 
+    @staticmethod
+    def _from_values(kid, filters):
+        """
+        Create a UsageRule from already validated values. kid must be a
+        KeyID and filters checked, the rule gets its own copy
+        of the filter list
+        """
+        usage_rule = UsageRule.__new__(UsageRule)
+        usage_rule._kid = kid
+        usage_rule._list = list(filters)
+        usage_rule.reindex()
+        return usage_rule
+
     @property
     def kid(self):
         return self._kid
 
     @kid.setter
     def kid(self, kid):
-        if isinstance(kid, str):
-            self._kid = uuid.UUID(kid)
-        elif isinstance(kid, uuid.UUID):
-            self._kid = kid
+        if isinstance(kid, (str, uuid.UUID)):
+            self._kid = to_key_id(kid)
         else:
             raise TypeError("kid should be a uuid")
 
     def check(self, value):
-        if not isinstance(value, (KeyPeriodFilter, LabelFilter, AudioFilter,
-                                  VideoFilter, BitrateFilter)):
-            raise TypeError(
-                "{} is not filter (KeyPeriodFilter, LabelFilter, AudioFilter, "
-                "VideoFilter, BitrateFilter)".format(value))
+        _check_filter(value)
 
     def element(self):
         """Returns XML element"""
         el = etree.Element("ContentKeyUsageRule")
         if self.kid is not None:
             el.set("kid", str(self.kid))
-        for filter in self:
+        for filter in self._list:
             el.append(filter.element())
         return el
 
@@ -106,7 +212,7 @@ class UsageRule(CPIXListBase):
             if tag in ["KeyPeriodFilter", "LabelFilter", "VideoFilter",
                        "AudioFilter", "BitrateFilter"]:
                 filter = globals()[tag].parse(element)
-                new_usage_rule.append(filter)
+                new_usage_rule.append(filter.freeze())
 
         return new_usage_rule
 
@@ -115,10 +221,13 @@ class AudioUsageRule(UsageRule):
     """
     Default usage rule for audio, with a single AudioFilter with no parameters
     """
+
+    __slots__ = ()
+
     def __init__(self, kid):
         super().__init__(
             kid=kid,
-            filters=[AudioFilter()])
+            filters=[AudioFilter().freeze()])
 
 
 class VideoUsageRule(UsageRule):
@@ -126,10 +235,12 @@ class VideoUsageRule(UsageRule):
     Default usage rule for vide, with a single VideoFilter with no parameters
     """
 
+    __slots__ = ()
+
     def __init__(self, kid):
         super().__init__(
             kid=kid,
-            filters=[VideoFilter()])
+            filters=[VideoFilter().freeze()])
 
 
 class SDVideoUsageRule(UsageRule):
@@ -138,10 +249,12 @@ class SDVideoUsageRule(UsageRule):
     VideoFilter maxPixels <= 768 * 576
     """
 
+    __slots__ = ()
+
     def __init__(self, kid):
         super().__init__(
             kid=kid,
-            filters=[VideoFilter(max_pixels=442368)])
+            filters=[VideoFilter(max_pixels=442368).freeze()])
 
 
 class HDVideoUsageRule(UsageRule):
@@ -152,12 +265,14 @@ class HDVideoUsageRule(UsageRule):
         maxPixels <= 1920 * 1080
     """
 
+    __slots__ = ()
+
     def __init__(self, kid):
         super().__init__(
             kid=kid,
             filters=[VideoFilter(
                 min_pixels=442369,
-                max_pixels=2073600)])
+                max_pixels=2073600).freeze()])
 
 
 class UHD1VideoUsageRule(UsageRule):
@@ -168,12 +283,14 @@ class UHD1VideoUsageRule(UsageRule):
         maxPixels <= 4096 * 2160
     """
 
+    __slots__ = ()
+
     def __init__(self, kid):
         super().__init__(
             kid=kid,
             filters=[VideoFilter(
                 min_pixels=2073601,
-                max_pixels=8847360)])
+                max_pixels=8847360).freeze()])
 
 
 class UHD2VideoUsageRule(UsageRule):
@@ -183,7 +300,9 @@ class UHD2VideoUsageRule(UsageRule):
         minPixels > 4096 * 2160
     """
 
+    __slots__ = ()
+
     def __init__(self, kid):
         super().__init__(
             kid=kid,
-            filters=[VideoFilter(min_pixels=8847361)])
+            filters=[VideoFilter(min_pixels=8847361).freeze()])
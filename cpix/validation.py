@@ -0,0 +1,354 @@
+"""
+Content validation of CPIX documents
+"""
+import re
+from datetime import timezone
+from struct import unpack_from
+from . import uuid, KeyPeriodFilter, LabelFilter, VideoFilter, AudioFilter, \
+    BitrateFilter
+from .conflicts import first_conflicts
+
+
+PSSH_BOX_TYPE = b"pssh"
+
+# lexical spaces of the XSD types of attributes the model does not restrict,
+# NCName follows the XML 1.0 name characters
+XSD_INTEGER = re.compile(r"[+-]?[0-9]+")
+XSD_NCNAME = re.compile(
+    "[A-Z_a-z\xc0-\xd6\xd8-\xf6\xf8-\u02ff\u0370-\u037d"
+    "\u037f-\u1fff\u200c-\u200d\u2070-\u218f\u2c00-\u2fef"
+    "\u3001-\ud7ff\uf900-\ufdcf\ufdf0-\ufffd\U00010000-\U000effff]"
+    "[A-Z_a-z\xc0-\xd6\xd8-\xf6\xf8-\u02ff\u0370-\u037d"
+    "\u037f-\u1fff\u200c-\u200d\u2070-\u218f\u2c00-\u2fef"
+    "\u3001-\ud7ff\uf900-\ufdcf\ufdf0-\ufffd\U00010000-\U000effff"
+    "\\-.0-9\xb7\u0300-\u036f\u203f-\u2040]*")
+CENC_SCHEME_LENGTH = 4
+
+# the order of the filters of a usage rule in the schema's sequence
+FILTER_ORDER = {
+    KeyPeriodFilter: 0,
+    LabelFilter: 1,
+    VideoFilter: 2,
+    AudioFilter: 3,
+    BitrateFilter: 4,
+}
+# integer attributes of each filter type, as (property, attribute) names
+FILTER_INTEGERS = {
+    VideoFilter: (("min_pixels", "minPixels"), ("max_pixels", "maxPixels"),
+                  ("min_fps", "minFps"), ("max_fps", "maxFps")),
+    AudioFilter: (("min_channels", "minChannels"),
+                  ("max_channels", "maxChannels")),
+    BitrateFilter: (("min_bitrate", "minBitrate"),
+                    ("max_bitrate", "maxBitrate")),
+}
+
+
+class ContentError(str):
+    """
+    Content validation error
+
+    The string is the error message, path is the XPath of the element with
+    the error and rule the name of the rule it breaks
+    """
+
+    def __new__(cls, message, path, rule):
+        error = super().__new__(cls, message)
+        error.path = path
+        error.rule = rule
+        return error
+
+    def __repr__(self):
+        return "ContentError({}, path={!r}, rule={!r})".format(
+            super().__repr__(), self.path, self.rule)
+
+
+def pssh_key_ids(pssh):
+    """
+    Return the key IDs listed in a PSSH box as 16 byte values, version 0
+    boxes have no key ID list so an empty tuple is returned. Raises
+    ValueError if pssh is not a PSSH box
+    """
+    if len(pssh) < 32 or pssh[4:8] != PSSH_BOX_TYPE:
+        raise ValueError("not a PSSH box")
+    size = unpack_from(">I", pssh)[0]
+    if size > len(pssh):
+        raise ValueError("PSSH box is truncated")
+    if pssh[8] == 0:
+        return ()
+    count = unpack_from(">I", pssh, 28)[0]
+    end = 32 + 16 * count
+    if end > size:
+        raise ValueError("PSSH box is truncated")
+    return tuple(pssh[offset:offset + 16] for offset in range(32, end, 16))
+
+
+def _kids(content_keys):
+    """Return the key IDs of a content key list as integers, in order"""
+    columns = getattr(content_keys, "columns", None)
+    if columns is not None:
+        kids = columns()["kid"]
+        return [int.from_bytes(kids[offset:offset + 16], "big")
+                for offset in range(0, len(kids), 16)]
+    return [content_key.kid.int for content_key in content_keys._list]
+
+
+def _utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# names of the rules checked by content_errors
+CONTENT_RULES = frozenset([
+    "duplicate-kid", "duplicate-period-id", "period-overlap",
+    "usage-rule-kid", "period-filter", "usage-rule-conflict",
+    "drm-system-kid", "pssh-kid", "invalid-pssh"])
+# rules checked by default, the checks of validate_content before rules
+# could be chosen, documents which passed them still pass
+DEFAULT_CONTENT_RULES = frozenset(
+    ["usage-rule-kid", "period-filter", "drm-system-kid"])
+
+
+def content_errors(cpix, rules=None):
+    """
+    Generate the ContentErrors of a CPIX document, in a single pass over
+    each list using hash set indexes. rules is a collection of the names of
+    the rules to check, by default DEFAULT_CONTENT_RULES, CONTENT_RULES are
+    all of them:
+        duplicate-kid: content keys must have unique kids
+        duplicate-period-id: periods must have unique ids
+        period-overlap: periods with start and end times must not overlap
+        usage-rule-kid: usage rules must reference a content key
+        period-filter: period filters must reference a period
+        usage-rule-conflict: usage rules with different kids must not match
+            the same tracks
+        drm-system-kid: DRM systems must reference a content key
+        pssh-kid: key IDs listed in a PSSH box must be content keys
+        invalid-pssh: PSSH must be a PSSH box
+    """
+    if rules is None:
+        rules = DEFAULT_CONTENT_RULES
+    rules = frozenset(rules)
+    unknown = rules - CONTENT_RULES
+    if unknown:
+        raise ValueError("unknown content rules: {}".format(
+            ", ".join(sorted(unknown))))
+
+    def checked(rule):
+        return rule in rules
+
+    # content keys, indexed by the integer value of their kid
+    content_kids = _kids(cpix.content_keys)
+    kids = set(content_kids)
+    if len(kids) != len(content_kids) and checked("duplicate-kid"):
+        seen = set()
+        path = "/CPIX/ContentKeyList/ContentKey[{}]"
+        for position, kid in enumerate(content_kids, 1):
+            if kid in seen:
+                yield ContentError(
+                    "duplicate content key kid: {}".format(
+                        uuid.UUID(int=kid)),
+                    path.format(position), "duplicate-kid")
+            seen.add(kid)
+
+    # periods
+    period_ids = set()
+    windows = []
+    check_duplicates = checked("duplicate-period-id")
+    path = "/CPIX/ContentKeyPeriodList/ContentKeyPeriod[{}]"
+    for position, period in enumerate(cpix.periods, 1):
+        if period.id not in period_ids:
+            period_ids.add(period.id)
+        elif check_duplicates:
+            yield ContentError(
+                "duplicate period id: {}".format(period.id),
+                path.format(position), "duplicate-period-id")
+        if period.start is not None and period.end is not None:
+            windows.append(
+                (_utc(period.start), _utc(period.end), position, period.id))
+
+    if checked("period-overlap"):
+        windows.sort()
+        latest = None
+        for start, end, position, id in windows:
+            if latest is not None and start < latest[0]:
+                yield ContentError(
+                    "period {} overlaps period {}".format(id, latest[1]),
+                    path.format(position), "period-overlap")
+            if latest is None or end > latest[0]:
+                latest = (end, id)
+
+    # usage rules
+    check_kids = checked("usage-rule-kid")
+    check_filters = checked("period-filter")
+    path = "/CPIX/ContentKeyUsageRuleList/ContentKeyUsageRule[{}]"
+    for position, usage_rule in enumerate(cpix.usage_rules._list, 1):
+        if check_kids and usage_rule._kid.int not in kids:
+            yield ContentError(
+                "usage rule references missing kid: {kid}".format(
+                    kid=usage_rule.kid),
+                path.format(position), "usage-rule-kid")
+        if not check_filters:
+            continue
+        filter_position = 0
+        for filter in usage_rule._list:
+            if not isinstance(filter, KeyPeriodFilter):
+                continue
+            filter_position += 1
+            if filter.period_id not in period_ids:
+                yield ContentError(
+                    "period filter references missing period: {id}".format(
+                        id=filter.period_id),
+                    path.format(position) +
+                    "/KeyPeriodFilter[{}]".format(filter_position),
+                    "period-filter")
+
+    if checked("usage-rule-conflict"):
+        for conflict in first_conflicts(cpix.usage_rules._list):
+            yield ContentError(
+                "usage rule matches the same tracks as usage rule {} with a "
+                "different kid".format(conflict.first + 1),
+                path.format(conflict.second + 1), "usage-rule-conflict")
+
+    # DRM systems, PSSH boxes are often shared so each is parsed once
+    check_kids = checked("drm-system-kid")
+    check_pssh_kids = checked("pssh-kid")
+    check_pssh = check_pssh_kids or checked("invalid-pssh")
+    path = "/CPIX/DRMSystemList/DRMSystem[{}]"
+    pssh_kids = {}
+    for position, drm_system in enumerate(cpix.drm_systems._list, 1):
+        if check_kids and drm_system._kid.int not in kids:
+            yield ContentError(
+                "DRM system references missing kid: {kid}".format(
+                    kid=drm_system.kid),
+                path.format(position), "drm-system-kid")
+        pssh = drm_system._pssh
+        if pssh is None or not check_pssh:
+            continue
+        if pssh not in pssh_kids:
+            try:
+                pssh_kids[pssh] = [int.from_bytes(kid, "big")
+                                   for kid in pssh_key_ids(pssh)]
+            except ValueError as e:
+                pssh_kids[pssh] = e
+        listed = pssh_kids[pssh]
+        if isinstance(listed, ValueError):
+            if checked("invalid-pssh"):
+                yield ContentError(
+                    "DRM system PSSH is invalid: {}".format(listed),
+                    path.format(position) + "/PSSH", "invalid-pssh")
+        elif check_pssh_kids:
+            for kid in listed:
+                if kid not in kids:
+                    yield ContentError(
+                        "DRM system PSSH references missing kid: {}".format(
+                            uuid.UUID(int=kid)),
+                        path.format(position) + "/PSSH", "pssh-kid")
+
+
+def _integer_error(value, name):
+    if value is not None and not XSD_INTEGER.fullmatch(str(value)):
+        return "{} {!r} is not an integer".format(name, value)
+    return None
+
+
+def _filter_type(filter):
+    """Return the class of a filter, or the class a frozen filter is of"""
+    return getattr(type(filter), "_thawed_class", type(filter))
+
+
+def _filter_error(filter):
+    """Return the schema error of a filter's own values, or None"""
+    if isinstance(filter, KeyPeriodFilter):
+        if not isinstance(filter.period_id, str) or \
+                not XSD_NCNAME.fullmatch(filter.period_id):
+            return "periodId {!r} is not a valid ID".format(filter.period_id)
+        return None
+    if isinstance(filter, LabelFilter):
+        if not isinstance(filter.label, str):
+            return "label {!r} is not a string".format(filter.label)
+        return None
+    for name, attribute in FILTER_INTEGERS.get(_filter_type(filter), ()):
+        error = _integer_error(getattr(filter, name), attribute)
+        if error is not None:
+            return error
+    return None
+
+
+def schema_errors(cpix):
+    """
+    Generate the ContentErrors of the CPIX schema constraints which the
+    object model does not enforce itself, without serializing the document.
+    Errors have the rule "schema", except periods which mix an index with
+    start and end or have only one of start and end, which the schema allows
+    but CPIX does not, with the rule "period-index-time"
+
+    Values the model stores in a form that always serializes validly, such
+    as key IDs and binary payloads, are only checked for being present. As
+    with libxml2, period filters referencing a missing period are not schema
+    errors, they are found by content_errors
+    """
+    # content keys, a columnar list only holds valid values
+    if getattr(cpix.content_keys, "columns", None) is None:
+        path = "/CPIX/ContentKeyList/ContentKey[{}]"
+        for position, content_key in enumerate(cpix.content_keys._list, 1):
+            if content_key.kid is None:
+                yield ContentError("kid is required", path.format(position),
+                                   "schema")
+            scheme = content_key.common_encryption_scheme
+            if scheme and len(scheme) != CENC_SCHEME_LENGTH:
+                yield ContentError(
+                    "commonEncryptionScheme {!r} is not {} characters".format(
+                        scheme, CENC_SCHEME_LENGTH),
+                    path.format(position), "schema")
+
+    path = "/CPIX/DRMSystemList/DRMSystem[{}]"
+    for position, drm_system in enumerate(cpix.drm_systems._list, 1):
+        if drm_system._kid is None or drm_system._system_id is None:
+            yield ContentError("kid and systemId are required",
+                               path.format(position), "schema")
+
+    period_ids = set()
+    path = "/CPIX/ContentKeyPeriodList/ContentKeyPeriod[{}]"
+    for position, period in enumerate(cpix.periods, 1):
+        if not XSD_NCNAME.fullmatch(period.id):
+            yield ContentError(
+                "id {!r} is not a valid ID".format(period.id),
+                path.format(position), "schema")
+        elif period.id in period_ids:
+            yield ContentError(
+                "ID {!r} is already defined".format(period.id),
+                path.format(position), "schema")
+        period_ids.add(period.id)
+        error = _integer_error(period.index, "index")
+        if error is not None:
+            yield ContentError(error, path.format(position), "schema")
+        if (period.start is None) != (period.end is None) or (
+                period.index is not None and period.start is not None):
+            yield ContentError(
+                "period must have either an index or a start and end",
+                path.format(position), "period-index-time")
+
+    # filters may be shared between rules, each is only checked once
+    filter_errors = {}
+    path = "/CPIX/ContentKeyUsageRuleList/ContentKeyUsageRule[{}]"
+    for position, usage_rule in enumerate(cpix.usage_rules._list, 1):
+        if usage_rule._kid is None:
+            yield ContentError("kid is required", path.format(position),
+                               "schema")
+        order = 0
+        for filter in usage_rule._list:
+            filter_order = FILTER_ORDER[_filter_type(filter)]
+            if filter_order < order:
+                yield ContentError(
+                    "{} is not expected after {}".format(
+                        _filter_type(filter).__name__,
+                        next(name.__name__ for name, value in
+                             FILTER_ORDER.items() if value == order)),
+                    path.format(position), "schema")
+            order = max(order, filter_order)
+            if id(filter) not in filter_errors:
+                filter_errors[id(filter)] = (filter, _filter_error(filter))
+            error = filter_errors[id(filter)][1]
+            if error is not None:
+                yield ContentError(error, path.format(position), "schema")
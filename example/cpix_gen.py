@@ -87,7 +87,7 @@ import argparse
 import logging
 import cpix
 from cpix.drm import playready, widevine
-from base64 import b16decode, b16encode, b64decode, b64encode
+from base64 import b16decode
 from uuid import UUID
 
 
@@ -120,8 +120,9 @@ def parse_keys(keys):
         if len(cek) != 32:
             raise Exception("cek must be 128-bit")
 
-        parsed_keys.append(
-            cpix.ContentKey(kid=kid, cek=b64encode(b16decode(cek))))
+        content_key = cpix.ContentKey(kid=kid)
+        content_key.cek_bytes = b16decode(cek)
+        parsed_keys.append(content_key)
     return parsed_keys
 
 
@@ -293,31 +294,24 @@ def main():
         )
 
         for key in keys:
-            drm_systems.append(
-                cpix.DRMSystem(
-                    kid=key.kid,
-                    system_id=cpix.WIDEVINE_SYSTEM_ID,
-                    pssh=b64encode(pssh)
-                )
-            )
+            drm_system = cpix.DRMSystem(
+                kid=key.kid, system_id=cpix.WIDEVINE_SYSTEM_ID)
+            drm_system.pssh_bytes = pssh
+            drm_systems.append(drm_system)
 
     if args.playready:
         pssh = playready.generate_pssh(
-            keys=[{"key_id": key.kid, "key": b16encode(
-                b64decode(key.cek))} for key in keys],
+            keys=[{"key_id": key.kid, "key": key.cek_hex} for key in keys],
             url=args.playready_la_url,
             algorithm=args.playready_algorithm,
             version=args.playready_pssh_version
         )
 
         for key in keys:
-            drm_systems.append(
-                cpix.DRMSystem(
-                    kid=key.kid,
-                    system_id=cpix.PLAYREADY_SYSTEM_ID,
-                    pssh=b64encode(pssh)
-                )
-            )
+            drm_system = cpix.DRMSystem(
+                kid=key.kid, system_id=cpix.PLAYREADY_SYSTEM_ID)
+            drm_system.pssh_bytes = pssh
+            drm_systems.append(drm_system)
 
     # usage rules
     usage_rules = cpix.UsageRuleList()
@@ -329,7 +323,7 @@ def main():
                 kid = UUID(rule[0])
             except ValueError:
                 parser.error("Invalid key ID in preset usage rule.")
-            if kid not in [key.kid for key in keys]:
+            if keys.get(kid) is None:
                 parser.error("Invalid key ID in preset usage rule.")
 
             if rule[1] == "audio":
@@ -356,7 +350,7 @@ def main():
                 kid = UUID(rule[0])
             except ValueError:
                 parser.error("Invalid key ID in custom usage rule.")
-            if kid not in [key.kid for key in keys]:
+            if keys.get(kid) is None:
                 parser.error("Invalid key ID in custom usage rule.")
 
             usage_rule = cpix.UsageRule(kid)
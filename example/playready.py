@@ -155,10 +155,10 @@ def main():
 
     keys = generate_key_ids(args.content_id, args.tracks)
 
-    for key in keys:
-        key["key"] = cpix.drm.playready.generate_content_key(
-            key["key_id"],
-            PLAYREADY_TEST_KEY_SEED)
+    content_keys = cpix.drm.playready.generate_content_keys(
+        [key["key_id"] for key in keys], PLAYREADY_TEST_KEY_SEED)
+    for key, content_key in zip(keys, content_keys):
+        key["key"] = content_key
 
     pssh = b64encode(cpix.drm.playready.generate_pssh(keys, args.url))
 
@@ -20,6 +20,12 @@ setup(
         "protobuf >= 3.3.0",
         "pycryptodome >= 3.6.4",
         "requests >= 2.19.1",
-        "isodate >= 0.6.0"
-    ]
+        "isodate >= 0.6.0",
+        "importlib_metadata >= 3.6; python_version < '3.8'",
+        "importlib_resources >= 1.3; python_version < '3.9'"
+    ],
+    extras_require={
+        "numpy": ["numpy >= 1.17"],
+        "arrow": ["pyarrow >= 1.0"],
+    }
 )
@@ -0,0 +1,164 @@
+import pytest
+import cpix
+from lxml import etree
+from uuid import UUID
+
+
+KEYS = [
+    cpix.ContentKey(
+        kid="0DC3EC4F-7683-548B-81E7-3C64E582E136",
+        cek="WADwG2qCqkq5TVml+U5PXw==",
+    ),
+    cpix.ContentKey(
+        kid="1447B7ED-2F66-572B-BD13-06CE7CF3610D",
+        cek="ydugVLA+K017XoGM4mjxvA==",
+        common_encryption_scheme="cbcs",
+        explicit_iv="AAAAAAAAAAAAAAAAAAAAAg==",
+    ),
+    cpix.ContentKey(kid="00000000-0000-0000-0000-000000000002"),
+]
+
+
+def test_columnar_matches_content_key_list():
+    content_key_list = cpix.ContentKeyList(list(KEYS))
+    columnar = cpix.ColumnarContentKeyList(list(KEYS))
+
+    assert len(columnar) == 3
+    assert etree.tostring(columnar.element()) == etree.tostring(
+        content_key_list.element())
+    assert [key.kid for key in columnar] == [key.kid for key in KEYS]
+    assert columnar[1].explicit_iv == "AAAAAAAAAAAAAAAAAAAAAg=="
+    assert columnar[-1].cek is None
+
+
+def test_columnar_mutation():
+    columnar = cpix.ColumnarContentKeyList(list(KEYS))
+
+    del columnar[0]
+    columnar.insert(0, KEYS[2])
+    columnar[1] = KEYS[0]
+
+    assert [key.kid for key in columnar] == [
+        KEYS[2].kid, KEYS[0].kid, KEYS[2].kid]
+
+    with pytest.raises(ValueError):
+        columnar.append(cpix.ContentKey(kid=KEYS[0].kid, cek="AAAA"))
+    with pytest.raises(TypeError):
+        columnar.append("not a content key")
+
+
+def test_columnar_extend_columns_and_filter():
+    columnar = cpix.ColumnarContentKeyList()
+
+    columnar.extend_columns(
+        kids=[KEYS[0].kid, KEYS[1].kid],
+        ceks=KEYS[0].cek_bytes + KEYS[1].cek_bytes,
+        common_encryption_scheme=["cenc", "cbcs"],
+    )
+
+    assert len(columnar) == 2
+    assert columnar[1].kid == UUID("1447B7ED-2F66-572B-BD13-06CE7CF3610D")
+    assert columnar[1].cek == "ydugVLA+K017XoGM4mjxvA=="
+
+    cbcs = columnar.filter(common_encryption_scheme="cbcs")
+
+    assert isinstance(cbcs, cpix.ColumnarContentKeyList)
+    assert [key.kid for key in cbcs] == [KEYS[1].kid]
+
+    with pytest.raises(ValueError):
+        columnar.extend_columns(kids=b"\x00" * 17)
+
+
+def test_columnar_parse():
+    xml = etree.tostring(cpix.ContentKeyList(list(KEYS)).element())
+
+    columnar = cpix.ColumnarContentKeyList.parse(xml)
+
+    assert isinstance(columnar, cpix.ColumnarContentKeyList)
+    assert etree.tostring(columnar.element()) == xml
+
+
+def test_columnar_get():
+    columnar = cpix.ColumnarContentKeyList(list(KEYS))
+
+    assert columnar.get(KEYS[1].kid).cek == KEYS[1].cek
+    assert columnar.get("ffffffff-0000-0000-0000-000000000002") is None
+
+    del columnar[1]
+    assert columnar.get(KEYS[1].kid) is None
+    assert columnar.get(str(KEYS[2].kid)).kid == KEYS[2].kid
+
+
+def test_columnar_from_records():
+    columnar = cpix.ColumnarContentKeyList.from_records(
+        [key.kid for key in KEYS],
+        [key.cek for key in KEYS],
+        [key.explicit_iv for key in KEYS],
+        [key.common_encryption_scheme for key in KEYS],
+    )
+
+    assert isinstance(columnar, cpix.ColumnarContentKeyList)
+    assert etree.tostring(columnar.element()) == etree.tostring(
+        cpix.ContentKeyList(list(KEYS)).element())
+
+
+@pytest.mark.parametrize(
+    "cls", [cpix.ContentKeyList, cpix.ColumnarContentKeyList])
+def test_generate(cls, monkeypatch):
+    content_keys = cls.generate(100, "cbcs", explicit_iv=True)
+
+    assert len(content_keys) == 100
+    assert len({key.kid for key in content_keys}) == 100
+    assert all(key.kid.version == 4 for key in content_keys)
+    assert all(key.common_encryption_scheme == "cbcs" for key in content_keys)
+    assert all(len(key.cek_bytes) == 16 and len(key.explicit_iv_bytes) == 16
+               for key in content_keys)
+    assert content_keys.get(content_keys[7].kid) == content_keys[7]
+    assert cpix.validate(etree.tostring(
+        cpix.CPIX(content_keys=content_keys).element()))[0]
+    assert all(key.explicit_iv is None for key in cls.generate(3))
+
+    # key IDs drawn twice, or drawn before, are drawn again
+    import os
+    urandom = os.urandom
+    monkeypatch.setattr(os, "urandom", lambda size: (
+        monkeypatch.setattr(os, "urandom", urandom) or
+        content_keys[0].kid.bytes * 2 + urandom(size - 32)))
+    more = cls.generate(2, exclude=content_keys[:1] + [KEYS[0].kid])
+    kids = [key.kid for key in content_keys[:1]] + [KEYS[0].kid] + \
+        [key.kid for key in more]
+    assert len(set(kids)) == 4
+
+    with pytest.raises(TypeError):
+        cls.generate(1, "none")
+    with pytest.raises(ValueError):
+        cls.generate(-1)
+
+
+@pytest.mark.parametrize(
+    "cls", [cpix.ContentKeyList, cpix.ColumnarContentKeyList])
+def test_from_records_bytes(cls):
+    kids = [key.kid for key in KEYS]
+    cek = bytes(range(16))
+    packed = b"".join(bytes([i]) * 16 for i in range(len(kids)))
+
+    # a single key is used for every kid, more bytes are a packed column
+    single = cls.from_records(kids, cek)
+    assert [key.cek_bytes for key in single] == [cek] * len(kids)
+    column = cls.from_records(kids, bytearray(packed))
+    assert [key.cek_bytes for key in column] == [
+        packed[i:i + 16] for i in range(0, len(packed), 16)]
+
+    schemes = cls.from_records(
+        kids, common_encryption_scheme=[None] + ["cbcs"] * (len(kids) - 1))
+    assert [key.common_encryption_scheme for key in schemes] == \
+        ["cenc"] + ["cbcs"] * (len(kids) - 1)
+
+    with pytest.raises(ValueError):
+        cls.from_records(kids, cek[:8])
+    with pytest.raises(ValueError):
+        cls.from_records(kids, packed[:-1])
+    with pytest.raises(ValueError):
+        cls.from_records(kids, [cek[:8]] * len(kids))
+    with pytest.raises(ValueError):
+        cls.from_records(kids, explicit_ivs="AAAA")
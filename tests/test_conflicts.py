@@ -0,0 +1,108 @@
+import cpix
+from cpix.conflicts import first_conflicts, tracks_matched_by_both
+from cpix.matcher import _CompiledRule
+from uuid import UUID
+import random
+
+
+KIDS = [UUID(int=i) for i in range(1, 6)]
+
+
+def test_conflicts():
+    rules = cpix.UsageRuleList(
+        cpix.SDVideoUsageRule(kid=KIDS[0]),
+        cpix.HDVideoUsageRule(kid=KIDS[1]),
+        cpix.UsageRule(kid=KIDS[2], filters=[
+            cpix.VideoFilter(min_pixels=2000000, hdr=True)]),
+        cpix.UsageRule(kid=KIDS[3], filters=[
+            cpix.VideoFilter(min_pixels=2000000, hdr=False)]),
+        cpix.AudioUsageRule(kid=KIDS[4]),
+        # the same kid as the first rule is not ambiguous
+        cpix.UsageRule(kid=KIDS[0], filters=[cpix.VideoFilter()]),
+    )
+
+    conflicts = rules.conflicts()
+    assert [(c.first, c.second) for c in conflicts] == [
+        (1, 2), (1, 3), (1, 5), (2, 5), (3, 5)]
+    assert conflicts[0].tracks == (cpix.TrackRange(
+        "video", None, None, (2000000, 2073600), (None, None), True, None,
+        (None, None), (None, None)),)
+
+
+def test_period_and_bitrate_conflicts():
+    rules = cpix.UsageRuleList(
+        cpix.UsageRule(kid=KIDS[0], filters=[cpix.KeyPeriodFilter("p0")]),
+        cpix.UsageRule(kid=KIDS[1], filters=[cpix.KeyPeriodFilter("p1")]),
+        cpix.UsageRule(kid=KIDS[2], filters=[
+            cpix.KeyPeriodFilter("p1"), cpix.AudioFilter()]),
+        cpix.UsageRule(kid=KIDS[3], filters=[
+            cpix.BitrateFilter(min_bitrate=1000)]),
+        # different labels never match the same track
+        cpix.UsageRule(kid=KIDS[4], filters=[
+            cpix.KeyPeriodFilter("p2"), cpix.LabelFilter("a")]),
+        cpix.UsageRule(kid=KIDS[0], filters=[
+            cpix.KeyPeriodFilter("p2"), cpix.LabelFilter("b")]),
+    )
+
+    conflicts = rules.conflicts()
+    assert [(c.first, c.second) for c in conflicts] == [
+        (0, 3), (1, 2), (1, 3), (2, 3), (3, 4), (3, 5)]
+    assert conflicts[3].tracks[0].periods == frozenset(["p1"])
+    assert conflicts[3].tracks[0].bitrate == (1000, None)
+    assert conflicts[4].tracks[0].labels == frozenset(["a"])
+
+
+def test_conflicts_match_pairwise():
+    rng = random.Random(46)
+
+    def filters():
+        choice = rng.random()
+        if choice < 0.4:
+            low = rng.randrange(10000)
+            result = [cpix.VideoFilter(
+                min_pixels=low, max_pixels=low + rng.randrange(500),
+                hdr=rng.choice([None, True, False]))]
+        elif choice < 0.7:
+            result = [cpix.AudioFilter(max_channels=rng.randrange(1, 8))]
+        else:
+            result = [cpix.BitrateFilter(min_bitrate=rng.randrange(10000))]
+        if rng.random() < 0.7:
+            result.insert(0, cpix.KeyPeriodFilter(
+                "p{}".format(rng.randrange(20))))
+        return result
+
+    rules = cpix.UsageRuleList(*[
+        cpix.UsageRule(kid=UUID(int=rng.randrange(50)), filters=filters())
+        for _ in range(400)])
+    compiled = [_CompiledRule(rule, position)
+                for position, rule in enumerate(rules)]
+    expected = [
+        (a.position, b.position)
+        for i, a in enumerate(compiled) for b in compiled[i + 1:]
+        if a.kid != b.kid and tracks_matched_by_both(a, b)]
+
+    assert [(c.first, c.second) for c in rules.conflicts()] == expected
+    earliest = {}
+    for first, second in expected:
+        earliest.setdefault(second, first)
+    assert [(c.first, c.second) for c in first_conflicts(rules)] == \
+        [(earliest[second], second) for second in sorted(earliest)]
+
+
+def test_validate_content_reports_conflicts():
+    cpix_doc = cpix.CPIX(
+        content_keys=cpix.ContentKeyList(
+            *[cpix.ContentKey(kid=kid, cek="WADwG2qCqkq5TVml+U5PXw==")
+              for kid in KIDS[:2]]),
+        usage_rules=cpix.UsageRuleList(
+            cpix.VideoUsageRule(kid=KIDS[0]),
+            cpix.SDVideoUsageRule(kid=KIDS[1])),
+    )
+
+    assert cpix_doc.validate_content() == (True, [])
+
+    valid, errors = cpix_doc.validate_content(rules={"usage-rule-conflict"})
+    assert not valid
+    assert [(e.path, e.rule) for e in errors] == [
+        ("/CPIX/ContentKeyUsageRuleList/ContentKeyUsageRule[2]",
+         "usage-rule-conflict")]
@@ -1,8 +1,10 @@
 import pytest
+import sys
 import cpix
 import isodate
 from lxml import etree
 from uuid import UUID
+from base64 import b64decode, b64encode
 
 
 def test_simple_usage_rule():
@@ -441,6 +443,50 @@ def test_period_filter():
     assert xml == b'<KeyPeriodFilter periodId="test"/>'
 
 
+def test_label_filter():
+    kid = "0DC3EC4F-7683-548B-81E7-3C64E582E136"
+    label_filter = cpix.LabelFilter(label="audio-en")
+
+    assert etree.tostring(label_filter.element()) == \
+        b'<LabelFilter label="audio-en"/>'
+
+    cpix_doc = cpix.CPIX(
+        content_keys=cpix.ContentKeyList(
+            cpix.ContentKey(kid=kid, cek="WADwG2qCqkq5TVml+U5PXw==")),
+        usage_rules=cpix.UsageRuleList(cpix.UsageRule(kid=kid, filters=[
+            label_filter, cpix.AudioFilter(max_channels=2)])))
+    xml = etree.tostring(cpix_doc.element())
+    parsed = cpix.parse(xml)
+
+    assert cpix.validate(xml)[0]
+    assert parsed.usage_rules[0][0] == label_filter
+    assert etree.tostring(parsed.element()) == xml
+
+
+def test_usage_rule_label_index():
+    kid_a = "0DC3EC4F-7683-548B-81E7-3C64E582E136"
+    kid_b = "1447B7ED-2F66-572B-BD13-06CE7CF3610D"
+    rule_a = cpix.UsageRule(kid=kid_a, filters=[
+        cpix.LabelFilter("en"), cpix.LabelFilter("de")])
+    rule_b = cpix.UsageRule(kid=kid_b, filters=[cpix.LabelFilter("en")])
+    usage_rules = cpix.UsageRuleList(rule_a, rule_b, cpix.AudioUsageRule(kid_b))
+
+    assert usage_rules.for_label("en") == [rule_a, rule_b]
+    assert usage_rules.kids_for_label("en") == [UUID(kid_a), UUID(kid_b)]
+    assert usage_rules.kids_for_label("de") == [UUID(kid_a)]
+    assert usage_rules.for_label("fr") == []
+
+    del usage_rules[0]
+    assert usage_rules.kids_for_label("en") == [UUID(kid_b)]
+    assert usage_rules.for_label("de") == []
+
+    # changed in place then assigned back
+    rule_b[0] = cpix.LabelFilter("fr")
+    usage_rules[0] = rule_b
+    assert usage_rules.for_label("en") == []
+    assert usage_rules.for_label("fr") == [rule_b]
+
+
 def test_parse_period():
     cpix_xml = b'<CPIX xmlns:pskc="urn:ietf:params:xml:ns:keyprov:pskc" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns="urn:dashif:org:cpix" xsi:schemaLocation="urn:dashif:org:cpix cpix.xsd"><ContentKeyPeriodList><ContentKeyPeriod id="test" start="2018-08-06T00:00:00Z" end="2018-08-07T00:00:00Z"/></ContentKeyPeriodList></CPIX>'
 
@@ -468,4 +514,420 @@ def test_content_id_parse():
 
     cpix_doc = cpix.parse(cpix_xml)
 
-    assert cpix_doc.content_id == "mycontentId"
\ No newline at end of file
+    assert cpix_doc.content_id == "mycontentId"
+
+
+def test_models_have_no_instance_dict():
+    kid = "0DC3EC4F-7683-548B-81E7-3C64E582E136"
+    objects = [
+        cpix.CPIX(),
+        cpix.ContentKey(kid=kid, cek="WADwG2qCqkq5TVml+U5PXw=="),
+        cpix.ContentKeyList(),
+        cpix.DRMSystem(kid=kid, system_id=cpix.WIDEVINE_SYSTEM_ID),
+        cpix.DRMSystemList(),
+        cpix.Period(id="test", index=0),
+        cpix.PeriodList(),
+        cpix.SDVideoUsageRule(kid),
+        cpix.UsageRuleList(),
+        cpix.VideoFilter(),
+        cpix.AudioFilter(),
+        cpix.BitrateFilter(),
+        cpix.KeyPeriodFilter(period_id="test"),
+        cpix.LabelFilter(label="test"),
+    ]
+
+    for obj in objects:
+        assert not hasattr(obj, "__dict__"), type(obj).__name__
+
+
+def test_content_key_binary_storage():
+    content_key = cpix.ContentKey(
+        kid="0DC3EC4F-7683-548B-81E7-3C64E582E136",
+        cek=b"WADwG2qCqkq5TVml+U5PXw==",
+        explicit_iv="AAAAAAAAAAAAAAAAAAAAAg==",
+    )
+
+    assert content_key.cek_bytes == b64decode("WADwG2qCqkq5TVml+U5PXw==")
+    assert content_key.cek_hex == "5800F01B6A82AA4AB94D59A5F94E4F5F"
+    assert content_key.cek == "WADwG2qCqkq5TVml+U5PXw=="
+    assert content_key.explicit_iv_bytes == b"\x00" * 15 + b"\x02"
+
+    content_key.cek_bytes = b"\x00" * 16
+
+    assert content_key.cek == "AAAAAAAAAAAAAAAAAAAAAA=="
+
+    with pytest.raises(ValueError):
+        content_key.cek = "not base64"
+
+
+def test_key_id_representations():
+    key_id = cpix.to_key_id("0DC3EC4F-7683-548B-81E7-3C64E582E136")
+    expected = UUID("0DC3EC4F-7683-548B-81E7-3C64E582E136")
+
+    assert isinstance(key_id, cpix.KeyID)
+    assert key_id == expected
+    assert hash(key_id) == hash(expected)
+    assert str(key_id) == str(expected)
+    assert key_id.bytes == expected.bytes
+    assert key_id.bytes_le == expected.bytes_le
+    assert key_id.hex == expected.hex
+    assert key_id.base64 == "DcPsT3aDVIuB5zxk5YLhNg=="
+    assert key_id.base64_le == "T+zDDYN2i1SB5zxk5YLhNg=="
+
+    # the same input is only parsed once
+    assert cpix.to_key_id("0DC3EC4F-7683-548B-81E7-3C64E582E136") is key_id
+    assert cpix.to_key_id(expected.bytes) == key_id
+    assert cpix.to_key_id(b"0dc3ec4f-7683-548b-81e7-3c64e582e136") == key_id
+
+    content_key = cpix.ContentKey(kid="0DC3EC4F-7683-548B-81E7-3C64E582E136")
+    usage_rule = cpix.AudioUsageRule("0DC3EC4F-7683-548B-81E7-3C64E582E136")
+
+    assert content_key.kid is usage_rule.kid
+
+    with pytest.raises(TypeError):
+        cpix.to_key_id(1234)
+
+
+def test_list_kid_indexes():
+    kid_a = "0DC3EC4F-7683-548B-81E7-3C64E582E136"
+    kid_b = "1447B7ED-2F66-572B-BD13-06CE7CF3610D"
+    key_a = cpix.ContentKey(kid=kid_a, cek="WADwG2qCqkq5TVml+U5PXw==")
+    key_b = cpix.ContentKey(kid=kid_b, cek="ydugVLA+K017XoGM4mjxvA==")
+    content_keys = cpix.ContentKeyList(key_a)
+
+    assert content_keys.get(kid_a) is key_a
+    assert content_keys.get(UUID(kid_b)) is None
+
+    content_keys.append(key_b)
+    assert content_keys.get(kid_b) is key_b
+
+    content_keys[0] = key_b
+    assert content_keys.get(kid_a) is None
+
+    del content_keys[0]
+    assert content_keys.get(kid_b) is key_b
+
+    items = [key_a]
+    content_keys.list = items
+    assert content_keys.get(kid_a) is key_a
+    assert content_keys.get(kid_b) is None
+
+    # the list is copied in and out, so it only changes through its methods
+    items.append(key_b)
+    content_keys.list.append(key_b)
+    assert len(content_keys) == 1
+    assert content_keys.get(kid_b) is None
+
+    # with duplicate kids get returns the first by position, as columnar
+    # lists do, however the keys were added
+    for cls in (cpix.ContentKeyList, cpix.ColumnarContentKeyList):
+        content_keys = cls([key_b, key_b, key_a])
+        first = cpix.ContentKey(kid=kid_a, cek="ydugVLA+K017XoGM4mjxvA==")
+        content_keys[0] = first
+        assert content_keys.get(kid_a).cek == first.cek
+        content_keys.insert(0, key_a)
+        assert content_keys.get(kid_a).cek == key_a.cek
+        del content_keys[0]
+        assert content_keys.get(kid_a).cek == first.cek
+        content_keys[0] = key_b
+        assert content_keys.get(kid_a).cek == key_a.cek
+
+    drm_systems = cpix.DRMSystemList(
+        cpix.DRMSystem(kid=kid_a, system_id=cpix.WIDEVINE_SYSTEM_ID),
+        cpix.DRMSystem(kid=kid_a, system_id=cpix.PLAYREADY_SYSTEM_ID),
+        cpix.DRMSystem(kid=kid_b, system_id=cpix.WIDEVINE_SYSTEM_ID),
+    )
+
+    assert len(drm_systems.for_kid(kid_a)) == 2
+    assert len(drm_systems.for_system(str(cpix.WIDEVINE_SYSTEM_ID))) == 2
+
+    drm_systems.insert(0, cpix.DRMSystem(
+        kid=kid_b, system_id=cpix.PLAYREADY_SYSTEM_ID))
+    del drm_systems[1:3]
+    assert [d.system_id for d in drm_systems.for_kid(kid_b)] == [
+        cpix.PLAYREADY_SYSTEM_ID, cpix.WIDEVINE_SYSTEM_ID]
+    assert drm_systems.for_kid(kid_a) == []
+
+    usage_rules = cpix.UsageRuleList(
+        cpix.AudioUsageRule(kid_a), cpix.SDVideoUsageRule(kid_b))
+
+    assert usage_rules.for_kid(kid_b)[0] == cpix.SDVideoUsageRule(kid_b)
+
+
+def test_shared_values_are_interned():
+    pssh = b"\x00\x00\x00\x20pssh" + b"\x00" * 24
+    drm_a = cpix.DRMSystem(
+        kid="0DC3EC4F-7683-548B-81E7-3C64E582E136",
+        system_id=cpix.WIDEVINE_SYSTEM_ID)
+    drm_b = cpix.DRMSystem(
+        kid="1447B7ED-2F66-572B-BD13-06CE7CF3610D",
+        system_id=cpix.WIDEVINE_SYSTEM_ID)
+    drm_a.pssh_bytes = bytearray(pssh)
+    drm_b.pssh_bytes = bytearray(pssh)
+
+    assert drm_a.pssh_bytes is drm_b.pssh_bytes
+    assert drm_a.pssh is drm_b.pssh
+
+    rule_a = cpix.SDVideoUsageRule("0DC3EC4F-7683-548B-81E7-3C64E582E136")
+    rule_b = cpix.SDVideoUsageRule("1447B7ED-2F66-572B-BD13-06CE7CF3610D")
+
+    # presets and parsed rules share their filters
+    assert rule_a[0] is rule_b[0]
+    parsed = cpix.UsageRuleList.parse(
+        cpix.UsageRuleList(rule_a, rule_b).element())
+    assert parsed[0][0] is parsed[1][0]
+
+    # shared filters are immutable, they are replaced rather than changed
+    with pytest.raises(AttributeError):
+        rule_a[0].max_pixels = 1
+    rule_a[0] = cpix.VideoFilter(max_pixels=1)
+    assert rule_a[0].max_pixels == 1
+    assert rule_b[0].max_pixels == 442368
+    assert rule_a.freeze()[0] is not rule_b.freeze()[0]
+
+    rules = cpix.UsageRuleList.from_records(
+        ["0DC3EC4F-7683-548B-81E7-3C64E582E136",
+         "1447B7ED-2F66-572B-BD13-06CE7CF3610D"],
+        [cpix.VideoFilter(max_pixels=442368)])
+    assert rules[0][0] is rules[1][0] is rule_b[0]
+    # thawed rules keep sharing them
+    thawed = rules.freeze().thaw()
+    assert thawed[0][0] is thawed[1][0] is rule_b[0]
+
+    # values which are equal but of other types are not shared
+    assert cpix.AudioFilter(max_channels=2.0).freeze() is not \
+        cpix.AudioFilter(max_channels=2).freeze()
+    assert cpix.AudioFilter(max_channels=2).freeze().element().get(
+        "maxChannels") == "2"
+    assert cpix.VideoFilter(max_pixels=True).freeze() is not \
+        cpix.VideoFilter(max_pixels=1).freeze()
+
+
+def test_from_records():
+    kids = ["0DC3EC4F-7683-548B-81E7-3C64E582E136",
+            "1447B7ED-2F66-572B-BD13-06CE7CF3610D"]
+    ceks = ["WADwG2qCqkq5TVml+U5PXw==", b64decode("ydugVLA+K017XoGM4mjxvA==")]
+
+    content_keys = cpix.ContentKeyList.from_records(
+        kids, ceks, common_encryption_scheme=["cenc", "cbcs"])
+
+    assert content_keys == cpix.ContentKeyList(
+        cpix.ContentKey(kid=kids[0], cek=ceks[0]),
+        cpix.ContentKey(kid=kids[1], cek="ydugVLA+K017XoGM4mjxvA==",
+                        common_encryption_scheme="cbcs"),
+    )
+    assert content_keys.get(kids[1]).cek_bytes == ceks[1]
+
+    with pytest.raises(ValueError):
+        cpix.ContentKeyList.from_records(kids, ceks[:1])
+    with pytest.raises(ValueError):
+        cpix.ContentKeyList.from_records(kids, "not base64!")
+    with pytest.raises(TypeError):
+        cpix.ContentKeyList.from_records(
+            kids, common_encryption_scheme="aes")
+
+    drm_systems = cpix.DRMSystemList.from_records(
+        kids, cpix.WIDEVINE_SYSTEM_ID, pssh=b"\x00\x00\x00\x08pssh")
+
+    assert len(drm_systems.for_system(cpix.WIDEVINE_SYSTEM_ID)) == 2
+    assert drm_systems[0].pssh == "AAAACHBzc2g="
+    assert drm_systems[0].pssh_bytes is drm_systems[1].pssh_bytes
+
+    with pytest.raises(ValueError):
+        cpix.DRMSystemList.from_records(kids, cpix.uuid.uuid4())
+
+    usage_rules = cpix.UsageRuleList.from_records(
+        kids, [cpix.VideoFilter(max_pixels=442368)])
+
+    assert usage_rules == cpix.UsageRuleList(
+        cpix.SDVideoUsageRule(kids[0]), cpix.SDVideoUsageRule(kids[1]))
+
+    usage_rules = cpix.UsageRuleList.from_records(
+        kids, [[cpix.AudioFilter()], [cpix.VideoFilter()]])
+
+    assert usage_rules == cpix.UsageRuleList(
+        cpix.AudioUsageRule(kids[0]), cpix.VideoUsageRule(kids[1]))
+
+    with pytest.raises(TypeError):
+        cpix.UsageRuleList.from_records(kids, ["not a filter"])
+
+
+def test_memory_usage():
+    kids = [UUID(int=i) for i in range(1, 11)]
+    document = cpix.CPIX(
+        content_keys=cpix.ContentKeyList.from_records(kids, b"\x00" * 16),
+        drm_systems=cpix.DRMSystemList.from_records(
+            kids, cpix.WIDEVINE_SYSTEM_ID, pssh=b"\x00\x00\x00\x08pssh"),
+    )
+
+    usage = document.memory_usage()
+    shallow = document.memory_usage(deep=False)
+
+    assert usage["total"] == sum(
+        usage[name] for name in
+        ("cpix", "content_keys", "drm_systems", "periods", "usage_rules"))
+    assert usage["content_keys"] > shallow["content_keys"] > 0
+    assert "payloads" not in shallow
+    # the shared cek and PSSH are only counted once
+    assert usage["payloads"]["cek"] < 2 * sys.getsizeof(b"\x00" * 16)
+    assert usage["payloads"]["pssh"] < 2 * sys.getsizeof(
+        b"\x00\x00\x00\x08pssh")
+    assert usage["payloads"]["uuid"] > 10 * sys.getsizeof(kids[0])
+
+
+@pytest.mark.parametrize("reset_peak", [True, False])
+def test_allocation_profile(reset_peak, monkeypatch):
+    import tracemalloc
+    from cpix.memory import allocation_profile
+
+    if not reset_peak:
+        # as on Python < 3.9
+        monkeypatch.delattr(tracemalloc, "reset_peak", raising=False)
+    profile = allocation_profile(str(cpix.CPIX(
+        content_keys=cpix.ContentKeyList(cpix.ContentKey(
+            kid="0DC3EC4F-7683-548B-81E7-3C64E582E136",
+            cek="WADwG2qCqkq5TVml+U5PXw==")))))
+
+    assert list(profile) == ["parse", "element", "pretty_print"]
+    assert all(stats["peak"] > 0 for stats in profile.values())
+
+
+def test_import_does_not_load_schema():
+    import subprocess
+
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, cpix; "
+         "print('pkg_resources' in sys.modules, "
+         "cpix.get_schema.cache_info().currsize)"],
+        stdout=subprocess.PIPE, check=True, universal_newlines=True)
+
+    assert result.stdout.split() == ["False", "0"]
+    assert cpix.CPIX_SCHEMA is cpix.get_schema()
+
+
+def test_load_schema_with_importlib_resources_backport(monkeypatch):
+    import importlib.resources
+    from types import SimpleNamespace
+
+    # python < 3.9 has no importlib.resources.files, the backport has it
+    monkeypatch.setitem(sys.modules, "importlib_resources", SimpleNamespace(
+        files=importlib.resources.files,
+        as_file=importlib.resources.as_file))
+    monkeypatch.delattr(importlib.resources, "files")
+
+    assert isinstance(cpix.load_schema(), etree.XMLSchema)
+
+
+def _pssh(*kids):
+    from struct import pack
+
+    data = b"".join(UUID(kid).bytes for kid in kids)
+    size = 32 + len(data) + 4
+    return (pack(">I", size) + b"pssh" + b"\x01\x00\x00\x00" +
+            UUID("EDEF8BA9-79D6-4ACE-A3C8-27DCD51D21ED").bytes +
+            pack(">I", len(kids)) + data + pack(">I", 0))
+
+
+def test_validate_content_errors():
+    kid = "0DC3EC4F-7683-548B-81E7-3C64E582E136"
+    missing = "1447B7ED-2F66-572B-BD13-06CE7CF3610D"
+    document = cpix.CPIX(
+        content_keys=cpix.ContentKeyList(
+            cpix.ContentKey(kid=kid, cek="WADwG2qCqkq5TVml+U5PXw=="),
+            cpix.ContentKey(kid=kid, cek="ydugVLA+K017XoGM4mjxvA=="),
+        ),
+        drm_systems=cpix.DRMSystemList(
+            cpix.DRMSystem(
+                kid=kid,
+                system_id="EDEF8BA9-79D6-4ACE-A3C8-27DCD51D21ED",
+                pssh=b64encode(_pssh(kid, missing))),
+        ),
+        periods=cpix.PeriodList(
+            cpix.Period(id="p0", start="2024-01-01T00:00:00Z",
+                        end="2024-01-01T01:00:00Z"),
+            cpix.Period(id="p1", start="2024-01-01T00:30:00Z",
+                        end="2024-01-01T02:00:00Z"),
+            cpix.Period(id="p1", index=2),
+        ),
+        usage_rules=cpix.UsageRuleList(
+            cpix.UsageRule(kid=missing, filters=[
+                cpix.VideoFilter(), cpix.KeyPeriodFilter(period_id="p2")]),
+        ),
+    )
+
+    valid, errors = document.validate_content()
+    assert [error.rule for error in errors] == [
+        "usage-rule-kid", "period-filter"]
+
+    valid, errors = document.validate_content(rules=cpix.CONTENT_RULES)
+
+    assert not valid
+    assert all(isinstance(error, cpix.ContentError) for error in errors)
+    assert [(error.rule, error.path) for error in errors] == [
+        ("duplicate-kid", "/CPIX/ContentKeyList/ContentKey[2]"),
+        ("duplicate-period-id",
+         "/CPIX/ContentKeyPeriodList/ContentKeyPeriod[3]"),
+        ("period-overlap", "/CPIX/ContentKeyPeriodList/ContentKeyPeriod[2]"),
+        ("usage-rule-kid",
+         "/CPIX/ContentKeyUsageRuleList/ContentKeyUsageRule[1]"),
+        ("period-filter", "/CPIX/ContentKeyUsageRuleList/"
+         "ContentKeyUsageRule[1]/KeyPeriodFilter[1]"),
+        ("pssh-kid", "/CPIX/DRMSystemList/DRMSystem[1]/PSSH"),
+    ]
+    assert errors[5] == "DRM system PSSH references missing kid: " + \
+        missing.lower()
+
+    valid, errors = document.validate_content(
+        fail_fast=True, rules=cpix.CONTENT_RULES)
+    assert not valid
+    assert [error.rule for error in errors] == ["duplicate-kid"]
+
+    with pytest.raises(ValueError):
+        document.validate_content(rules=["no-such-rule"])
+
+    valid, errors = document.check_usage_rules()
+    assert not valid
+    assert [error.rule for error in errors] == ["usage-rule-kid"]
+    assert document.check_drm_systems() == (True, [])
+
+
+def test_validate_content_invalid_pssh():
+    kid = "0DC3EC4F-7683-548B-81E7-3C64E582E136"
+    document = cpix.CPIX(
+        content_keys=cpix.ColumnarContentKeyList(cpix.ContentKey(kid=kid)),
+        drm_systems=cpix.DRMSystemList(
+            cpix.DRMSystem(
+                kid=kid,
+                system_id="EDEF8BA9-79D6-4ACE-A3C8-27DCD51D21ED",
+                pssh=b64encode(b"not a pssh box")),
+        ),
+    )
+
+    # placeholder PSSH pass the default checks
+    assert document.validate_content() == (True, [])
+
+    valid, errors = document.validate_content(rules=cpix.CONTENT_RULES)
+
+    assert not valid
+    assert [error.rule for error in errors] == ["invalid-pssh"]
+    assert cpix.validation.pssh_key_ids(_pssh(kid)) == (UUID(kid).bytes,)
+
+
+def test_validate_many():
+    valid_cpix = cpix.CPIX(
+        periods=cpix.PeriodList(cpix.Period(id="p0", index=0)))
+    invalid_xml = b'<CPIX xmlns="urn:dashif:org:cpix"><Invalid/></CPIX>'
+    docs = [valid_cpix, invalid_xml, b"not xml",
+            etree.tostring(valid_cpix.element())] * 5
+
+    results = list(cpix.validate_many(iter(docs), workers=3))
+
+    assert [valid for valid, _ in results] == [True, False, False, True] * 5
+    assert isinstance(results[1][1], etree.DocumentInvalid)
+    assert isinstance(results[2][1], etree.XMLSyntaxError)
+    # schemas are returned to the pool for the next call
+    assert 1 <= len(cpix._SCHEMA_POOLS[cpix.schema_path()]) <= 3
+
+    with pytest.raises(ValueError):
+        list(cpix.validate_many(docs, workers=0))
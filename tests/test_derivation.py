@@ -0,0 +1,89 @@
+import uuid
+import hashlib
+import hmac
+import pytest
+import cpix
+from cpix.derivation import KEY_ID_NAMESPACE
+from lxml import etree
+
+
+MASTER_SECRET = bytes(range(32))
+
+
+def _reference_cek(master_secret, content_id, key_id):
+    # HKDF-SHA256 of RFC 5869, 16 bytes of output
+    prk = hmac.new(content_id.encode(), master_secret, hashlib.sha256).digest()
+    okm = hmac.new(prk, key_id.bytes + b"\x01", hashlib.sha256).digest()
+    return okm[:16]
+
+
+def test_hkdf_rfc_5869_vector():
+    # test case 1 of RFC 5869, with a salt which is a valid content ID
+    derivation = cpix.KeyDerivation(b"\x0b" * 22)
+    salt = bytes(range(13)).decode()
+    key_id = uuid.UUID(bytes=bytes.fromhex("f0f1f2f3f4f5f6f7f8f9") + bytes(6))
+    mac = derivation._expander(salt).copy()
+    mac.update(bytes.fromhex("f0f1f2f3f4f5f6f7f8f9") + b"\x01")
+
+    assert mac.hexdigest() == (
+        "3cb25f25faacd57a90434f64d0362f2a2d2d0a90cf1a5a4c5db02d56ecc4c5bf")
+    assert derivation.cek(salt, key_id) == _reference_cek(
+        b"\x0b" * 22, salt, key_id)
+
+
+def test_derive():
+    derivation = cpix.KeyDerivation(MASTER_SECRET)
+    key_id = derivation.key_id("movie", "video-hd", "p1")
+
+    assert key_id == uuid.uuid5(KEY_ID_NAMESPACE, "movie/video-hd/p1")
+    assert key_id.version == 5
+    assert derivation.key_id("movie", "video-hd") == \
+        uuid.uuid5(KEY_ID_NAMESPACE, "movie/video-hd/")
+    assert derivation.key_id("movie", "video-hd", cpix.Period(
+        "p1", index=1)) == key_id
+    assert derivation.cek("movie", key_id) == \
+        _reference_cek(MASTER_SECRET, "movie", key_id)
+    # another holder of the secret derives the same keys
+    assert cpix.KeyDerivation(MASTER_SECRET).content_key(
+        "movie", "video-hd", "p1") == derivation.content_key(
+        "movie", "video-hd", "p1")
+    assert cpix.KeyDerivation(bytes(32)).cek("movie", key_id) != \
+        derivation.cek("movie", key_id)
+    assert derivation.cek("other", key_id) != derivation.cek("movie", key_id)
+
+    with pytest.raises(TypeError):
+        cpix.KeyDerivation("secret" * 4)
+    with pytest.raises(ValueError):
+        cpix.KeyDerivation(b"short")
+    with pytest.raises(ValueError):
+        derivation.key_id("movie", "video/hd")
+    with pytest.raises(TypeError):
+        derivation.key_id(1, "video")
+
+
+@pytest.mark.parametrize(
+    "cls", [cpix.ContentKeyList, cpix.ColumnarContentKeyList])
+def test_content_keys(cls):
+    derivation = cpix.KeyDerivation(MASTER_SECRET)
+    periods = cpix.PeriodList(cpix.Period("p1", index=1),
+                              cpix.Period("p2", index=2))
+    content_keys = derivation.content_keys(
+        ["movie", "trailer"], ["video", "audio", "video"], periods,
+        common_encryption_scheme="cbcs", cls=cls)
+
+    assert isinstance(content_keys, cls)
+    assert len(content_keys) == 8
+    assert [key.kid for key in content_keys[:4]] == [
+        derivation.key_id("movie", track, period)
+        for period in ("p1", "p2") for track in ("video", "audio")]
+    assert all(key.common_encryption_scheme == "cbcs"
+               for key in content_keys)
+    assert content_keys.get(content_keys[5].kid).cek_bytes == \
+        derivation.cek("trailer", content_keys[5].kid)
+    assert derivation.content_keys("movie", "video", cls=cls)[0].kid == \
+        derivation.key_id("movie", "video")
+    assert cpix.validate(etree.tostring(
+        cpix.CPIX(content_keys=content_keys).element()))[0]
+
+    with pytest.raises(TypeError):
+        derivation.content_keys("movie", "video", common_encryption_scheme="")
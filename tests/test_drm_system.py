@@ -1,5 +1,6 @@
 import pytest
 import cpix
+import cpix.drm.playready
 import isodate
 from lxml import etree
 from uuid import UUID
@@ -81,3 +82,92 @@ def test_hls_signaling_data():
         parsed.hls_signaling_data_master
         == drm_system.hls_signaling_data_master
     )
+
+
+def test_drm_system_registry():
+    custom_id = UUID("6dd8b3c3-45f4-4a68-bf3a-64168d01a4a4")
+
+    assert cpix.WIDEVINE_SYSTEM_ID in cpix.DRM_SYSTEMS
+    assert str(cpix.PLAYREADY_SYSTEM_ID).upper() in cpix.DRM_SYSTEMS
+    assert cpix.DRM_SYSTEMS.by_name("widevine").system_id == \
+        cpix.WIDEVINE_SYSTEM_ID
+    assert cpix.DRM_SYSTEMS.generator(
+        cpix.PLAYREADY_SYSTEM_ID, "pssh") is cpix.drm.playready.generate_pssh
+    assert custom_id not in cpix.DRM_SYSTEMS
+
+    with pytest.raises(ValueError):
+        cpix.DRMSystem(kid=UUID(int=1), system_id=custom_id)
+
+    info = cpix.DRM_SYSTEMS.register(custom_id, "Custom", vendor="example")
+    try:
+        drm_system = cpix.DRMSystem(kid=UUID(int=1), system_id=custom_id)
+        assert cpix.DRM_SYSTEMS[drm_system.system_id] is info
+        assert info.metadata == {"vendor": "example"}
+        with pytest.raises(KeyError):
+            info.generator("pssh")
+    finally:
+        cpix.DRM_SYSTEMS.unregister(custom_id)
+
+    assert custom_id not in cpix.DRM_SYSTEMS
+
+
+def test_valid_system_ids_list():
+    custom_id = UUID("6dd8b3c3-45f4-4a68-bf3a-64168d01a4a4")
+
+    assert isinstance(cpix.VALID_SYSTEM_IDS, list)
+    assert cpix.VALID_SYSTEM_IDS[1] == cpix.PLAYREADY_SYSTEM_ID
+    assert cpix.WIDEVINE_SYSTEM_ID in cpix.VALID_SYSTEM_IDS
+
+    cpix.VALID_SYSTEM_IDS.append(custom_id)
+    try:
+        assert custom_id in cpix.DRM_SYSTEMS
+        cpix.DRMSystem(kid=UUID(int=1), system_id=custom_id)
+    finally:
+        cpix.VALID_SYSTEM_IDS.remove(custom_id)
+    assert custom_id not in cpix.DRM_SYSTEMS
+
+    cpix.DRM_SYSTEMS.register(custom_id, "Custom")
+    assert cpix.VALID_SYSTEM_IDS[-1] == custom_id
+    cpix.DRM_SYSTEMS.unregister(custom_id)
+    assert custom_id not in cpix.VALID_SYSTEM_IDS
+
+
+def test_drm_system_registry_entry_points(monkeypatch):
+    custom_id = UUID("6dd8b3c3-45f4-4a68-bf3a-64168d01a4a4")
+
+    class EntryPoint(object):
+        def load(self):
+            return cpix.DRMSystemInfo(custom_id, "Custom")
+
+    monkeypatch.setattr(
+        cpix.registry, "_entry_points", lambda group: [EntryPoint()])
+    registry = cpix.DRMSystemRegistry()
+
+    assert custom_id in registry
+    assert registry[str(custom_id)].name == "Custom"
+
+
+def test_drm_system_registry_broken_entry_point(monkeypatch):
+    custom_id = UUID("6dd8b3c3-45f4-4a68-bf3a-64168d01a4a4")
+
+    class BrokenEntryPoint(object):
+        name = "broken"
+
+        def load(self):
+            raise ImportError("No module named 'broken_drm'")
+
+    class EntryPoint(object):
+        def load(self):
+            return cpix.DRMSystemInfo(custom_id, "Custom")
+
+    monkeypatch.setattr(
+        cpix.registry, "_entry_points",
+        lambda group: [BrokenEntryPoint(), EntryPoint()])
+    registry = cpix.DRMSystemRegistry()
+    monkeypatch.setattr(cpix.drm_system, "DRM_SYSTEMS", registry)
+
+    with pytest.warns(UserWarning, match="broken"):
+        with pytest.raises(ValueError, match="system_id is unknown"):
+            cpix.DRMSystem(kid="0dc3ec4f-7683-548b-81e7-3c64e582e136",
+                           system_id="00000000-0000-0000-0000-000000000000")
+    assert registry[custom_id].name == "Custom"
@@ -0,0 +1,117 @@
+import copy
+import pickle
+import pytest
+import cpix
+
+
+KID_A = "0DC3EC4F-7683-548B-81E7-3C64E582E136"
+KID_B = "1447B7ED-2F66-572B-BD13-06CE7CF3610D"
+
+
+def make_cpix():
+    return cpix.CPIX(
+        content_keys=cpix.ContentKeyList(
+            cpix.ContentKey(kid=KID_A, cek="WADwG2qCqkq5TVml+U5PXw=="),
+            cpix.ContentKey(kid=KID_B, cek="ydugVLA+K017XoGM4mjxvA=="),
+        ),
+        drm_systems=cpix.DRMSystemList(
+            cpix.DRMSystem(kid=KID_A, system_id=cpix.WIDEVINE_SYSTEM_ID),
+        ),
+        usage_rules=cpix.UsageRuleList(
+            cpix.AudioUsageRule(KID_A), cpix.SDVideoUsageRule(KID_B)),
+        periods=cpix.PeriodList(cpix.Period(id="period_0", index=0)),
+        content_id="content",
+    )
+
+
+def test_freeze():
+    document = make_cpix()
+    frozen = document.freeze()
+
+    assert frozen == document
+    assert isinstance(frozen, cpix.CPIX)
+    assert isinstance(frozen.content_keys, cpix.ContentKeyList)
+    assert frozen.freeze() is frozen
+    assert hash(frozen) == hash(make_cpix().freeze())
+    assert frozen.content_keys.get(KID_B).cek == "ydugVLA+K017XoGM4mjxvA=="
+
+    # the snapshot does not see later changes to the original
+    document.content_keys[0].cek = "ydugVLA+K017XoGM4mjxvA=="
+    document.content_keys.append(cpix.ContentKey(kid=cpix.uuid.uuid4()))
+    assert len(frozen.content_keys) == 2
+    assert frozen.content_keys[0].cek == "WADwG2qCqkq5TVml+U5PXw=="
+
+    with pytest.raises(AttributeError):
+        frozen.content_id = "other"
+    with pytest.raises(AttributeError):
+        frozen.content_keys[0].cek = "ydugVLA+K017XoGM4mjxvA=="
+    with pytest.raises(TypeError):
+        frozen.content_keys.append(cpix.ContentKey(kid=KID_A))
+    with pytest.raises(TypeError):
+        del frozen.usage_rules[0][0]
+
+
+def test_thaw_copies_on_write():
+    frozen = make_cpix().freeze()
+    thawed = frozen.thaw()
+
+    assert thawed == frozen
+    assert thawed.content_keys._list is frozen.content_keys._list
+
+    thawed.content_id = "other"
+    thawed.content_keys[0].cek = "ydugVLA+K017XoGM4mjxvA=="
+    del thawed.drm_systems[0]
+
+    assert frozen.content_id == "content"
+    assert frozen.content_keys[0].cek == "WADwG2qCqkq5TVml+U5PXw=="
+    assert len(frozen.drm_systems) == 1
+    assert frozen.drm_systems.for_kid(KID_A)
+    assert thawed.drm_systems.for_kid(KID_A) == []
+    assert thawed.content_keys.get(KID_A).cek == "ydugVLA+K017XoGM4mjxvA=="
+    # unused lists are still shared, serializing does not copy them
+    assert thawed != frozen
+    assert thawed.usage_rules._list is frozen.usage_rules._list
+
+    # iteration and lookups give mutable items too
+    for usage_rule in thawed.usage_rules:
+        usage_rule.kid = KID_A
+    thawed.content_keys.get(KID_B).cek = "WADwG2qCqkq5TVml+U5PXw=="
+    assert [str(rule.kid) for rule in thawed.usage_rules] == \
+        [KID_A.lower()] * 2
+    assert str(frozen.usage_rules[1].kid) == KID_B.lower()
+    assert frozen.content_keys.get(KID_B).cek == "ydugVLA+K017XoGM4mjxvA=="
+
+    # reads after the first do not change the list
+    items = thawed.content_keys._list
+    assert list(thawed.content_keys) == items
+    assert thawed.content_keys[1] is items[1]
+    assert thawed.content_keys._list is items
+
+
+def test_pickle_and_copy_frozen():
+    frozen = make_cpix().freeze()
+
+    for copied in (pickle.loads(pickle.dumps(frozen)), copy.copy(frozen),
+                   copy.deepcopy(frozen)):
+        assert copied == frozen
+        assert hash(copied) == hash(frozen)
+        assert type(copied) is type(frozen)
+        assert copied.content_keys.get(KID_A) is not None
+        with pytest.raises(AttributeError):
+            copied.content_id = "other"
+
+
+def test_freeze_columnar():
+    columnar = cpix.ColumnarContentKeyList(list(make_cpix().content_keys))
+    frozen = columnar.freeze()
+
+    assert frozen.get(KID_A).cek == "WADwG2qCqkq5TVml+U5PXw=="
+    with pytest.raises(TypeError):
+        frozen.extend_columns(kids=[KID_A])
+
+    thawed = frozen.thaw()
+    del thawed[0]
+
+    assert len(frozen) == 2
+    assert thawed.get(KID_A) is None
+    assert frozen.get(KID_A) is not None
@@ -0,0 +1,77 @@
+import cpix
+from lxml import etree
+from uuid import UUID
+
+
+KIDS = [UUID(int=i) for i in range(1, 6)]
+
+
+def document():
+    return cpix.CPIX(
+        content_keys=cpix.ContentKeyList.from_records(
+            KIDS, [bytes(range(16))] * len(KIDS)),
+        drm_systems=cpix.DRMSystemList.from_records(
+            KIDS, cpix.WIDEVINE_SYSTEM_ID, pssh=b"pssh"),
+        periods=cpix.PeriodList(
+            cpix.Period(id="p0", index=0), cpix.Period(id="p1", index=1)),
+        usage_rules=cpix.UsageRuleList(
+            cpix.UsageRule(kid=KIDS[0], filters=[
+                cpix.KeyPeriodFilter("p0"), cpix.VideoFilter()]),
+            cpix.UsageRule(kid=KIDS[1], filters=[cpix.AudioFilter()]),
+        ),
+        version="2.3",
+    )
+
+
+def full_validate(cpix_doc):
+    return cpix.validate(etree.tostring(cpix_doc.element()))[0]
+
+
+def test_only_changed_entries_are_revalidated():
+    cpix_doc = document()
+    validator = cpix.IncrementalValidator()
+
+    assert validator.validate(cpix_doc) == (True, [])
+    assert validator.revalidated == 14
+    assert validator.validate(cpix_doc) == (True, [])
+    assert validator.revalidated == 0
+
+    cpix_doc.content_keys.append(cpix.ContentKey(kid=UUID(int=6)))
+    cpix_doc.usage_rules[1] = cpix.UsageRule(
+        kid=KIDS[1], filters=[cpix.KeyPeriodFilter("p1")])
+    assert validator.validate(cpix_doc) == (True, [])
+    assert validator.revalidated == 2
+    assert full_validate(cpix_doc)
+
+    # frozen snapshots have the same fingerprints
+    assert validator.validate(cpix_doc.freeze()) == (True, [])
+    assert validator.revalidated == 0
+
+
+def test_errors_match_full_validation():
+    cpix_doc = document()
+    validator = cpix.IncrementalValidator()
+    validator.validate(cpix_doc)
+
+    cpix_doc.periods.append(cpix.Period(id="1p", index=2))
+    cpix_doc.periods.append(cpix.Period(id="p0", index=3))
+    cpix_doc.usage_rules.append(cpix.UsageRule(
+        kid=KIDS[2], filters=[cpix.KeyPeriodFilter("missing")]))
+
+    valid, errors = validator.validate(cpix_doc)
+
+    assert not valid
+    assert not full_validate(cpix_doc)
+    assert validator.revalidated == 3
+    assert [error.path for error in errors] == [
+        "/CPIX/ContentKeyPeriodList/ContentKeyPeriod[3]",
+        "/CPIX/ContentKeyPeriodList/ContentKeyPeriod[4]",
+    ]
+    assert all(error.rule == "schema" for error in errors)
+    assert "'1p' is not a valid value" in errors[0]
+
+    del cpix_doc.periods[2:]
+    cpix_doc.periods.append(cpix.Period(id="missing", index=2))
+    assert validator.validate(cpix_doc) == (True, [])
+    assert validator.revalidated == 1
+    assert full_validate(cpix_doc)
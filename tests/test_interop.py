@@ -0,0 +1,108 @@
+import pytest
+import cpix
+from datetime import datetime, timedelta, timezone
+from lxml import etree
+
+
+KEYS = [
+    cpix.ContentKey(
+        kid="0DC3EC4F-7683-548B-81E7-3C64E582E136",
+        cek="WADwG2qCqkq5TVml+U5PXw==",
+    ),
+    cpix.ContentKey(
+        kid="1447B7ED-2F66-572B-BD13-06CE7CF3610D",
+        cek="ydugVLA+K017XoGM4mjxvA==",
+        common_encryption_scheme="cbcs",
+        explicit_iv="AAAAAAAAAAAAAAAAAAAAAg==",
+    ),
+    cpix.ContentKey(kid="00000000-0000-0000-0000-000000000002"),
+]
+
+DRM_SYSTEMS = [
+    cpix.DRMSystem(
+        kid="0DC3EC4F-7683-548B-81E7-3C64E582E136",
+        system_id=cpix.WIDEVINE_SYSTEM_ID,
+        pssh="AAAACHBzc2g=",
+    ),
+    cpix.DRMSystem(
+        kid="1447B7ED-2F66-572B-BD13-06CE7CF3610D",
+        system_id=cpix.PLAYREADY_SYSTEM_ID,
+        content_protection_data="PHRlc3Q+",
+    ),
+]
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+PERIODS = [
+    cpix.Period(id="period_0", index=0),
+    cpix.Period(id="window", start=START, end=START + timedelta(minutes=1)),
+    cpix.Period(id="naive", start=START.replace(tzinfo=None),
+                end=START.replace(tzinfo=None) + timedelta(minutes=1)),
+]
+
+
+def xml(value):
+    return etree.tostring(value.element())
+
+
+@pytest.mark.parametrize("list_class", [
+    cpix.ContentKeyList, cpix.ColumnarContentKeyList])
+def test_content_keys_numpy(list_class):
+    numpy = pytest.importorskip("numpy")
+    content_keys = list_class(list(KEYS))
+
+    array = content_keys.to_numpy()
+
+    assert array.dtype.names == (
+        "kid", "cek", "has_cek", "explicit_iv", "has_explicit_iv",
+        "common_encryption_scheme")
+    assert array["kid"][0].tobytes() == KEYS[0].kid.bytes
+    assert array["has_cek"].tolist() == [True, True, False]
+    assert cpix.COMMON_ENCRYPTION_SCHEMES[
+        array["common_encryption_scheme"][1]] == "cbcs"
+
+    # vectorised deduplication then back to CPIX
+    doubled = numpy.concatenate([array, array])
+    _, first = numpy.unique(doubled["kid"], return_index=True)
+    restored = list_class.from_numpy(doubled[numpy.sort(first)])
+
+    assert type(restored) is list_class
+    assert xml(restored) == xml(content_keys)
+
+
+def test_drm_systems_and_periods_numpy():
+    pytest.importorskip("numpy")
+    drm_systems = cpix.DRMSystemList(list(DRM_SYSTEMS))
+    periods = cpix.PeriodList(list(PERIODS))
+
+    assert xml(cpix.DRMSystemList.from_numpy(drm_systems.to_numpy())) == \
+        xml(drm_systems)
+    assert xml(cpix.PeriodList.from_numpy(periods.to_numpy())) == \
+        xml(periods)
+    assert isinstance(
+        cpix.RangePeriodList.from_numpy(periods.to_numpy()),
+        cpix.RangePeriodList)
+
+    # periods are built by the constructor, which checks them
+    array = periods.to_numpy()
+    array["has_index"][1] = True
+    with pytest.raises(ValueError):
+        cpix.PeriodList.from_numpy(array)
+
+
+def test_arrow():
+    pytest.importorskip("pyarrow")
+    content_keys = cpix.ContentKeyList(list(KEYS))
+    drm_systems = cpix.DRMSystemList(list(DRM_SYSTEMS))
+    periods = cpix.PeriodList(list(PERIODS))
+
+    table = content_keys.to_arrow()
+
+    assert table.column("common_encryption_scheme").to_pylist() == [
+        "cenc", "cbcs", "cenc"]
+    assert table.column("cek").null_count == 1
+    assert xml(cpix.ContentKeyList.from_arrow(table)) == xml(content_keys)
+    assert xml(cpix.DRMSystemList.from_arrow(drm_systems.to_arrow())) == \
+        xml(drm_systems)
+    assert xml(cpix.PeriodList.from_arrow(periods.to_arrow())) == \
+        xml(periods)
@@ -0,0 +1,164 @@
+import cpix
+from cpix import Track
+from lxml import etree
+from uuid import UUID
+import random
+
+
+KIDS = [UUID(int=i) for i in range(1, 8)]
+
+
+def ladder_rules():
+    return cpix.UsageRuleList(
+        cpix.UsageRule(kid=KIDS[0], filters=[
+            cpix.KeyPeriodFilter("p1"), cpix.VideoFilter()]),
+        cpix.SDVideoUsageRule(kid=KIDS[1]),
+        cpix.HDVideoUsageRule(kid=KIDS[2]),
+        cpix.UsageRule(kid=KIDS[3], filters=[
+            cpix.VideoFilter(min_pixels=1920 * 1080 + 1, hdr=True)]),
+        cpix.UsageRule(kid=KIDS[4], filters=[
+            cpix.VideoFilter(min_pixels=1920 * 1080 + 1)]),
+        cpix.UsageRule(kid=KIDS[5], filters=[
+            cpix.AudioFilter(max_channels=2),
+            cpix.AudioFilter(min_channels=6, max_channels=6)]),
+        cpix.UsageRule(kid=KIDS[6], filters=[
+            cpix.BitrateFilter(max_bitrate=500000)]),
+    )
+
+
+def test_resolve():
+    matcher = ladder_rules().matcher()
+
+    assert len(matcher) == 7
+    assert matcher.resolve(Track("video", pixels=640 * 360)) == KIDS[1]
+    assert matcher.resolve(Track("video", pixels=768 * 576)) == KIDS[1]
+    assert matcher.resolve(Track("video", pixels=1280 * 720)) == KIDS[2]
+    assert matcher.resolve(Track("video", pixels=1920 * 1080)) == KIDS[2]
+    assert matcher.resolve(
+        Track("video", pixels=3840 * 2160, hdr=False)) == KIDS[4]
+    assert matcher.resolve(
+        Track("video", pixels=3840 * 2160, hdr=True)) == KIDS[3]
+    # an unknown hdr matches rules for either
+    assert matcher.resolve(Track("video", pixels=3840 * 2160)) == KIDS[3]
+    assert matcher.resolve(
+        Track("video", pixels=640 * 360, period="p1")) == KIDS[0]
+    assert matcher.resolve(Track("audio", channels=2)) == KIDS[5]
+    assert matcher.resolve(Track("audio", channels=6)) == KIDS[5]
+    assert matcher.resolve(Track("audio", channels=8)) is None
+    assert matcher.resolve(Track("audio", channels=8), default=1) == 1
+    assert matcher.resolve(Track("text", bitrate=1000)) == KIDS[6]
+    assert matcher.resolve(Track("text", bitrate=600000)) is None
+    # bitrate rules apply to every track type
+    assert matcher.resolve(Track("audio", channels=8, bitrate=128000)) == \
+        KIDS[6]
+
+    assert matcher.matching_kids(
+        Track("video", pixels=640 * 360, period="p1", bitrate=1000)) == \
+        [KIDS[0], KIDS[1], KIDS[6]]
+
+
+def test_resolve_parsed_rules():
+    # parsed filters hold their thresholds as strings
+    rules = ladder_rules()
+    parsed = cpix.UsageRuleList.parse(etree.tostring(rules.element()))
+    tracks = [Track("video", pixels=pixels, hdr=hdr)
+              for pixels in (0, 442368, 442369, 2073600, 2073601, 8294400)
+              for hdr in (False, True)]
+
+    assert parsed.matcher().resolve_many(tracks) == \
+        rules.matcher().resolve_many(tracks)
+
+
+def test_resolve_many_matches_linear_scan():
+    rng = random.Random(44)
+    rules = cpix.UsageRuleList()
+    for kid in range(200):
+        low = rng.randrange(0, 5000)
+        # nested and open ended ranges as well as bounded ones
+        high = rng.choice([None, low + rng.randrange(1000)])
+        filters = [cpix.VideoFilter(min_pixels=low, max_pixels=high,
+                                    min_fps=rng.choice([None, 30]),
+                                    hdr=rng.choice([None, False, True]))]
+        if rng.random() < 0.3:
+            filters.append(cpix.BitrateFilter(min_bitrate=rng.randrange(100)))
+        if rng.random() < 0.5:
+            filters.append(cpix.KeyPeriodFilter(
+                "p{}".format(rng.randrange(10))))
+        rules.append(cpix.UsageRule(kid=UUID(int=kid), filters=filters))
+    tracks = [Track("video", pixels=rng.randrange(6000),
+                    fps=rng.choice([None, 25, 60]),
+                    bitrate=rng.choice([None, 50]),
+                    hdr=rng.choice([None, False, True]),
+                    period=rng.choice([None, "p1", "p5", "p11"]))
+              for _ in range(500)]
+
+    matcher = rules.matcher()
+    linear = cpix.UsageRuleMatcher(rules)
+    expected = [next((rule.kid for rule in linear._rules
+                      if rule.matches(track)), None) for track in tracks]
+
+    assert matcher.resolve_many(tracks) == expected
+    assert matcher.resolve_many(tracks * 2) == expected * 2
+    assert [matcher.matching_kids(track) for track in tracks] == [
+        [rule.kid for rule in linear._rules if rule.matches(track)]
+        for track in tracks]
+
+
+def test_index_size_of_nested_ranges():
+    # each rule is stored in O(log n) nodes, not in every segment it spans
+    count = 4096
+    rules = cpix.UsageRuleList([
+        cpix.UsageRule(kid=UUID(int=i), filters=[
+            cpix.VideoFilter(min_pixels=i)]) for i in range(count)])
+    index = rules.matcher()._indexes["video"]
+
+    assert sum(len(node) for node in index.nodes.values()) <= \
+        count * 2 * (count.bit_length() + 1)
+    assert rules.matcher().resolve(Track("video", pixels=10)) == UUID(int=0)
+    assert rules.matcher().matching_kids(Track("video", pixels=10)) == [
+        UUID(int=i) for i in range(11)]
+
+
+def test_unknown_wcg():
+    rules = cpix.UsageRuleList([
+        cpix.UsageRule(kid=KIDS[0], filters=[cpix.VideoFilter(wcg=True)]),
+        cpix.UsageRule(kid=KIDS[1], filters=[cpix.VideoFilter(wcg=False)]),
+    ])
+    matcher = rules.matcher()
+
+    assert matcher.resolve(Track("video", wcg=False)) == KIDS[1]
+    assert matcher.matching_kids(Track("video")) == [KIDS[0], KIDS[1]]
+
+
+def test_resolve_by_period():
+    # key rotation, the same rules in every period
+    rules = cpix.UsageRuleList()
+    for period in range(100):
+        for position, preset in enumerate((
+                cpix.SDVideoUsageRule, cpix.HDVideoUsageRule,
+                cpix.UHD1VideoUsageRule)):
+            rule = preset(UUID(int=period * 3 + position))
+            rule.append(cpix.KeyPeriodFilter("p{}".format(period)))
+            rules.append(rule)
+    matcher = rules.matcher()
+
+    assert matcher.resolve(Track("video", pixels=1280 * 720, period="p42")) \
+        == UUID(int=42 * 3 + 1)
+    assert matcher.resolve(Track("video", pixels=1280 * 720)) is None
+    assert matcher.resolve(
+        Track("video", pixels=1280 * 720, period="p100")) is None
+    # only the rules of the period are searched
+    assert len(matcher._period_indexes["p42"]["video"].rules) == 3
+
+
+def test_resolve_label():
+    rules = cpix.UsageRuleList(
+        cpix.UsageRule(kid=KIDS[0], filters=[
+            cpix.LabelFilter("commentary"), cpix.AudioFilter()]),
+        cpix.AudioUsageRule(kid=KIDS[1]),
+    )
+    matcher = rules.matcher()
+
+    assert matcher.resolve(Track("audio", channels=2)) == KIDS[1]
+    assert matcher.resolve(
+        Track("audio", channels=2, label="commentary")) == KIDS[0]
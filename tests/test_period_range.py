@@ -0,0 +1,93 @@
+import pytest
+import cpix
+from datetime import datetime, timedelta, timezone
+from lxml import etree
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+MINUTE = timedelta(minutes=1)
+
+
+def test_indexed_periods_are_compressed():
+    periods = cpix.RangePeriodList(
+        *[cpix.Period(id="period_{}".format(i), index=i) for i in range(5)])
+    periods.extend_indices(5, 1000)
+
+    assert len(periods) == 1005
+    assert len(periods.ranges()) == 1
+    assert periods[1004].id == "period_1004"
+    assert periods[-1].index == 1004
+    assert etree.tostring(periods[:5][0].element()) == etree.tostring(
+        cpix.Period(id="period_0", index=0).element())
+
+
+def test_matches_period_list():
+    items = [
+        cpix.Period(id="key_007", index=7),
+        cpix.Period(id="key_008", index=8),
+        cpix.Period(id="odd{", index=1),
+        cpix.Period(id="w3", start=START, end=START + MINUTE),
+        cpix.Period(id="w4", start=START + MINUTE, end=START + 2 * MINUTE),
+        cpix.Period(id="w5", start=START + 2 * MINUTE,
+                    end=START + 3 * MINUTE),
+    ]
+    periods = cpix.RangePeriodList(list(items))
+    xml = etree.tostring(cpix.PeriodList(list(items)).element())
+
+    assert len(periods.ranges()) == 3
+    assert etree.tostring(periods.element()) == xml
+    assert [p.id for p in periods] == [p.id for p in items]
+
+    parsed = cpix.RangePeriodList.parse(xml)
+    assert parsed.ranges() == periods.ranges()
+
+
+def test_mutation_splits_ranges():
+    periods = cpix.RangePeriodList()
+    periods.extend_windows(START, MINUTE, 10, first=1)
+
+    del periods[3]
+    periods.insert(0, cpix.Period(id="first", index=0))
+    periods[5] = cpix.Period(id="replaced", index=1)
+
+    assert [p.id for p in periods] == [
+        "first", "period_1", "period_2", "period_3", "period_5",
+        "replaced", "period_7", "period_8", "period_9", "period_10"]
+    assert periods[4].start == START + 4 * MINUTE
+    assert periods[-1].end == START + 10 * MINUTE
+
+    with pytest.raises(TypeError):
+        periods.append("not a period")
+
+
+def test_merge_windows():
+    periods = cpix.RangePeriodList()
+    periods.extend_indices(0, 2)
+    # overlapping windows
+    periods.extend_windows(START, 2 * MINUTE, 3, interval=MINUTE)
+    # separate windows, the first touches the end of the windows above
+    periods.extend_windows(START + 4 * MINUTE, MINUTE, 2,
+                           interval=2 * MINUTE, id_format="later_{index}")
+    periods.append(cpix.Period(
+        id="early", start=START - MINUTE, end=START + MINUTE))
+
+    merged = periods.merge_windows()
+
+    assert [(p.id, p.start, p.end) for p in merged[2:]] == [
+        ("early", START - MINUTE, START + 5 * MINUTE),
+        ("later_1", START + 6 * MINUTE, START + 7 * MINUTE),
+    ]
+    assert [p.index for p in merged[:2]] == [0, 1]
+
+
+def test_freeze_range_period_list():
+    periods = cpix.RangePeriodList()
+    periods.extend_indices(0, 100)
+    frozen = periods.freeze()
+    thawed = frozen.thaw()
+
+    thawed.extend_indices(100, 10)
+
+    assert len(frozen) == 100
+    assert len(thawed) == 110
+    assert frozen[50].id == "period_50"
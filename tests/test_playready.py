@@ -1,5 +1,7 @@
 import uuid
 import pytest
+from base64 import b16encode, b64decode
+from hashlib import sha256
 from cpix.drm import playready
 
 
@@ -17,6 +19,39 @@ def test_generate_key():
     assert cek == b"DBFD6922C321C4BB486F4A1C44097ED6"
 
 
+def _reference_content_key(kid, key_seed):
+    # the derivation as specified, one byte at a time
+    key_seed = b64decode(key_seed)
+    kid = uuid.UUID(str(kid, "ascii") if isinstance(kid, bytes) else str(kid))
+    digests = [sha256(key_seed + kid.bytes_le + tail).digest() for tail in (
+        b"", key_seed, key_seed + kid.bytes_le)]
+    return b16encode(bytes(
+        digests[0][i] ^ digests[0][i + 16] ^ digests[1][i] ^
+        digests[1][i + 16] ^ digests[2][i] ^ digests[2][i + 16]
+        for i in range(16)))
+
+
+def test_generate_keys():
+    kids = [uuid.UUID(int=i * 0x1234567890abcdef) for i in range(50)]
+    kids += [b"8ba94ade-6eb9-449d-b44f-a5beefaf43b0", str(kids[1])]
+    expected = [_reference_content_key(kid, PLAYREADY_TEST_KEY_SEED)
+                for kid in kids]
+
+    assert expected[-2] == b"DBFD6922C321C4BB486F4A1C44097ED6"
+    assert [playready.generate_content_key(kid, PLAYREADY_TEST_KEY_SEED)
+            for kid in kids] == expected
+    assert playready.generate_content_keys(
+        kids, PLAYREADY_TEST_KEY_SEED) == expected
+    assert playready.generate_content_keys(
+        kids, PLAYREADY_TEST_KEY_SEED, workers=2) == expected
+    assert playready.generate_content_keys([], PLAYREADY_TEST_KEY_SEED) == []
+
+    with pytest.raises(ValueError):
+        playready.generate_content_keys(kids, PLAYREADY_TEST_KEY_SEED, 0)
+    with pytest.raises(TypeError):
+        playready.generate_content_keys([1], PLAYREADY_TEST_KEY_SEED)
+
+
 def test_checksum():
     kid = b"8ba94ade-6eb9-449d-b44f-a5beefaf43b0"
     cek = b"DBFD6922C321C4BB486F4A1C44097ED6"
@@ -0,0 +1,118 @@
+import pytest
+import shutil
+import cpix
+from lxml import etree
+from os.path import dirname, join
+
+
+def document(version):
+    return etree.tostring(cpix.CPIX(
+        content_keys=cpix.ContentKeyList(cpix.ContentKey(
+            kid="0dc3ec4f-7683-548b-81e7-3c64e582e136",
+            common_encryption_scheme="cbcs")),
+        version=version).element())
+
+
+@pytest.fixture
+def schemas(monkeypatch):
+    monkeypatch.setattr(cpix, "CPIX_SCHEMAS", dict(cpix.CPIX_SCHEMAS))
+    cpix.get_schema.cache_clear()
+    yield cpix.CPIX_SCHEMAS
+    cpix.get_schema.cache_clear()
+    cpix._compiled_schema.cache_clear()
+    cpix._SCHEMA_POOLS.clear()
+
+
+def write_schema(directory, scheme_length=4):
+    """
+    Write a copy of the bundled schema to directory, allowing encryption
+    schemes of scheme_length characters, and return its path
+    """
+    bundled = join(dirname(cpix.__file__), "schema")
+    directory.mkdir()
+    for name in ("pskc.xsd", "xenc-schema.xsd", "xmldsig-core-schema.xsd"):
+        shutil.copy(join(bundled, name), str(directory))
+    with open(join(bundled, "cpix.xsd")) as f:
+        xsd = f.read().replace(
+            '<xs:length value="4"/>',
+            '<xs:length value="{}"/>'.format(scheme_length))
+    path = directory / "cpix.xsd"
+    path.write_text(xsd)
+    return str(path)
+
+
+def test_schema_version():
+    assert cpix.schema_version(etree.fromstring(document("2.1"))) == "2.1"
+    assert cpix.schema_version(etree.fromstring(document(None))) == "2.2"
+    assert cpix.schema_version(etree.fromstring(b"<CPIX/>")) is None
+
+
+def test_versions_resolve_to_their_own_schema(schemas, tmp_path):
+    paths = {
+        "2.0": write_schema(tmp_path / "2.0"),
+        # only allows encryption schemes of 5 characters
+        "2.1": write_schema(tmp_path / "2.1", 5),
+        "2.3": write_schema(tmp_path / "2.3"),
+    }
+    for version, path in paths.items():
+        cpix.register_schema(version, path)
+
+    compiled = {}
+    for version in ("2.0", "2.1", "2.2", "2.3"):
+        compiled[version] = cpix.get_schema(version)
+        assert cpix.get_schema(version) is compiled[version]
+        assert cpix.schema_path(version) == paths.get(
+            version, cpix.CPIX_SCHEMA_RESOURCE)
+    assert len(set(map(id, compiled.values()))) == 4
+    assert compiled["2.2"] is cpix.get_schema()
+    # a later version uses the latest earlier schema
+    assert cpix.get_schema("2.4") is compiled["2.3"]
+
+    assert [cpix.validate(document(version))[0]
+            for version in ("2.0", "2.1", "2.2", "2.3", None)] == \
+        [True, False, True, True, True]
+    assert [valid for valid, _ in cpix.validate_many(
+        [document(version) for version in ("2.0", "2.1", "2.2", "2.3")] * 2,
+        workers=2)] == [True, False, True, True] * 2
+    assert set(cpix._SCHEMA_POOLS) == set(paths.values()) | {
+        cpix.CPIX_SCHEMA_RESOURCE}
+
+
+def test_register_schema(schemas, tmp_path):
+    # a schema for 2.3 which only allows encryption schemes of 5 characters
+    path = write_schema(tmp_path / "2.3", 5)
+
+    cpix.register_schema("2.3", path)
+    compiled = cpix._compiled_schema.cache_info().misses
+
+    assert cpix.schema_path("2.4") == path
+    assert cpix.schema_path("2.1") == cpix.CPIX_SCHEMA_RESOURCE
+    assert cpix.validate(document("2.2"))[0]
+    assert not cpix.validate(document("2.3"))[0]
+    assert not cpix.validate(document("2.4"))[0]
+    assert [valid for valid, _ in cpix.validate_many(
+        [document("2.3"), document("2.2")] * 3, workers=2)] == \
+        [False, True] * 3
+    # the bundled and the 2.3 schema are each compiled once
+    assert cpix._compiled_schema.cache_info().misses == compiled + 2
+
+    validator = cpix.IncrementalValidator()
+    cpix_doc = cpix.CPIX.parse(document("2.2"))
+    assert validator.validate(cpix_doc)[0]
+    cpix_doc.version = "2.3"
+    assert not validator.validate(cpix_doc)[0]
+    assert validator.revalidated == 1
+
+    # registering a changed file again drops every compiled schema
+    with open(path) as f:
+        xsd = f.read()
+    with open(path, "w") as f:
+        f.write(xsd.replace('<xs:length value="5"/>',
+                            '<xs:length value="4"/>'))
+    cpix.register_schema("2.3", path)
+
+    assert not cpix._SCHEMA_POOLS
+    assert cpix.validate(document("2.3"))[0]
+    assert all(valid for valid, _ in cpix.validate_many(
+        [document("2.3")] * 3, workers=2))
+    assert validator.validate(cpix_doc)[0]
@@ -0,0 +1,83 @@
+import cpix
+from datetime import datetime, timedelta, timezone
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+MINUTE = timedelta(minutes=1)
+
+
+def test_period_at():
+    periods = cpix.RangePeriodList()
+    periods.extend_windows(START, MINUTE, 10)
+    periods.append(cpix.Period(id="index", index=3))
+    timeline = periods.timeline()
+
+    assert len(timeline) == 11
+    assert timeline.period_at(START).id == "period_0"
+    assert timeline.period_at(START + 90 * timedelta(seconds=1)).id == \
+        "period_1"
+    assert timeline.period_at(START + 10 * MINUTE - MINUTE / 2).id == \
+        "period_9"
+    assert timeline.period_at(START + 10 * MINUTE) is None
+    assert timeline.period_at(START - MINUTE) is None
+
+    # rotation
+    timeline.append(cpix.Period(
+        id="period_10", start=START + 10 * MINUTE, end=START + 11 * MINUTE))
+    assert timeline.period_at(START + 10 * MINUTE).id == "period_10"
+    periods.extend_windows(START + 11 * MINUTE, MINUTE, 1, first=11)
+    assert timeline.period_at(START + 11 * MINUTE).id == "period_11"
+    assert len(timeline) == 13
+
+
+def test_overlapping_windows():
+    periods = cpix.PeriodList(
+        cpix.Period(id="long", start=START, end=START + 10 * MINUTE),
+        cpix.Period(id="b", start=START + 2 * MINUTE, end=START + 3 * MINUTE),
+        cpix.Period(id="a", start=START + MINUTE, end=START + 2 * MINUTE),
+    )
+    timeline = periods.timeline()
+
+    assert timeline.period_at(START + MINUTE).id == "a"
+    assert timeline.period_at(START + 2 * MINUTE).id == "b"
+    assert timeline.period_at(START + 5 * MINUTE).id == "long"
+    assert [p.id for p in timeline.periods_between(
+        START + MINUTE, START + 2 * MINUTE)] == ["long", "a"]
+    assert [p.id for p in timeline.periods_between(
+        START + MINUTE / 2, START + 5 * MINUTE)] == ["long", "a", "b"]
+    assert timeline.periods_between(
+        START + 10 * MINUTE, START + 11 * MINUTE) == []
+
+    del periods[0]
+    assert timeline.period_at(START + 5 * MINUTE) is None
+
+
+def test_period_for_index():
+    periods = cpix.PeriodList(
+        cpix.Period(id="p10", index=10), cpix.Period(id="p0", index=0))
+    timeline = periods.timeline()
+
+    assert timeline.period_for_index(-1) is None
+    assert timeline.period_for_index(0).id == "p0"
+    assert timeline.period_for_index(9).id == "p0"
+    assert timeline.period_for_index(25).id == "p10"
+    timeline.append(cpix.Period(id="p20", index=20))
+    assert timeline.period_for_index(25).id == "p20"
+
+
+def test_naive_and_aware_times():
+    # parsed periods are timezone aware, naive times are taken as UTC
+    naive = START.replace(tzinfo=None)
+    periods = cpix.PeriodList.parse(cpix.PeriodList(
+        cpix.Period(id="period_0", start=START, end=START + MINUTE)).element())
+    timeline = periods.timeline()
+
+    assert timeline.period_at(naive).id == "period_0"
+    timeline.append(cpix.Period(
+        id="period_1", start=naive + MINUTE, end=naive + 2 * MINUTE))
+    timeline.append(cpix.Period(
+        id="earlier", start=naive - MINUTE, end=naive))
+    assert timeline.period_at(START + MINUTE).id == "period_1"
+    assert timeline.period_at(naive - MINUTE).id == "earlier"
+    assert [period.id for period in timeline.periods_between(
+        naive, START + 2 * MINUTE)] == ["period_0", "period_1"]
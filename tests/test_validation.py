@@ -0,0 +1,110 @@
+import pytest
+import cpix
+from lxml import etree
+from uuid import UUID
+
+
+KID = UUID("0dc3ec4f-7683-548b-81e7-3c64e582e136")
+START = "2024-01-01T00:00:00Z"
+END = "2024-01-01T01:00:00Z"
+
+
+def document(filters=(), periods=(), content_keys=None):
+    return cpix.CPIX(
+        content_keys=content_keys or cpix.ContentKeyList(
+            cpix.ContentKey(kid=KID, cek="WADwG2qCqkq5TVml+U5PXw==")),
+        drm_systems=cpix.DRMSystemList(cpix.DRMSystem(
+            kid=KID, system_id=cpix.WIDEVINE_SYSTEM_ID, pssh="AAAA")),
+        periods=cpix.PeriodList(*periods),
+        usage_rules=cpix.UsageRuleList(
+            cpix.UsageRule(kid=KID, filters=list(filters))),
+        content_id="content",
+        version="2.3",
+    )
+
+
+CORPUS = {
+    "valid": document(
+        [cpix.KeyPeriodFilter("p0"), cpix.VideoFilter(max_pixels=442368),
+         cpix.AudioFilter(max_channels=2), cpix.BitrateFilter(-1, "+5")],
+        [cpix.Period(id="p0", index=0), cpix.Period(id="p-1.x", index=-1),
+         cpix.Period(id="été", start=START, end=END)]),
+    "frozen": document(
+        [cpix.KeyPeriodFilter("p0")],
+        [cpix.Period(id="p0", index=0)]).freeze(),
+    "columnar": document(content_keys=cpix.ColumnarContentKeyList(
+        cpix.ContentKey(kid=KID, common_encryption_scheme="cbcs"))),
+    "parsed": cpix.CPIX.parse(etree.tostring(document(
+        [cpix.KeyPeriodFilter("p0")],
+        [cpix.Period(id="p0", index=0)]).element())),
+    "empty": cpix.CPIX(),
+    "period id not an NCName": document(
+        periods=[cpix.Period(id="1p", index=0)]),
+    "period id with a colon": document(
+        periods=[cpix.Period(id="a:b", index=0)]),
+    "duplicate period id": document(
+        periods=[cpix.Period(id="p0", index=0),
+                 cpix.Period(id="p0", index=1)]),
+    "bool period index": document(
+        periods=[cpix.Period(id="p0", index=True)]),
+    # libxml2 does not resolve IDREFs, content validation reports these
+    "missing period": document(
+        [cpix.KeyPeriodFilter("p1")], [cpix.Period(id="p0", index=0)]),
+    "invalid period filter id": document([cpix.KeyPeriodFilter("1p")]),
+    "filters out of order": document(
+        [cpix.VideoFilter(), cpix.KeyPeriodFilter("p0")],
+        [cpix.Period(id="p0", index=0)]),
+    "string pixels": document([cpix.VideoFilter(min_pixels="lots")]),
+    "bool pixels": document([cpix.VideoFilter(max_pixels=True)]),
+    "float channels": document([cpix.AudioFilter(min_channels=2.5)]),
+    "long encryption scheme": document(content_keys=cpix.ContentKeyList(
+        cpix.ContentKey._from_values(
+            cpix.to_key_id(KID), None, "cenc1", None))),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_agrees_with_xsd(name):
+    cpix_doc = CORPUS[name]
+    xsd_valid = cpix.validate(etree.tostring(cpix_doc.element()))[0]
+
+    valid, errors = cpix_doc.validate()
+
+    assert valid == xsd_valid == (name in (
+        "valid", "frozen", "columnar", "parsed", "empty", "missing period"))
+    assert all(error.rule == "schema" for error in errors)
+    assert cpix_doc.validate(strict=True)[0] == xsd_valid
+
+
+def test_errors_have_paths():
+    cpix_doc = document(
+        [cpix.VideoFilter(), cpix.KeyPeriodFilter("p2")],
+        [cpix.Period(id="p0", index=0), cpix.Period(id="p0", index=True)])
+
+    valid, errors = cpix_doc.validate()
+
+    assert not valid
+    assert [(error.path, str(error)) for error in errors] == [
+        ("/CPIX/ContentKeyPeriodList/ContentKeyPeriod[2]",
+         "ID 'p0' is already defined"),
+        ("/CPIX/ContentKeyPeriodList/ContentKeyPeriod[2]",
+         "index True is not an integer"),
+        ("/CPIX/ContentKeyUsageRuleList/ContentKeyUsageRule[1]",
+         "KeyPeriodFilter is not expected after VideoFilter"),
+    ]
+
+
+def test_period_index_and_times_are_exclusive():
+    start = cpix.Period(id="start", start=START, end=END).start
+    periods = [
+        cpix.Period._from_values("both", 0, start, start),
+        cpix.Period._from_values("start_only", None, start, None),
+    ]
+    cpix_doc = document(periods=periods)
+
+    valid, errors = cpix_doc.validate()
+
+    # the schema allows these, CPIX does not
+    assert cpix.validate(etree.tostring(cpix_doc.element()))[0]
+    assert not valid
+    assert [error.rule for error in errors] == ["period-index-time"] * 2